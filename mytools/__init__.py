@@ -1,2 +1,4 @@
+__version__ = '0.2.0'
+
 import mytools.regression
 import mytools.date
@@ -0,0 +1,190 @@
+import concurrent.futures
+import math
+import os
+import numpy as np
+import pandas as pd
+import mytools.date as dt
+import mytools.executor as ex
+import mytools.regression as reg
+
+# Rolling-origin backtesting: each model is fitted on every prefix of the series (the origin is the last observed
+# day) and its forecasts of the following days are compared with the actual values. At each origin the series are
+# fitted together with the batch fitting functions of the regression module, warm started from the solutions of
+# the previous origin.
+
+columns = ['entity', 'model', 'origin', 'horizon', 'actual', 'forecast', 'error']
+
+
+def backtest_series(x, y_mat, model: str = 'sigmoid', horizons=(1, 7, 14), min_points: int = 10, step: int = 1,
+                    first_origin: int = None, last_origin: int = None) -> tuple:
+    """
+    Backtest a model on some series sharing the same abscissa.
+
+    The origins are the indexes of the last observation of the prefixes. The forecast of horizon h of an origin is
+    compared with the observation h rows later, hence the series are expected to be daily without gaps. The series
+    with less than :code:`min_points` observations or which cannot be fitted at an origin are skipped.
+
+    Args:
+        x (np.array): the abscissa, e.g. the days of the year
+        y_mat (np.array): the days x entities matrix of values, or a single series, NaN values are ignored
+        model (str): the name of the model, one of :code:`regression.models`
+        horizons (tuple): the numbers of days ahead to score
+        min_points (int): the number of observations of the shortest prefix
+        step (int): the number of days between two origins
+        first_origin (int): the index of the first origin, by default the one of the shortest prefix
+        last_origin (int): the index of the last origin (excluded), by default the last one with a scored horizon
+
+    Returns:
+        (tuple): tuple containing:
+
+            entity (np.array) : the index of the series of each forecast
+            origin (np.array) : the abscissa of the origin of each forecast
+            horizon (np.array) : the horizon of each forecast
+            actual (np.array) : the observed values
+            forecast (np.array) : the forecasts
+
+    """
+    fit_batch = reg.get_model(model).fit_batch
+    x = np.asarray(x, dtype=float)
+    y_mat = np.asarray(y_mat, dtype=float)
+    if y_mat.ndim == 1:
+        y_mat = y_mat[:, np.newaxis]
+    horizons = np.asarray(horizons, dtype=int)
+    counts = np.cumsum(np.isfinite(y_mat) & np.isfinite(x)[:, np.newaxis], axis=0)
+
+    first_origin = min_points - 1 if first_origin is None else max(first_origin, min_points - 1)
+    last_origin = x.size - horizons.min() if last_origin is None else min(last_origin, x.size - horizons.min())
+
+    fits = None
+    rows = []
+    for origin in range(first_origin, last_origin, step):
+        if not np.any(counts[origin] >= min_points):
+            continue
+        prefix = y_mat[:origin + 1].copy()
+        prefix[:, counts[origin] < min_points] = np.nan
+        fits = fit_batch(x[:origin + 1], prefix, warm_start=fits)
+
+        p = np.array([f.p for f in fits])
+        t_x = np.array([f.t_x for f in fits]).T
+        t_y = np.array([f.t_y for f in fits]).T
+        entities = np.flatnonzero(np.isfinite(p).all(axis=1))
+        targets = origin + horizons[origin + horizons < x.size]
+        if entities.size == 0 or targets.size == 0:
+            continue
+
+        # evaluate the forecasts of all the series at once, one row per horizon
+        x_norm = t_x[0, entities] * x[targets, np.newaxis] + t_x[1, entities]
+        with np.errstate(over='ignore', invalid='ignore'):
+            forecast = reg.normalize_back(fits[0].curve.fun(p[entities].T, x_norm), t_y[:, entities])
+        rows.append((np.tile(entities, targets.size), np.full(forecast.size, x[origin]),
+                     np.repeat(targets - origin, entities.size), y_mat[targets][:, entities].ravel(), forecast.ravel()))
+
+    if not rows:
+        return (np.empty(0, dtype=int),) + tuple(np.empty(0) for _ in range(4))
+    return tuple(np.concatenate(r) for r in zip(*rows))
+
+
+def _backtest_task(model: str, x: np.array, y_mat: np.array, kwargs: dict) -> tuple:
+    return model, backtest_series(x, y_mat, model, **kwargs)
+
+
+def backtest(x, data_frame: pd.DataFrame, models=('exponential', 'sigmoid', 'logistic_distribution'),
+             horizons=(1, 7, 14), min_points: int = 10, step: int = 1,
+             executor: concurrent.futures.Executor = None, chunk_size: int = None,
+             origins_per_task: int = None) -> pd.DataFrame:
+    """
+    Backtest some models on each column of a days x entities data frame, fanning out the work on an executor.
+
+    A task backtests one model on a chunk of columns and a range of origins: the origins of a task are fitted in
+    sequence to warm start each fit from the previous one, the tasks run in parallel. Smaller ranges give more
+    parallelism but more cold fits.
+
+    Args:
+        x (np.array): the abscissa, one value per row of the data frame
+        data_frame (pd.DataFrame): the data, one series per column
+        models (tuple): the names of the models, see :code:`regression.models`
+        horizons (tuple): the numbers of days ahead to score
+        min_points (int): the number of observations of the shortest prefix
+        step (int): the number of days between two origins
+        executor (concurrent.futures.Executor): the executor running the tasks, if None they are run serially
+        chunk_size (int): the number of columns of each task, by default all the columns
+        origins_per_task (int): the number of origins of each task, by default all the origins
+
+    Returns:
+        (pd.DataFrame): the error table, one row per entity, model, origin and horizon, with the columns
+        :code:`columns`, the error being the forecast minus the actual value
+    """
+    x = np.asarray(x, dtype=float)
+    labels = data_frame.columns.tolist()
+    values = data_frame.to_numpy(dtype=float)
+    if executor is None:
+        executor = ex.SerialExecutor()
+    chunk_size = len(labels) if chunk_size is None else chunk_size
+    span = x.size * step if origins_per_task is None else origins_per_task * step
+
+    futures = []
+    for model in models:
+        for first_column in range(0, len(labels), chunk_size):
+            for start in range(min_points - 1, x.size, span):
+                kwargs = {'horizons': horizons, 'min_points': min_points, 'step': step, 'first_origin': start,
+                          'last_origin': start + span}
+                chunk = values[:, first_column:first_column + chunk_size]
+                futures.append((first_column, executor.submit(_backtest_task, model, x, chunk, kwargs)))
+
+    parts = []
+    for first_column, future in futures:
+        model, (entity, origin, horizon, actual, forecast) = future.result()
+        parts.append(pd.DataFrame({'entity': pd.Categorical.from_codes(entity + first_column, categories=labels),
+                                   'model': model, 'origin': origin.astype(np.int32),
+                                   'horizon': horizon.astype(np.int16), 'actual': actual, 'forecast': forecast}))
+
+    table = pd.concat(parts, ignore_index=True) if parts else pd.DataFrame(columns=columns[:-1])
+    table['error'] = table['forecast'] - table['actual']
+    table['model'] = table['model'].astype('category')
+
+    return table[columns]
+
+
+def backtest_data_frame(data_frame: pd.DataFrame, backend: str = 'serial', workers: int = None,
+                        **kwargs) -> pd.DataFrame:
+    """
+    Convenience wrapper of :func:`backtest` creating the executor and using the days since the first date of the
+    index as abscissa.
+
+    Args:
+        data_frame (pd.DataFrame): the data, indexed by date in dd/mm/yy format, one series per column
+        backend (str): the executor backend, see :code:`executor.get_executor`
+        workers (int): the number of workers
+        **kwargs: additional arguments passed to :func:`backtest`
+
+    Returns:
+        (pd.DataFrame): the error table, whose origins are counted in days since the first date
+    """
+    x, _ = dt.str_to_day_numbers(data_frame.index, dt.format_ddmmyy)
+    if backend != 'serial' and 'origins_per_task' not in kwargs:
+        # split the origins of each model in about 4 tasks per worker
+        num_models = len(kwargs.get('models', reg.models))
+        num_origins = math.ceil(len(x) / kwargs.get('step', 1))
+        num_tasks = 4 * (workers or os.cpu_count() or 1)
+        kwargs['origins_per_task'] = max(10, math.ceil(num_models * num_origins / num_tasks))
+    with ex.get_executor(backend, workers) as executor:
+        return backtest(x, data_frame, executor=executor, **kwargs)
+
+
+def score(table: pd.DataFrame) -> pd.DataFrame:
+    """
+    Summarize an error table.
+
+    Args:
+        table (pd.DataFrame): the output of :func:`backtest`
+
+    Returns:
+        (pd.DataFrame): the number of forecasts, the mean absolute error, the root mean squared error and the mean
+        absolute percentage error (ignoring the zero actual values) of each model and horizon
+    """
+    errors = table.assign(abs_error=table['error'].abs(), sq_error=table['error'] ** 2,
+                          pct_error=(table['error'] / table['actual'].where(table['actual'] != 0)).abs() * 100)
+    summary = errors.groupby(['model', 'horizon'], observed=True).agg(
+        count=('error', 'count'), mae=('abs_error', 'mean'), rmse=('sq_error', 'mean'), mape=('pct_error', 'mean'))
+    summary['rmse'] = np.sqrt(summary['rmse'])
+    return summary
@@ -0,0 +1,199 @@
+import numpy as np
+import mytools.regression as reg
+
+# Residual bootstrap of the fits: the residuals of the point estimate are resampled to generate replicates of the
+# data, which are fitted again to estimate the uncertainty of the parameters and of the quantities derived from them.
+# The replicates of all the series are solved together by regression.least_squares_batch, warm started from the
+# point estimates, by chunks bounding the memory of the solver.
+
+# the default maximum number of stacked samples of the replicates solved together
+max_stacked_samples = 2 ** 19
+
+
+class BootstrapResult:
+    """
+    The point estimate of a fit together with the parameters fitted on its bootstrap replicates.
+
+    Attributes:
+        fit (FitResult): the fit of the data
+        replicates (np.array): the parameters of each replicate in the data space, one row per replicate, NaN for the
+            replicates that did not converge
+        confidence (float): the default confidence level of the intervals
+    """
+
+    __slots__ = ('fit', 'replicates', 'confidence')
+
+    def __init__(self, fit: reg.FitResult, replicates: np.array, confidence: float = 0.95):
+        self.fit = fit
+        self.replicates = replicates
+        self.confidence = confidence
+
+    def interval(self, values: np.array, confidence: float = None, axis: int = 0) -> np.array:
+        """
+        Compute the percentile interval of replicated values.
+
+        Args:
+            values (np.array): the values computed on each replicate
+            confidence (float): the confidence level, the default one of the result if None
+            axis (int): the axis of the replicates in :code:`values`
+
+        Returns:
+            (np.array): the lower and upper bounds stacked on the first axis
+        """
+        confidence = self.confidence if confidence is None else confidence
+        q = 50 * np.array([1 - confidence, 1 + confidence])
+        return np.nanpercentile(values, q, axis=axis)
+
+    def parameter_intervals(self, confidence: float = None) -> np.array:
+        """
+        Returns:
+            (np.array): 2 x k array of the lower and upper bounds of each parameter of the model
+        """
+        return self.interval(self.replicates, confidence)
+
+    def flex_interval(self, confidence: float = None) -> np.array:
+        """
+        Returns:
+            (np.array): 2 x 2 array of the lower and upper bounds of the day and value of the flex of a sigmoid
+        """
+        return self.interval(np.column_stack(reg.sigmoid_get_flex(self.replicates.T)), confidence)
+
+    def asymptote_interval(self, confidence: float = None) -> np.array:
+        """
+        Returns:
+            (np.array): 2 x 2 array of the lower and upper bounds of the lower and upper asymptotes of a sigmoid
+        """
+        return self.interval(np.column_stack(reg.sigmoid_get_asymptote(self.replicates.T)), confidence)
+
+    def peak_interval(self, confidence: float = None) -> np.array:
+        """
+        Returns:
+            (np.array): 2 x 2 array of the lower and upper bounds of the day and value of the peak of a logistic
+            distribution
+        """
+        return self.interval(np.column_stack(reg.logistic_distribution_get_max(self.replicates.T)), confidence)
+
+    def forecast(self, x, confidence: float = None) -> tuple:
+        """
+        Evaluate the fitted curve with its confidence band.
+
+        Args:
+            x (np.array): the abscissa, e.g. the days of the forecast
+            confidence (float): the confidence level, the default one of the result if None
+
+        Returns:
+            (tuple): tuple containing:
+
+                estimate (np.array) : the fitted curve
+                lower (np.array) : the lower bound of the band
+                upper (np.array) : the upper bound of the band
+        """
+        x = np.asarray(x, dtype=float)
+        with np.errstate(over='ignore', invalid='ignore'):
+            values = self.fit.curve.fun(self.replicates.T, x[:, np.newaxis])
+        lower, upper = self.interval(values, confidence, axis=1)
+        return self.fit.curve(x), lower, upper
+
+
+def bootstrap_batch(x, y_mat, model: str = 'sigmoid', num_replicates: int = 200, confidence: float = 0.95,
+                    seed=None, labels: list = None, tolerance: float = 1e-6, chunk_size: int = None) -> list:
+    """
+    Bootstrap the fits of many series sharing the same abscissa.
+
+    The series are fitted with the batch fitting function of the model. For each series, the replicates are the
+    fitted values plus residuals drawn with replacement from the residuals of the fit. They are normalized with the
+    transformations of the point estimate, hence its parameters are a good initial guess, and the replicates of the
+    series are solved together by chunks.
+
+    Args:
+        x (np.array): the abscissa, one value per row of :code:`y_mat`
+        y_mat (np.array): the days x entities matrix of values, one series per column, NaN values are ignored
+        model (str): the name of the model, one of :code:`regression.models`
+        num_replicates (int): the number of replicates of each series
+        confidence (float): the default confidence level of the intervals
+        seed: the seed of the random generator
+        labels (list): optional names of the series, stored in the fit results
+        tolerance (float): the tolerance on the relative changes of the cost and of the parameters of the
+            replicates, looser than the one of the point estimates since the replicates only matter through their
+            percentiles
+        chunk_size (int): the number of replicates, of any series, solved together, by default as many as fit in
+            :code:`max_stacked_samples` samples. The results do not depend on it.
+
+    Returns:
+        (list): the :class:`BootstrapResult` of each series, its replicates are NaN if the series cannot be fitted
+    """
+    functions = reg.get_model(model)
+    fun, residual_fun, jac_fun = functions.fun, functions.residual_fun, functions.jac_fun
+    denormalize_p, fit_batch = functions.denormalize_p, functions.fit_batch
+
+    x = np.asarray(x, dtype=float)
+    y_mat = np.asarray(y_mat, dtype=float)
+    if y_mat.ndim == 1:
+        y_mat = y_mat[:, np.newaxis]
+    rng = np.random.default_rng(seed)
+
+    fits = fit_batch(x, y_mat, labels=labels)
+    valid = np.isfinite(y_mat) & np.isfinite(x)[:, np.newaxis]
+    fitted = [j for j, f in enumerate(fits) if f.success and np.isfinite(f.p).all()]
+
+    replicates = np.full((len(fits), num_replicates, len(fits[0].p)), np.nan)
+    if not fitted:
+        return [BootstrapResult(f, replicates[j], confidence) for j, f in enumerate(fits)]
+    if chunk_size is None:
+        chunk_size = max(1, max_stacked_samples // max(np.count_nonzero(valid[:, j]) for j in fitted))
+
+    def solve(chunk):
+        # chunk: the series, the range of replicates, the normalized abscissa and the values of the replicates
+        p0 = np.concatenate([np.tile(fits[j].p, (stop - start, 1)) for j, start, stop, _, _ in chunk])
+        sizes = np.concatenate([np.full(stop - start, x_norm.size) for _, start, stop, x_norm, _ in chunk])
+        stacked_x = np.concatenate([np.tile(x_norm, stop - start) for _, start, stop, x_norm, _ in chunk])
+        stacked_y = np.concatenate([y_rep.ravel() for _, _, _, _, y_rep in chunk])
+        p, _, status, _, _ = reg.least_squares_batch(residual_fun, p0, stacked_x, stacked_y,
+                                                     np.repeat(np.arange(sizes.size), sizes), jac_fun=jac_fun,
+                                                     ftol=tolerance, xtol=tolerance)
+        p[status <= 0] = np.nan
+        first = 0
+        for j, start, stop, _, _ in chunk:
+            rows = slice(first, first + stop - start)
+            replicates[j, start:stop] = np.column_stack(denormalize_p(p[rows].T, fits[j].t_x, fits[j].t_y))
+            first += stop - start
+
+    chunk, chunk_count = [], 0
+    for j in fitted:
+        f = fits[j]
+        x_norm = f.t_x[0] * x[valid[:, j]] + f.t_x[1]
+        y_fit = fun(f.p, x_norm)
+        residuals = f.t_y[0] * y_mat[valid[:, j], j] + f.t_y[1] - y_fit
+        draws = rng.integers(0, residuals.size, (num_replicates, residuals.size))
+        y_rep = y_fit + residuals[draws]
+
+        start = 0
+        while start < num_replicates:
+            stop = min(num_replicates, start + chunk_size - chunk_count)
+            chunk.append((j, start, stop, x_norm, y_rep[start:stop]))
+            chunk_count += stop - start
+            start = stop
+            if chunk_count == chunk_size:
+                solve(chunk)
+                chunk, chunk_count = [], 0
+    if chunk:
+        solve(chunk)
+
+    return [BootstrapResult(f, replicates[j], confidence) for j, f in enumerate(fits)]
+
+
+def bootstrap(x, y, model: str = 'sigmoid', num_replicates: int = 200, confidence: float = 0.95, seed=None,
+              label=None, tolerance: float = 1e-6) -> BootstrapResult:
+    """
+    Bootstrap the fit of a series, see :func:`bootstrap_batch`.
+
+    :code:`result = bootstrap(x, y, 'sigmoid')`, then e.g. :code:`result.flex_interval()` or
+    :code:`estimate, lower, upper = result.forecast(days)`. It can also be fanned out on the columns of a data frame
+    with :code:`executor.fit_columns(x, data_frame, bootstrap, executor=..., model='sigmoid')`.
+
+    Returns:
+        (BootstrapResult): the fit and its replicates
+    """
+    y = np.asarray(y, dtype=float)
+    return bootstrap_batch(x, y[:, np.newaxis], model, num_replicates, confidence, seed,
+                           labels=None if label is None else [label], tolerance=tolerance)[0]
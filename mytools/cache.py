@@ -0,0 +1,192 @@
+import hashlib
+import io
+import json
+import os
+import time
+import warnings
+import pandas as pd
+import requests
+import mytools.download as download
+
+# the defaults can be set from the environment, e.g. MYTOOLS_OFFLINE=1 to work without network
+cache_dir = os.environ.get('MYTOOLS_CACHE_DIR', os.path.join(os.path.expanduser('~'), '.cache', 'mytools'))
+cache_ttl = float(os.environ.get('MYTOOLS_CACHE_TTL', 3600))
+offline = os.environ.get('MYTOOLS_OFFLINE', '0') not in ('', '0')
+timeout = 60
+
+
+def is_url(file_name: str) -> bool:
+    return isinstance(file_name, str) and file_name.startswith(('http://', 'https://'))
+
+
+def _entry_paths(url: str, directory: str, read_csv_kwargs: dict) -> tuple:
+    key = hashlib.sha1((url + repr(sorted(read_csv_kwargs.items()))).encode('utf-8')).hexdigest()
+    return os.path.join(directory, key + '.pkl'), os.path.join(directory, key + '.json')
+
+
+def _load_meta(meta_path: str) -> dict:
+    try:
+        with open(meta_path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_meta(meta_path: str, meta: dict):
+    tmp_path = meta_path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(meta, f)
+    os.replace(tmp_path, meta_path)
+
+
+def _save_frame(frame_path: str, frame: pd.DataFrame):
+    # write then rename so that a concurrent reader never sees a partial file
+    tmp_path = frame_path + '.tmp'
+    frame.to_pickle(tmp_path)
+    os.replace(tmp_path, frame_path)
+
+
+def _revalidate(url: str, meta: dict, stream: bool = False):
+    """
+    Send a conditional request for a cached entry.
+
+    Returns:
+        the response, None if the cached copy is still valid or if the server cannot be reached and a cached copy
+        exists, in which case a warning is issued
+    """
+    headers = {}
+    if meta.get('etag'):
+        headers['If-None-Match'] = meta['etag']
+    if meta.get('last_modified'):
+        headers['If-Modified-Since'] = meta['last_modified']
+
+    try:
+        response = download.session().get(url, headers=headers, timeout=timeout, stream=stream)
+        if response.status_code != 304:
+            response.raise_for_status()
+    except requests.RequestException as e:
+        if not meta:
+            raise
+        warnings.warn('Cannot revalidate {} ({}), using the cached copy'.format(url, e))
+        return None
+
+    if response.status_code == 304:
+        return None
+    return response
+
+
+def _response_meta(url: str, response) -> dict:
+    return {'url': url, 'fetched': time.time(), 'etag': response.headers.get('ETag'),
+            'last_modified': response.headers.get('Last-Modified')}
+
+
+def read_csv(file_name: str, ttl: float = None, offline_mode: bool = None, directory: str = None,
+             **read_csv_kwargs) -> pd.DataFrame:
+    """
+    Read a CSV file like :code:`pd.read_csv`, keeping a parsed copy of remote files in an on-disk cache.
+
+    A cached copy younger than :code:`ttl` seconds is returned without any network access. An older copy is
+    revalidated with a conditional request (ETag / Last-Modified) and only downloaded and parsed again if the remote
+    file changed. In offline mode the cached copy is returned whatever its age; a stale copy is also returned, with
+    a warning, when the server cannot be reached. Local files are read directly.
+
+    Args:
+        file_name (str): the URL or the path of the CSV file
+        ttl (float): the number of seconds a cached copy is considered fresh, :code:`cache_ttl` if None
+        offline_mode (bool): never access the network, :code:`offline` if None
+        directory (str): the cache directory, :code:`cache_dir` if None
+        **read_csv_kwargs: additional arguments passed to :code:`pd.read_csv`
+
+    Returns:
+        the parsed data frame
+    """
+    if not is_url(file_name):
+        return pd.read_csv(file_name, **read_csv_kwargs)
+
+    ttl = cache_ttl if ttl is None else ttl
+    offline_mode = offline if offline_mode is None else offline_mode
+    directory = cache_dir if directory is None else directory
+
+    frame_path, meta_path = _entry_paths(file_name, directory, read_csv_kwargs)
+    meta = _load_meta(meta_path) if os.path.exists(frame_path) else {}
+
+    if meta and (offline_mode or time.time() - meta.get('fetched', 0) < ttl):
+        return pd.read_pickle(frame_path)
+    if offline_mode:
+        raise FileNotFoundError('{} is not cached in {} and the offline mode is on'.format(file_name, directory))
+
+    response = _revalidate(file_name, meta)
+    if response is None:
+        meta['fetched'] = time.time()
+        _save_meta(meta_path, meta)
+        return pd.read_pickle(frame_path)
+
+    frame = pd.read_csv(io.BytesIO(response.content), **read_csv_kwargs)
+
+    os.makedirs(directory, exist_ok=True)
+    _save_frame(frame_path, frame)
+    _save_meta(meta_path, _response_meta(file_name, response))
+
+    return frame
+
+
+def fetch(file_name: str, ttl: float = None, offline_mode: bool = None, directory: str = None) -> str:
+    """
+    Download a remote file into the on-disk cache, with the same revalidation rules as :func:`read_csv`, to read it
+    as a stream instead of parsing it at once.
+
+    Args:
+        file_name (str): the URL or the path of the file
+        ttl (float): the number of seconds a cached copy is considered fresh, :code:`cache_ttl` if None
+        offline_mode (bool): never access the network, :code:`offline` if None
+        directory (str): the cache directory, :code:`cache_dir` if None
+
+    Returns:
+        (str): the path of the cached copy, or the path of the file itself if it is local
+    """
+    if not is_url(file_name):
+        return file_name
+
+    ttl = cache_ttl if ttl is None else ttl
+    offline_mode = offline if offline_mode is None else offline_mode
+    directory = cache_dir if directory is None else directory
+
+    key = hashlib.sha1(('raw:' + file_name).encode('utf-8')).hexdigest()
+    raw_path, meta_path = os.path.join(directory, key + '.raw'), os.path.join(directory, key + '.json')
+    meta = _load_meta(meta_path) if os.path.exists(raw_path) else {}
+
+    if meta and (offline_mode or time.time() - meta.get('fetched', 0) < ttl):
+        return raw_path
+    if offline_mode:
+        raise FileNotFoundError('{} is not cached in {} and the offline mode is on'.format(file_name, directory))
+
+    response = _revalidate(file_name, meta, stream=True)
+    if response is None:
+        meta['fetched'] = time.time()
+        _save_meta(meta_path, meta)
+        return raw_path
+
+    os.makedirs(directory, exist_ok=True)
+    tmp_path = raw_path + '.tmp'
+    with response, open(tmp_path, 'wb') as f:
+        for block in response.iter_content(chunk_size=1 << 20):
+            f.write(block)
+    os.replace(tmp_path, raw_path)
+    _save_meta(meta_path, _response_meta(file_name, response))
+
+    return raw_path
+
+
+def clear(directory: str = None):
+    """
+    Remove all the cached files.
+
+    Args:
+        directory (str): the cache directory, :code:`cache_dir` if None
+    """
+    directory = cache_dir if directory is None else directory
+    if not os.path.isdir(directory):
+        return
+    for name in os.listdir(directory):
+        if name.endswith(('.pkl', '.raw', '.json', '.tmp')):
+            os.remove(os.path.join(directory, name))
@@ -0,0 +1,281 @@
+import argparse
+import importlib.util
+import math
+import os
+import sys
+import time
+import numpy as np
+import pandas as pd
+import mytools.cache as cache
+import mytools.dataio as io
+import mytools.date as dt
+import mytools.download as download
+import mytools.executor as ex
+import mytools.regression as reg
+import mytools.report as report
+
+# Non-interactive pipeline: load a dataset, reshape it into days x entities frames, fit the models to every series
+# and write the parameters, the forecasts and optionally the figures to files. Run it with :code:`python -m mytools`,
+# see --help for the options.
+
+levels = ['country', 'region', 'province', 'world']
+table_formats = ['csv', 'parquet']
+
+# the files of the world categories
+world_files = {
+    'confirmed': io.get_filename_confirmed_cases,
+    'deaths': io.get_filename_death_cases,
+    'recovered': io.get_filename_recovered_cases,
+}
+
+default_categories = {
+    'country': [io.italy_intensive_care_field, io.italy_deaths_field, io.italy_total_cases_field],
+    'region': [io.italy_intensive_care_field, io.italy_deaths_field, io.italy_total_cases_field],
+    'province': [io.italy_total_cases_field],
+    'world': ['confirmed', 'deaths'],
+}
+
+
+def load_frames(level: str, categories: list, entities: list = None, file_name: str = None,
+                store_dir: str = None) -> dict:
+    """
+    Load the days x entities frame of each category of a level.
+
+    Args:
+        level (str): one of :code:`levels`
+        categories (list): the categories, fields of the pcm-dpc datasets or keys of :code:`world_files`
+        entities (list): the names of the regions, provinces or countries, all by default
+        file_name (str): the URL or the path of the CSV file, the default dataset of the level if None, for the world
+            level it is formatted with the name of the category, e.g. 'world_{}.csv'
+        store_dir (str): serve the frames of the regional and provincial datasets from the memory-mapped stores of
+            this directory, see :code:`dataio.italy_load_category`
+
+    Returns:
+        (dict): the frame of each category, indexed by date in dd/mm/yy format, one column per entity
+    """
+    if level == 'world':
+        for category in categories:
+            if category not in world_files:
+                raise ValueError('Unknown world category {}, valid values are {}'.format(category, list(world_files)))
+        sources = [world_files[c]() if file_name is None else file_name.format(c) for c in categories]
+        frames = download.map_concurrent(lambda source: io.world_load_cases(source, entities, stream=True), sources)
+        # the rows of the provinces of a country are summed
+        return {c: frame.T.groupby(level=0, sort=False).sum(min_count=1).T for c, frame in zip(categories, frames)}
+
+    if level == 'country':
+        data_frame = io.italy_load(file_name or io.italy_get_filename_country(), field='', search_for=None)
+        return {category: data_frame[[category]].set_axis(['Italia'], axis=1) for category in categories}
+
+    if level == 'region':
+        field, default_file = io.italy_region_name_field, io.italy_get_filename_regions
+    elif level == 'province':
+        field, default_file = io.italy_province_name_field, io.italy_get_filename_provinces
+    else:
+        raise ValueError('Unknown level {}, valid values are {}'.format(level, levels))
+
+    if store_dir:
+        frames = {c: io.italy_load_category(level, c, entities, file_name, store_dir) for c in categories}
+        if level == 'province':
+            frames = {c: f.loc[:, f.columns != io.italy_not_a_province] for c, f in frames.items()}
+        return frames
+
+    data_frame = io.italy_load(file_name or default_file(), field, entities)
+    if level == 'province':
+        data_frame = data_frame[data_frame[field] != io.italy_not_a_province]
+    wide = io.italy_filter_by_category(data_frame, field, categories)
+    return {category: wide[category] for category in categories}
+
+
+def _fit_task(model: str, x: np.array, y_mat: np.array, labels: list) -> list:
+    return reg.models[model].fit_batch(x, y_mat, labels=labels)
+
+
+def fit_frames(frames: dict, model_names: list, executor, min_value: float = 0, chunk_size: int = None) -> dict:
+    """
+    Fit the models to every column of the frames, fanning out chunks of columns on an executor.
+
+    Each task fits a chunk of columns together with the batch fitting function of a model, the tasks of all the
+    categories and models are submitted at once to keep all the workers busy.
+
+    Args:
+        frames (dict): the days x entities frame of each category, see :func:`load_frames`
+        model_names (list): the names of the models, keys of :code:`regression.models`
+        executor (concurrent.futures.Executor): the executor running the fits
+        min_value (float): only the values above this value are fitted
+        chunk_size (int): the number of columns per task, by default about 4 tasks per core
+
+    Returns:
+        (dict): the :class:`FitResult` of each (category, model), one per column
+    """
+    futures = {}
+    for category, frame in frames.items():
+        x, _ = dt.str_to_day_numbers(frame.index, dt.format_ddmmyy)
+        values = frame.to_numpy(dtype=float)
+        values = np.where(values > min_value, values, np.nan)
+        labels = frame.columns.tolist()
+        size = chunk_size or max(1, math.ceil(len(labels) * len(frames) * len(model_names) /
+                                              (4 * (os.cpu_count() or 1))))
+        for model in model_names:
+            futures[category, model] = [executor.submit(_fit_task, model, x, values[:, start:start + size],
+                                                        labels[start:start + size])
+                                        for start in range(0, len(labels), size)]
+
+    return {key: [r for future in chunk_futures for r in future.result()] for key, chunk_futures in futures.items()}
+
+
+def parameters_table(fits: dict) -> pd.DataFrame:
+    """
+    Tabulate the parameters and the solver diagnostics of the fits.
+
+    Args:
+        fits (dict): the output of :func:`fit_frames`
+
+    Returns:
+        (pd.DataFrame): one row per category, entity and model, the parameters the model does not have are NaN, the
+        abscissa x0 being counted in days since the first date of the data as in :func:`fit_frames`
+    """
+    names = list(dict.fromkeys(name for m in reg.models.values() for name in m.parameters))
+    rows = []
+    for (category, model), results in fits.items():
+        for result in results:
+            row = {'category': category, 'entity': result.label, 'model': model}
+            row.update(dict.fromkeys(names, np.nan))
+            row.update(zip(reg.models[model].parameters, np.asarray(result.model, dtype=float)))
+            row.update(cost=result.cost, nfev=result.nfev, status=result.status, success=result.success)
+            rows.append(row)
+    return pd.DataFrame(rows, columns=['category', 'entity', 'model'] + names + ['cost', 'nfev', 'status', 'success'])
+
+
+def forecasts_table(fits: dict, frames: dict, horizon: int = 14) -> pd.DataFrame:
+    """
+    Tabulate the forecasts of the fits for the days following the last date of the data.
+
+    Args:
+        fits (dict): the output of :func:`fit_frames`
+        frames (dict): the frames that were fitted
+        horizon (int): the number of days ahead
+
+    Returns:
+        (pd.DataFrame): one row per category, entity, model and day, the day being counted from the first date of
+        the data as in :func:`fit_frames`, with the date in ISO 8601 format
+    """
+    parts = []
+    for (category, model), results in fits.items():
+        # the same abscissa as fit_frames, the days since the first date
+        x, origin = dt.str_to_day_numbers(frames[category].index, dt.format_ddmmyy)
+        days = int(x.max()) + np.arange(1, horizon + 1)
+        dates = dt.date_to_string_array(dt.day_number_to_date_array(days, origin), '%Y-%m-%d')
+        for result in results:
+            if not result.success:
+                continue
+            with np.errstate(over='ignore', invalid='ignore'):
+                values = result.curve(days.astype(float))
+            parts.append(pd.DataFrame({'category': category, 'entity': result.label, 'model': model, 'day': days,
+                                       'date': dates, 'forecast': values}))
+    if not parts:
+        return pd.DataFrame(columns=['category', 'entity', 'model', 'day', 'date', 'forecast'])
+    return pd.concat(parts, ignore_index=True)
+
+
+def write_table(table: pd.DataFrame, path: str, table_format: str = 'csv') -> str:
+    """
+    Write a table atomically, so that readers never see a partial file.
+
+    Returns:
+        (str): the path of the file
+    """
+    path = '{}.{}'.format(path, table_format)
+    tmp_path = path + '.tmp'
+    if table_format == 'parquet':
+        table.to_parquet(tmp_path, index=False)
+    else:
+        table.to_csv(tmp_path, index=False)
+    os.replace(tmp_path, path)
+    return path
+
+
+def figure_specs(frames: dict, model_names: list, min_value: float = 0, title_format: str = '{} - {}') -> list:
+    kwargs = {'exp_fitting': 'exponential' in model_names, 'sigm_fitting': 'sigmoid' in model_names,
+              'log_fitting': 'logistic_distribution' in model_names}
+    return [spec for category, frame in frames.items()
+            for spec in report.analysis_specs(frame, category, title_format, min_value, **kwargs)]
+
+
+def parse_args(args=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(prog='python -m mytools',
+                                     description='Fit the models to the COVID-19 series and write the parameters, the '
+                                                 'forecasts and optionally the figures, without any window')
+    parser.add_argument('level', choices=levels)
+    parser.add_argument('--categories', nargs='+',
+                        help='the fields of the pcm-dpc datasets, or {} for the world level, default: {}'.format(
+                            ', '.join(world_files), default_categories))
+    parser.add_argument('--entities', nargs='+', help='the regions, provinces or countries, default: all')
+    parser.add_argument('--models', nargs='+', choices=list(reg.models), default=list(reg.models))
+    parser.add_argument('--file', help='the URL or the path of the dataset, for the world level a format string '
+                                       'given the category, default: the upstream dataset of the level')
+    parser.add_argument('--store', dest='store_dir',
+                        help='serve the regional and provincial datasets from memory-mapped stores in this directory, '
+                             'written on first use')
+    parser.add_argument('--output', default='output', help='the output directory, default: output')
+    parser.add_argument('--format', choices=table_formats, default='csv', dest='table_format',
+                        help='the format of the tables, default: csv')
+    parser.add_argument('--figures', nargs='+', choices=report.formats, default=[],
+                        help='also render the analysis figure of each series in these formats')
+    parser.add_argument('--horizon', type=int, default=14, help='the number of days to forecast, default: 14')
+    parser.add_argument('--min-value', type=float, default=0, help='only the values above it are fitted, default: 0')
+    parser.add_argument('--backend', choices=ex.backends, default='process', help='default: process')
+    parser.add_argument('--workers', type=int, help='the number of workers, default: the number of cores')
+    parser.add_argument('--offline', action='store_true', help='only use the cached copies of the remote datasets')
+    parser.add_argument('--quiet', action='store_true', help='do not print the progress')
+    args = parser.parse_args(args)
+
+    if args.categories is None:
+        args.categories = default_categories[args.level]
+    if args.table_format == 'parquet' and not any(importlib.util.find_spec(engine)
+                                                  for engine in ('pyarrow', 'fastparquet')):
+        parser.error('the parquet format requires pyarrow or fastparquet (pip install pyarrow)')
+    return args
+
+
+def main(args=None) -> int:
+    """
+    Run the pipeline, see :code:`python -m mytools --help`.
+
+    Args:
+        args (list): the command line arguments, :code:`sys.argv[1:]` if None
+
+    Returns:
+        (int): the exit status
+    """
+    args = parse_args(args)
+    log = (lambda *a: None) if args.quiet else (lambda message: print(message, file=sys.stderr))
+    if args.offline:
+        cache.offline = True
+    os.makedirs(args.output, exist_ok=True)
+
+    start = time.perf_counter()
+    frames = load_frames(args.level, args.categories, args.entities, args.file, args.store_dir)
+    log('loaded {} in {:.1f} s'.format(', '.join('{} {}'.format(c, f.shape) for c, f in frames.items()),
+                                       time.perf_counter() - start))
+
+    start = time.perf_counter()
+    with ex.get_executor(args.backend, args.workers) as executor:
+        fits = fit_frames(frames, args.models, executor, args.min_value)
+    log('fitted {} series in {:.1f} s'.format(sum(len(r) for r in fits.values()), time.perf_counter() - start))
+
+    prefix = os.path.join(args.output, args.level + '_')
+    log('wrote ' + write_table(parameters_table(fits), prefix + 'parameters', args.table_format))
+    log('wrote ' + write_table(forecasts_table(fits, frames, args.horizon), prefix + 'forecasts', args.table_format))
+
+    if args.figures:
+        start = time.perf_counter()
+        status = report.render_report(figure_specs(frames, args.models, args.min_value),
+                                      os.path.join(args.output, 'figures'), args.figures, args.backend, args.workers)
+        errors = {name: s for name, s in status.items() if s not in ('rendered', 'skipped')}
+        log('rendered {} figures in {:.1f} s, {} skipped, {} failed'.format(
+            sum(s == 'rendered' for s in status.values()), time.perf_counter() - start,
+            sum(s == 'skipped' for s in status.values()), len(errors)))
+        for name, error in errors.items():
+            log('{}: {}'.format(name, error))
+
+    return 0
@@ -1,11 +1,80 @@
+import collections
+import csv
+import os
+import threading
 from typing import List, Union
+import numpy as np
 import pandas as pd
 import mytools.date as dt
+import mytools.cache as cache
+import mytools.download as download
 
 world_country_name_field = 'Country/Region'
 world_province_name_field = 'Province/State'
 world_first_date = '1/22/20'
 
+# bounds of the session registry of parsed sources, see load_source
+loaded_sources_max_entries = 8
+loaded_sources_max_bytes = 2 * 1024 ** 3
+
+_loaded_sources = collections.OrderedDict()
+_loaded_sources_lock = threading.Lock()
+
+
+def load_source(file_name: str) -> pd.DataFrame:
+    """
+    Parse a source file once per session and serve the following calls from the parsed copy.
+
+    The parsed sources are kept in a least recently used registry bounded by :code:`loaded_sources_max_entries`
+    and :code:`loaded_sources_max_bytes`. The returned frame is shared among the callers, hence it must not be
+    modified in place.
+
+    Args:
+        file_name (str): the URL or the path of the CSV file
+
+    Returns:
+        the parsed data frame
+    """
+    with _loaded_sources_lock:
+        if file_name in _loaded_sources:
+            _loaded_sources.move_to_end(file_name)
+            return _loaded_sources[file_name][0]
+
+    frame = cache.read_csv(file_name)
+    size = frame.memory_usage(deep=True).sum()
+
+    with _loaded_sources_lock:
+        _loaded_sources[file_name] = (frame, size)
+        # always keep the most recent source, even if alone it exceeds the budget
+        while len(_loaded_sources) > 1 and (len(_loaded_sources) > loaded_sources_max_entries or sum(
+                s for _, s in _loaded_sources.values()) > loaded_sources_max_bytes):
+            _loaded_sources.popitem(last=False)
+
+    return frame
+
+
+def load_sources(file_names: List[str], workers: int = None) -> List[pd.DataFrame]:
+    """
+    Download and parse many source files concurrently, see :func:`load_source`, e.g. to refresh all the datasets at
+    once.
+
+    Args:
+        file_names (list): the URLs or the paths of the CSV files
+        workers (int): the number of threads, see :code:`download.map_concurrent`
+
+    Returns:
+        (list): the parsed data frames, in the order of the file names
+    """
+    return download.map_concurrent(load_source, file_names, workers)
+
+
+def clear_loaded_sources():
+    """
+    Empty the session registry of parsed sources, e.g. to force a reload of updated data.
+    """
+    with _loaded_sources_lock:
+        _loaded_sources.clear()
+
 
 def get_filename_confirmed_cases() -> str:
     return 'https://raw.githubusercontent.com/CSSEGISandData/COVID-19/master/csse_covid_19_data' \
@@ -22,8 +91,23 @@ def get_filename_recovered_cases() -> str:
            '/csse_covid_19_time_series/time_series_covid19_recovered_global.csv'
 
 
-def world_load_cases(file_name: str, countries: List[str] = None) -> pd.DataFrame:
-    df_cases = pd.read_csv(file_name)
+def world_load_cases(file_name: str, countries: List[str] = None, stream: bool = False) -> pd.DataFrame:
+    """
+    Load the days x countries cases of a JHU global time series.
+
+    Args:
+        file_name (str): the URL or the path of the CSV file
+        countries (list): the names of the countries, all the rows if None
+        stream (bool): read the file line by line keeping only the rows of the countries, see
+            :func:`world_stream_cases`, instead of parsing the whole file once per session
+
+    Returns:
+        (pd.DataFrame): the cases, indexed by date in dd/mm/yy format, one column per row of the countries
+    """
+    if stream:
+        return world_stream_cases(file_name, countries)
+
+    df_cases = load_source(file_name)
 
     first_date = world_first_date
     country_col = world_country_name_field
@@ -48,19 +132,80 @@ def world_load_cases(file_name: str, countries: List[str] = None) -> pd.DataFram
     cases_countries.columns = countries_columns
 
     # replace the date string as index with the day of the year (useful if later on we need to compute models)
-    dates = dt.str_convert_mdy_to_dmy(cases_countries.index.to_list())
+    dates = dt.str_convert_date_array(cases_countries.index, format_from=dt.format_mmddyy, format_to=dt.format_ddmmyy)
     cases_countries.index = dates
 
     return cases_countries
 
 
+def _world_row_matches(province: str, country: str, countries: set) -> bool:
+    # same condition as world_load_cases
+    return country in countries and (not province or province in countries)
+
+
+def _world_values(fields: List[str]) -> np.array:
+    try:
+        return np.array(fields, dtype=np.int64)
+    except ValueError:
+        return np.array([float(v) if v else np.nan for v in fields])
+
+
+def world_stream_cases(file_name: str, countries: List[str] = None, ttl: float = None) -> pd.DataFrame:
+    """
+    Load the days x countries cases of a JHU global time series reading the file line by line, like
+    :func:`world_load_cases`.
+
+    The remote files are downloaded in the cache with :code:`cache.fetch`. Only the lines containing the name of a
+    requested country are parsed, hence the memory and the time spent parsing grow with the number of countries
+    rather than with the size of the file. The values are stored in a single days x rows array, of int32 when they
+    are all integers in range, float64 otherwise.
+
+    Args:
+        file_name (str): the URL or the path of the CSV file
+        countries (list): the names of the countries, all the rows if None
+        ttl (float): the number of seconds a cached copy is considered fresh, see :code:`cache.fetch`
+
+    Returns:
+        (pd.DataFrame): the cases, indexed by date in dd/mm/yy format, one column per row of the countries
+    """
+    path = cache.fetch(file_name, ttl=ttl)
+    wanted = None if countries is None else set(countries)
+    # the names as they appear in the raw lines, quotes are doubled inside quoted fields
+    needles = None if countries is None else {c for name in wanted for c in (name, name.replace('"', '""'))}
+
+    names, rows = [], []
+    with open(path, newline='', encoding='utf-8') as f:
+        header = next(csv.reader([f.readline()]))
+        province_pos = header.index(world_province_name_field)
+        country_pos = header.index(world_country_name_field)
+        first_pos = header.index(world_first_date)
+        for line in f:
+            if needles is not None and not any(n in line for n in needles):
+                continue
+            fields = next(csv.reader([line]))
+            if wanted is not None and not _world_row_matches(fields[province_pos], fields[country_pos], wanted):
+                continue
+            names.append(fields[country_pos])
+            rows.append(_world_values(fields[first_pos:]))
+
+    num_days = len(header) - first_pos
+    int32 = np.iinfo(np.int32)
+    dtype = np.int32 if all(r.dtype.kind == 'i' and (r.size == 0 or int32.min <= r.min() and r.max() <= int32.max)
+                            for r in rows) else np.float64
+    values = np.empty((num_days, len(rows)), dtype=dtype, order='F')
+    for j, row in enumerate(rows):
+        values[:, j] = row
+
+    dates = dt.str_convert_date_array(header[first_pos:], format_from=dt.format_mmddyy, format_to=dt.format_ddmmyy)
+    return pd.DataFrame(values, index=dates, columns=names, copy=False)
+
+
 def world_load_stats_country(country: str) -> pd.DataFrame:
 
-    confirmed_cases = world_load_cases(get_filename_confirmed_cases(), [country])
-    death_cases = world_load_cases(get_filename_death_cases(), [country])
-    recovered_cases = world_load_cases(get_filename_recovered_cases(), [country])
+    file_names = [get_filename_confirmed_cases(), get_filename_death_cases(), get_filename_recovered_cases()]
+    cases = download.map_concurrent(lambda file_name: world_load_cases(file_name, [country], stream=True), file_names)
 
-    overall_stats = pd.concat([confirmed_cases, death_cases, recovered_cases], axis=1, sort=False)
+    overall_stats = pd.concat(cases, axis=1, sort=False)
     overall_stats.columns = ['confirmed', 'deaths', 'recovered']
 
     return overall_stats
@@ -84,6 +229,10 @@ italy_discharged_field = 'dimessi_guariti'
 italy_hospitalized_field = 'totale_ospedalizzati'
 italy_hospitalized_with_symptoms_field = 'ricoverati_con_sintomi'
 
+# the directory of the memory-mapped stores of the pcm-dpc datasets, see mytools.store, if set the frames of
+# italy_load_category are served from the stores, written on first use
+italy_store_dir = os.environ.get('MYTOOLS_STORE_DIR')
+
 italy_northern_regions = ['P.A. Bolzano', 'Emilia Romagna', 'Friuli Venezia Giulia', 'Liguria', 'Lombardia', 'Piemonte',
                           'P.A. Trento', "Valle d'Aosta", 'Veneto']
 italy_central_regions = ['Lazio', 'Marche', 'Toscana', 'Umbria']
@@ -104,16 +253,21 @@ def italy_get_filename_country() -> str:
 
 
 def italy_load(file_name: str, field: str, search_for: List[str] = None) -> pd.DataFrame:
-    df_cases = pd.read_csv(file_name)
+    df_cases = load_source(file_name)
+    if search_for is None:
+        # the whole frame is given to the caller, do not share it with the registry
+        df_cases = df_cases.copy()
+    else:
+        df_cases = df_cases[df_cases[field].isin(search_for)]
 
-    dates = dt.str_convert_date(df_cases[italy_date_field].tolist(), format_from=dt.format_ISO8601,
-                                format_to=dt.format_ddmmyy)
+    dates = dt.str_convert_date_array(df_cases[italy_date_field], format_from=dt.format_ISO8601,
+                                      format_to=dt.format_ddmmyy)
     df_cases.index = dates
 
     if search_for is None:
         return df_cases
 
-    return df_cases[df_cases[field].isin(search_for)].drop(columns=italy_date_field)
+    return df_cases.drop(columns=italy_date_field)
 
 
 def italy_load_provinces(provinces: List[str] = None) -> pd.DataFrame:
@@ -128,18 +282,48 @@ def italy_load_whole_country() -> pd.DataFrame:
     return italy_load(italy_get_filename_country(), field='', search_for=None)
 
 
-def italy_filter_by_category(data_frame: pd.DataFrame, field: str, category: str) -> pd.DataFrame:
-    filtered = pd.DataFrame(data_frame[[field, category]])
+def italy_filter_by_category(data_frame: pd.DataFrame, field: str, category: Union[str, List[str]]) -> pd.DataFrame:
+    """
+    Reshape the long format data of :func:`italy_load` into a days x entities frame.
 
-    regions = filtered[field].unique().tolist()
+    The reshape is done in a single pass over the rows. The days missing for an entity are set to NaN, if the same
+    day appears more than once for an entity the last row wins.
 
-    data = {}
-    days = filtered.index.unique().tolist()
+    Args:
+        data_frame (pd.DataFrame): the data as returned by :func:`italy_load`, indexed by date
+        field (str): the field containing the name of the entities, e.g. :code:`italy_region_name_field`
+        category (str or list of str): the category to extract or a list of categories
 
-    for reg in regions:
-        data[reg] = filtered[filtered[field] == reg][category].tolist()
+    Returns:
+        the days x entities frame of the category, or if a list of categories is given a frame whose columns are
+        indexed by (category, entity)
+    """
+    categories = [category] if isinstance(category, str) else list(category)
 
-    return pd.DataFrame(data, index=days)
+    days = data_frame.index.unique()
+    entities = pd.Index(data_frame[field].unique())
+    rows = days.get_indexer(data_frame.index)
+    cols = entities.get_indexer(data_frame[field])
+
+    filled = np.zeros((len(days), len(entities)), dtype=bool)
+    filled[rows, cols] = True
+    complete = filled.all()
+
+    frames = {}
+    for cat in categories:
+        values = data_frame[cat].to_numpy()
+        if complete:
+            wide = np.empty(filled.shape, dtype=values.dtype)
+        else:
+            wide = np.full(filled.shape, np.nan, dtype=values.dtype if values.dtype.kind in 'fcO' else
+                           object if values.dtype.kind in 'USM' else float)
+        wide[rows, cols] = values
+        frames[cat] = pd.DataFrame(wide, index=days, columns=entities)
+
+    if isinstance(category, str):
+        return frames[category]
+
+    return pd.concat(frames, axis=1)
 
 
 def italy_country_filter_by_category(data_frame: pd.DataFrame, categories: List[str]) -> pd.DataFrame:
@@ -154,8 +338,47 @@ def italy_provinces_filter_by_category(data_frame: pd.DataFrame, category: str)
     return italy_filter_by_category(data_frame, field=italy_province_name_field, category=category)
 
 
+def italy_load_category(level: str, category: str, entities: List[str] = None, file_name: str = None,
+                        store_dir: str = None) -> pd.DataFrame:
+    """
+    Load the days x entities frame of a category of the regional or provincial dataset.
+
+    When a store directory is given, the frame is a read only view of the memory-mapped store of the level in
+    :code:`<store_dir>/<level>`, written from the dataset on first use, see :code:`store.italy_open_store`. Otherwise
+    the dataset is loaded with :func:`italy_load` and reshaped with :func:`italy_filter_by_category`.
+
+    Args:
+        level (str): 'region' or 'province'
+        category (str): the category, e.g. :code:`italy_total_cases_field`
+        entities (list): the names of the regions or provinces, all by default
+        file_name (str): the URL or the path of the CSV file, the pcm-dpc dataset of the level by default
+        store_dir (str): the directory of the stores, :code:`italy_store_dir` if None, the store of a level is only
+            written from the dataset once, pass a new directory or call :code:`store.italy_open_store` with
+            refresh=True to take its updates into account
+
+    Returns:
+        (pd.DataFrame): the frame, indexed by date in dd/mm/yy format, one column per entity, float with NaN for the
+        missing days when served from the store
+    """
+    if level == 'region':
+        field, default_file = italy_region_name_field, italy_get_filename_regions
+    elif level == 'province':
+        field, default_file = italy_province_name_field, italy_get_filename_provinces
+    else:
+        raise ValueError('Unknown level {}'.format(level))
+
+    store_dir = italy_store_dir if store_dir is None else store_dir
+    if store_dir:
+        # the store module is built on this one
+        import mytools.store as st
+        store = st.italy_open_store(os.path.join(store_dir, level), level, file_name)
+        return store.frame(category, entities)
+
+    return italy_filter_by_category(italy_load(file_name or default_file(), field, entities), field, category)
+
+
 def italy_get_list_of_provinces_for_region(region: str) -> List[str]:
-    df_cases = pd.read_csv(italy_get_filename_provinces())
+    df_cases = load_source(italy_get_filename_provinces())
     # exclude the non province
     condition = (df_cases[italy_region_name_field] == region) & (df_cases[italy_province_name_field] != italy_not_a_province)
     return df_cases[condition][italy_province_name_field].unique().tolist()
@@ -167,4 +390,4 @@ def italy_get_list_of_regions() -> List[str]:
     Returns:
         the list of regions in Italy
     """
-    return italy_load_regions()[italy_region_name_field].unique().tolist()
+    return load_source(italy_get_filename_regions())[italy_region_name_field].unique().tolist()
@@ -1,6 +1,8 @@
 import datetime
 from typing import Union, List, Iterable as typeIterable
 from collections.abc import Iterable
+import numpy as np
+import pandas as pd
 
 format_ISO8601 = '%Y-%m-%dT%H:%M:%S'
 format_mmddyy = '%m/%d/%y'
@@ -23,7 +25,7 @@ def day_of_year_to_date(day: Union[int, float, typeIterable], year: Union[int, f
         year = datetime.datetime.now().year
 
     if isinstance(day, Iterable):
-        return list(day_of_year_to_date(d, year) for d in day)
+        return day_of_year_to_date_array(day, year).astype('datetime64[us]').tolist()
     else:
         return datetime.datetime(int(year), 1, 1) + datetime.timedelta(days=int(day - 1))
 
@@ -46,8 +48,7 @@ def date_to_day_of_year(date: Union[datetime.datetime, typeIterable[datetime.dat
 
 def str_convert_date(date: Union[str, List[str]], format_from: str, format_to: str) -> Union[str, List[str]]:
     if isinstance(date, list):
-        dates = list(str_convert_date(d, format_from, format_to) for d in date)
-        return dates
+        return str_convert_date_array(date, format_from, format_to).tolist()
     else:
         return datetime.datetime.strptime(date, format_from).strftime(format_to)
 
@@ -66,8 +67,7 @@ def str_convert_mdy_to_dmy(date: Union[str, List[str]]) -> Union[str, List[str]]
 
 def str_to_day_of_year(date: Union[str, list], date_format: str = format_mmddyy) -> Union[int, list]:
     if isinstance(date, list):
-        days = list(str_to_day_of_year(d, date_format) for d in date)
-        return days
+        return str_to_day_of_year_array(date, date_format).tolist()
     else:
         d = datetime.datetime.strptime(date, date_format)
         return date_to_day_of_year(d)
@@ -76,6 +76,174 @@ def str_to_day_of_year(date: Union[str, list], date_format: str = format_mmddyy)
 def day_of_year_to_string(day: Union[int, float, typeIterable], date_format: str = format_mmmdd) -> Union[
         str, typeIterable[str]]:
     if isinstance(day, Iterable):
-        return list(day_of_year_to_string(d, date_format) for d in day)
+        return day_of_year_to_string_array(day, date_format).tolist()
     else:
         return date_to_string(day_of_year_to_date(day), date_format)
+
+
+# Array versions of the conversions above. They accept any array-like (list, np.array, pd.Series, pd.Index...)
+# and convert each distinct value only once, which pays off on the long format datasets where every date is
+# repeated once per region or province.
+
+def _map_unique(values, convert: callable) -> np.array:
+    """
+    Apply a vectorized conversion to the distinct values of an array and scatter the results back.
+    """
+    uniques, inverse = np.unique(np.asarray(values), return_inverse=True)
+    return np.asarray(convert(uniques))[inverse.reshape(-1)]
+
+
+def str_to_datetime64_array(dates, date_format: str = format_mmddyy) -> np.array:
+    """
+    Parse an array of date strings.
+
+    Args:
+        dates (array-like of str): the dates
+        date_format (str): the format of the dates
+
+    Returns:
+        (np.array): the dates as datetime64[s]
+    """
+    return _map_unique(dates, lambda u: pd.to_datetime(u, format=date_format).to_numpy(dtype='datetime64[s]'))
+
+
+def date_to_string_array(dates, date_format: str = format_mmmdd) -> np.array:
+    """
+    Format an array of dates.
+
+    Args:
+        dates (array-like of datetime64 or datetime): the dates
+        date_format (str): the output format
+
+    Returns:
+        (np.array): the formatted dates as an array of str objects
+    """
+    dates = np.asarray(dates, dtype='datetime64[s]')
+    return _map_unique(dates, lambda u: pd.DatetimeIndex(u).strftime(date_format).to_numpy(dtype=object))
+
+
+def str_convert_date_array(dates, format_from: str, format_to: str) -> np.array:
+    """
+    Array version of :func:`str_convert_date`.
+
+    Args:
+        dates (array-like of str): the dates
+        format_from (str): the format of the input dates
+        format_to (str): the format of the output dates
+
+    Returns:
+        (np.array): the converted dates as an array of str objects
+    """
+    return _map_unique(dates, lambda u: date_to_string_array(str_to_datetime64_array(u, format_from), format_to))
+
+
+def date_to_day_of_year_array(dates) -> np.array:
+    """
+    Array version of :func:`date_to_day_of_year`.
+
+    Args:
+        dates (array-like of datetime64 or datetime): the dates
+
+    Returns:
+        (np.array): the day of the year of each date, in [1 366]
+    """
+    days = np.asarray(dates, dtype='datetime64[D]')
+    return (days - days.astype('datetime64[Y]').astype('datetime64[D]')).astype(int) + 1
+
+
+def str_to_day_of_year_array(dates, date_format: str = format_mmddyy) -> np.array:
+    """
+    Array version of :func:`str_to_day_of_year`.
+
+    Args:
+        dates (array-like of str): the dates
+        date_format (str): the format of the dates
+
+    Returns:
+        (np.array): the day of the year of each date, in [1 366]
+    """
+    return date_to_day_of_year_array(str_to_datetime64_array(dates, date_format))
+
+
+def day_of_year_to_date_array(days, year: Union[int, float] = None) -> np.array:
+    """
+    Array version of :func:`day_of_year_to_date`.
+
+    Args:
+        days (array-like of int or float): the days of the year [1 366], the decimal part is ignored
+        year (int or float): the year, if None, the current year is assumed
+
+    Returns:
+        (np.array): the dates as datetime64[D]
+    """
+    if year is None:
+        year = datetime.datetime.now().year
+
+    offsets = (np.asarray(days, dtype=float) - 1).astype(int)
+    return np.datetime64('{:04d}-01-01'.format(int(year)), 'D') + offsets
+
+
+def day_of_year_to_string_array(days, date_format: str = format_mmmdd, year: Union[int, float] = None) -> np.array:
+    """
+    Array version of :func:`day_of_year_to_string`.
+
+    Args:
+        days (array-like of int or float): the days of the year [1 366]
+        date_format (str): the output format
+        year (int or float): the year, if None, the current year is assumed
+
+    Returns:
+        (np.array): the formatted dates as an array of str objects
+    """
+    return date_to_string_array(day_of_year_to_date_array(days, year), date_format)
+
+
+def date_to_day_number_array(dates, origin=None) -> np.array:
+    """
+    Count the days elapsed since an origin, a continuous abscissa for the series spanning several years unlike the
+    day of the year.
+
+    Args:
+        dates (array-like of datetime64 or datetime): the dates
+        origin (datetime64 or datetime): the day 0, the first of the dates if None
+
+    Returns:
+        (np.array): the number of days since the origin of each date
+    """
+    days = np.asarray(dates, dtype='datetime64[D]')
+    origin = days.min() if origin is None else np.datetime64(origin, 'D')
+    return (days - origin).astype(int)
+
+
+def day_number_to_date_array(days, origin) -> np.array:
+    """
+    Inverse of :func:`date_to_day_number_array`.
+
+    Args:
+        days (array-like of int or float): the number of days since the origin, the decimal part is ignored
+        origin (datetime64 or datetime): the day 0
+
+    Returns:
+        (np.array): the dates as datetime64[D]
+    """
+    return np.datetime64(origin, 'D') + np.floor(np.asarray(days, dtype=float)).astype(int)
+
+
+def str_to_day_numbers(dates, date_format: str = format_mmddyy) -> tuple:
+    """
+    Compute the abscissa of dated series as the days since the first date, which unlike the day of the year does not
+    start again every January.
+
+    Args:
+        dates (array-like of str): the dates, e.g. the index of a days x entities frame
+        date_format (str): the format of the dates
+
+    Returns:
+        (tuple): tuple containing:
+
+            x (np.array) : the days since the first date, as float
+            origin (np.datetime64) : the first date, the day 0, see :func:`day_number_to_date_array`
+    """
+    days = str_to_datetime64_array(dates, date_format).astype('datetime64[D]')
+    origin = days.min()
+    return date_to_day_number_array(days, origin).astype(float), origin
@@ -0,0 +1,67 @@
+import concurrent.futures
+import threading
+import requests
+import requests.adapters
+
+# Download layer shared by the cache and the loaders: a single requests session keeping alive a pool of
+# connections per host, asking for compressed transfers, and a helper running the downloads (and the parsing of
+# the downloaded bytes) of many sources concurrently, so that a refresh takes about as long as its slowest file.
+
+# the number of connections kept alive per host, and the default number of concurrent downloads
+pool_size = 8
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def session() -> requests.Session:
+    """
+    Get the shared session, created on the first call.
+
+    Returns:
+        (requests.Session): the session, safe to use from the threads of :func:`map_concurrent`
+    """
+    global _session
+    with _session_lock:
+        if _session is None:
+            _session = requests.Session()
+            adapter = requests.adapters.HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+            _session.mount('http://', adapter)
+            _session.mount('https://', adapter)
+            _session.headers['Accept-Encoding'] = 'gzip, deflate'
+        return _session
+
+
+def close_session():
+    """
+    Close the connections of the shared session, the next call of :func:`session` creates a new one.
+    """
+    global _session
+    with _session_lock:
+        if _session is not None:
+            _session.close()
+            _session = None
+
+
+def map_concurrent(fun: callable, items: list, workers: int = None) -> list:
+    """
+    Call a function on each item in a pool of threads, e.g. to download and parse many sources at once.
+
+    The downloads wait on the network and the parsers of pandas release the GIL, hence threads are enough to overlap
+    them, and the parsed frames do not need to be copied back from other processes.
+
+    Args:
+        fun (callable): the function, called with each item
+        items (list): the items, e.g. the URLs of the sources
+        workers (int): the number of threads, by default one per item up to :code:`pool_size`
+
+    Returns:
+        (list): the results, in the order of the items, the first exception raised by a call is raised again
+    """
+    items = list(items)
+    if len(items) <= 1:
+        return [fun(item) for item in items]
+
+    workers = min(len(items), pool_size) if workers is None else workers
+    with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(fun, items))
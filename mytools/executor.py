@@ -0,0 +1,151 @@
+import concurrent.futures
+import math
+import os
+from typing import Union
+import numpy as np
+import pandas as pd
+import mytools.regression as reg
+import mytools.date as dt
+
+backends = ['serial', 'thread', 'process', 'dask']
+
+
+class SerialExecutor(concurrent.futures.Executor):
+    """
+    Executor running every task immediately in the calling thread, useful for debugging and as a baseline.
+    """
+
+    def submit(self, fn, *args, **kwargs):
+        future = concurrent.futures.Future()
+        try:
+            future.set_result(fn(*args, **kwargs))
+        except BaseException as e:
+            future.set_exception(e)
+        return future
+
+
+class DaskExecutor(concurrent.futures.Executor):
+    """
+    Executor submitting the tasks to a dask.distributed LocalCluster, which is shut down with the executor.
+    """
+
+    def __init__(self, workers: int = None):
+        try:
+            from dask.distributed import Client, LocalCluster
+        except ImportError as e:
+            raise ImportError('The dask backend requires dask.distributed (pip install "dask[distributed]")') from e
+
+        self.cluster = LocalCluster(n_workers=workers, threads_per_worker=1, processes=True)
+        self.client = Client(self.cluster)
+
+    def submit(self, fn, *args, **kwargs):
+        # dask would otherwise deduplicate the calls with identical arguments
+        return self.client.submit(fn, *args, pure=False, **kwargs)
+
+    def shutdown(self, wait=True, **kwargs):
+        self.client.close()
+        self.cluster.close()
+
+
+def get_executor(backend: str = 'serial', workers: int = None) -> concurrent.futures.Executor:
+    """
+    Create an executor for the fitting layer.
+
+    Args:
+        backend (str): one of :code:`backends`, i.e. 'serial', 'thread', 'process' or 'dask'
+        workers (int): the number of workers, if None the number of cores is used
+
+    Returns:
+        the executor, to be used as a context manager or shut down by the caller
+    """
+    if backend == 'serial':
+        return SerialExecutor()
+    if backend == 'thread':
+        return concurrent.futures.ThreadPoolExecutor(max_workers=workers)
+    if backend == 'process':
+        return concurrent.futures.ProcessPoolExecutor(max_workers=workers)
+    if backend == 'dask':
+        return DaskExecutor(workers)
+
+    raise ValueError('Unknown backend {}, valid values are {}'.format(backend, backends))
+
+
+def _fit_chunk(fit: callable, x: np.array, chunk: list, skip_errors: bool, fit_kwargs: dict) -> list:
+    results = []
+    for y in chunk:
+        valid = np.isfinite(y)
+        try:
+            results.append(fit(x[valid], y[valid], **fit_kwargs))
+        except (ValueError, np.linalg.LinAlgError):
+            if not skip_errors:
+                raise
+            results.append(None)
+    return results
+
+
+def fit_columns(x, data_frame: pd.DataFrame, fit: callable = reg.fit_sigmoid,
+                executor: concurrent.futures.Executor = None, chunk_size: int = None, skip_errors: bool = False,
+                **fit_kwargs) -> dict:
+    """
+    Fit a model to each column of a days x entities data frame, e.g. the output of
+    :code:`italy_regions_filter_by_category`, fanning out the fits on an executor.
+
+    The columns are sent to the workers in chunks to amortize the cost of the transfer, and the results are
+    collected in the order of the columns whatever the order of completion.
+
+    Args:
+        x (np.array): the abscissa, one value per row of the data frame
+        data_frame (pd.DataFrame): the data, one series per column, NaN values are ignored
+        fit (callable): the fitting function, e.g. :code:`fit_exponential`, :code:`fit_sigmoid` or
+            :code:`fit_logistic_distribution`, it must be picklable for the process and dask backends
+        executor (concurrent.futures.Executor): the executor running the fits, if None they are run serially
+        chunk_size (int): the number of columns per task, by default the columns are split in about 4 tasks per core
+        skip_errors (bool): return None for the columns that cannot be fitted instead of raising
+        **fit_kwargs: additional arguments passed to :code:`fit`
+
+    Returns:
+        (dict): the result of :code:`fit` for each column, in the order of the columns, the :class:`FitResult` are
+        labeled with the name of their column. With the process and dask backends the fit hooks (see
+        :code:`regression.add_fit_hook`) run in the workers, record the results returned here instead.
+    """
+    x = np.asarray(x, dtype=float)
+    columns = data_frame.columns.tolist()
+    values = data_frame.to_numpy(dtype=float)
+
+    if executor is None:
+        executor = SerialExecutor()
+    if chunk_size is None:
+        chunk_size = max(1, math.ceil(len(columns) / (4 * (os.cpu_count() or 1))))
+
+    chunks = [list(values[:, start:start + chunk_size].T) for start in range(0, len(columns), chunk_size)]
+    futures = [executor.submit(_fit_chunk, fit, x, chunk, skip_errors, fit_kwargs) for chunk in chunks]
+
+    results = [r for future in futures for r in future.result()]
+    for column, result in zip(columns, results):
+        if isinstance(result, reg.FitResult) and result.label is None:
+            result.label = column
+
+    return dict(zip(columns, results))
+
+
+def fit_data_frame(data_frame: pd.DataFrame, fit: Union[callable, dict], backend: str = 'serial', workers: int = None,
+                   **kwargs) -> dict:
+    """
+    Convenience wrapper of :func:`fit_columns` creating the executor and using the days since the first date of the
+    index as abscissa.
+
+    Args:
+        data_frame (pd.DataFrame): the data, indexed by date in dd/mm/yy format, one series per column
+        fit (callable or dict): the fitting function or a dict of named fitting functions sharing the same executor
+        backend (str): the executor backend, see :func:`get_executor`
+        workers (int): the number of workers
+        **kwargs: additional arguments passed to :func:`fit_columns`
+
+    Returns:
+        (dict): the results of each column or, if :code:`fit` is a dict, the results of each column for each name
+    """
+    x, _ = dt.str_to_day_numbers(data_frame.index, dt.format_ddmmyy)
+    with get_executor(backend, workers) as executor:
+        if isinstance(fit, dict):
+            return {name: fit_columns(x, data_frame, f, executor=executor, **kwargs) for name, f in fit.items()}
+        return fit_columns(x, data_frame, fit, executor=executor, **kwargs)
@@ -0,0 +1,270 @@
+import collections
+import hashlib
+import operator
+import os
+import pickle
+import sys
+import threading
+import types
+import numpy as np
+import scipy
+import mytools
+
+# Content-addressed cache of the fit results: the key is a hash of the fitted series, of the model functions, of the
+# solver options, of the code and settings of the solver modules and of the versions of the libraries, hence a
+# series whose data did not change is not fitted again. The entries are kept in memory for the session and in a
+# directory bounded in size, the least recently used entries being evicted first.
+
+# the cache is opt-in, the defaults can be set from the environment, e.g. MYTOOLS_FIT_CACHE=1 to enable it
+enabled = os.environ.get('MYTOOLS_FIT_CACHE', '0') not in ('', '0')
+cache_dir = os.environ.get('MYTOOLS_FIT_CACHE_DIR', os.path.join(os.path.expanduser('~'), '.cache', 'mytools', 'fits'))
+max_bytes = int(os.environ.get('MYTOOLS_FIT_CACHE_MAX_BYTES', 64 * 2 ** 20))
+memory_entries = 4096
+
+# bump when the layout of the entries changes
+format_version = 2
+
+# the modules whose functions and settings change the result of a fit, e.g. the guesses and the solvers
+solver_modules = ('mytools.regression', 'mytools.guess', 'mytools.kernels')
+
+# the types of the module attributes considered settings
+_setting_types = (bool, int, float, str, tuple, type(None))
+
+_memory = collections.OrderedDict()
+_lock = threading.Lock()
+_disk_bytes = {}
+_stats = {'hits': 0, 'misses': 0}
+_code_digests = {}
+_fingerprint = (None, None)
+
+
+def _code_digest(code: types.CodeType) -> str:
+    # the nested functions, e.g. the closures of the solvers, are code objects among the constants
+    digest = _code_digests.get(code)
+    if digest is None:
+        h = hashlib.sha1(code.co_code)
+        for const in code.co_consts:
+            h.update(_code_digest(const).encode('utf-8') if isinstance(const, types.CodeType) else
+                     repr(const).encode('utf-8'))
+        h.update(repr(code.co_names).encode('utf-8'))
+        digest = _code_digests[code] = h.hexdigest()
+    return digest
+
+
+def _function_id(fun: callable) -> str:
+    # the name alone does not tell apart two local functions, e.g. two guesses defined in different tests
+    code = getattr(fun, '__code__', None)
+    digest = _code_digest(code) if code else ''
+    return '{}.{}:{}'.format(getattr(fun, '__module__', ''), getattr(fun, '__qualname__', repr(fun)), digest)
+
+
+def _module_fingerprint(module: types.ModuleType) -> list:
+    """
+    List the code of the functions and classes defined in a module and the values of its settings.
+    """
+    fingerprint = []
+    for name, value in sorted(vars(module).items()):
+        if name.startswith('__'):
+            continue
+        if isinstance(value, types.FunctionType) and value.__module__ == module.__name__:
+            fingerprint.append((name, _code_digest(value.__code__)))
+        elif isinstance(value, type) and value.__module__ == module.__name__:
+            # the class and static methods and the properties wrap their functions
+            methods = [(attr, getattr(f, '__func__', getattr(f, 'fget', f))) for attr, f in sorted(vars(value).items())]
+            fingerprint.append((name, [(attr, _code_digest(f.__code__)) for attr, f in methods
+                                       if isinstance(f, types.FunctionType)]))
+        elif isinstance(value, _setting_types):
+            fingerprint.append((name, repr(value)))
+    return fingerprint
+
+
+def _solver_state(modules: list) -> list:
+    # the attributes of the modules and of their classes, a setting or a function replaced by another one changes it
+    state = []
+    for module in modules:
+        for value in vars(module).values():
+            state.append(value)
+            if isinstance(value, type) and value.__module__ == module.__name__:
+                state.extend(vars(value).values())
+    return state
+
+
+def _solver_fingerprint() -> str:
+    """
+    Hash the code and the settings of the solver modules, computed again only when one of their attributes changes.
+    """
+    global _fingerprint
+    modules = [sys.modules[name] for name in solver_modules if name in sys.modules]
+    state = _solver_state(modules)
+    memo_state, digest = _fingerprint
+    if memo_state is None or len(state) != len(memo_state) or not all(map(operator.is_, state, memo_state)):
+        digest = hashlib.sha1(repr([_module_fingerprint(module) for module in modules]).encode('utf-8')).hexdigest()
+        _fingerprint = state, digest
+    return digest
+
+
+def key(x: np.array, y: np.array, functions: tuple, options: dict) -> str:
+    """
+    Compute the key of a fit.
+
+    Args:
+        x (np.array): the abscissa of the series
+        y (np.array): the values of the series
+        functions (tuple): the functions defining the model, e.g. the model, residuals, guess and Jacobian
+        options (dict): the options of the solver that change its result
+
+    Returns:
+        (str): the hexadecimal digest
+    """
+    h = hashlib.sha1()
+    h.update(repr((format_version, mytools.__version__, np.__version__, scipy.__version__,
+                   [_function_id(f) for f in functions if f is not None], sorted(options.items()),
+                   _solver_fingerprint()))
+             .encode('utf-8'))
+    for arr in (x, y):
+        arr = np.ascontiguousarray(arr, dtype=float)
+        h.update(repr(arr.shape).encode('utf-8'))
+        h.update(arr.tobytes())
+    return h.hexdigest()
+
+
+def _path(entry_key: str, directory: str) -> str:
+    return os.path.join(directory, entry_key[:2], entry_key + '.pkl')
+
+
+def _remember(entry_key: str, entry: dict):
+    with _lock:
+        _memory[entry_key] = entry
+        _memory.move_to_end(entry_key)
+        while len(_memory) > memory_entries:
+            _memory.popitem(last=False)
+
+
+def get(entry_key: str, directory: str = None):
+    """
+    Look up a fit, first in memory then on disk.
+
+    Args:
+        entry_key (str): the key, see :func:`key`
+        directory (str): the cache directory, :code:`cache_dir` if None
+
+    Returns:
+        (dict): the stored entry, None if the fit is not cached
+    """
+    with _lock:
+        entry = _memory.get(entry_key)
+        if entry is not None:
+            _memory.move_to_end(entry_key)
+            _stats['hits'] += 1
+            return entry
+
+    path = _path(entry_key, cache_dir if directory is None else directory)
+    try:
+        with open(path, 'rb') as f:
+            entry = pickle.load(f)
+        # the modification time orders the entries for the eviction
+        os.utime(path)
+    except (OSError, EOFError, pickle.UnpicklingError):
+        with _lock:
+            _stats['misses'] += 1
+        return None
+
+    _remember(entry_key, entry)
+    with _lock:
+        _stats['hits'] += 1
+    return entry
+
+
+def put(entry_key: str, entry: dict, directory: str = None):
+    """
+    Store a fit in memory and on disk, evicting the least recently used entries above :code:`max_bytes`.
+
+    Args:
+        entry_key (str): the key, see :func:`key`
+        entry (dict): the result of the fit, made of picklable values
+        directory (str): the cache directory, :code:`cache_dir` if None
+    """
+    _remember(entry_key, entry)
+
+    directory = os.path.abspath(cache_dir if directory is None else directory)
+    path = _path(entry_key, directory)
+    tmp_path = '{}.{}.{}.tmp'.format(path, os.getpid(), threading.get_ident())
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(tmp_path, 'wb') as f:
+            pickle.dump(entry, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+        size = os.path.getsize(path)
+    except OSError:
+        # a read only or full disk only disables the persistence
+        return
+
+    with _lock:
+        if directory not in _disk_bytes:
+            _disk_bytes[directory] = sum(size for _, size, _ in _scan(directory))
+        else:
+            _disk_bytes[directory] += size
+        over = _disk_bytes[directory] > max_bytes
+    if over:
+        evict(directory)
+
+
+def _scan(directory: str) -> list:
+    entries = []
+    for root, _, names in os.walk(directory):
+        for name in names:
+            if name.endswith('.pkl'):
+                try:
+                    stat = os.stat(os.path.join(root, name))
+                except OSError:
+                    continue
+                entries.append((os.path.join(root, name), stat.st_size, stat.st_mtime))
+    return entries
+
+
+def evict(directory: str = None, target_bytes: int = None):
+    """
+    Delete the least recently used entries of the directory until its size is below a target.
+
+    Args:
+        directory (str): the cache directory, :code:`cache_dir` if None
+        target_bytes (int): the target size, by default 3/4 of :code:`max_bytes` to evict by batches
+    """
+    directory = os.path.abspath(cache_dir if directory is None else directory)
+    target_bytes = 3 * max_bytes // 4 if target_bytes is None else target_bytes
+
+    entries = sorted(_scan(directory), key=lambda e: e[2])
+    total = sum(size for _, size, _ in entries)
+    for path, size, _ in entries:
+        if total <= target_bytes:
+            break
+        try:
+            os.remove(path)
+        except OSError:
+            continue
+        total -= size
+    with _lock:
+        _disk_bytes[directory] = total
+
+
+def clear(directory: str = None, memory: bool = True):
+    """
+    Delete all the entries.
+
+    Args:
+        directory (str): the cache directory, :code:`cache_dir` if None
+        memory (bool): also forget the entries kept in memory
+    """
+    evict(directory, target_bytes=0)
+    if memory:
+        with _lock:
+            _memory.clear()
+
+
+def stats() -> dict:
+    """
+    Returns:
+        (dict): the number of hits and misses since the start of the session and the number of entries in memory
+    """
+    with _lock:
+        return dict(_stats, memory_entries=len(_memory))
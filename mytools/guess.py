@@ -0,0 +1,137 @@
+import numpy as np
+
+# Initial guesses derived from the data with closed form linear fits, to be used on normalized data (see
+# regression.normalize). Each guess falls back to the corresponding dumb guess when the data do not allow the
+# linearization (e.g. decreasing or flat series).
+
+# the margin below the minimum of the data used as offset, relative to the range of the data
+offset_margin = 0.05
+
+# the candidate asymptotes of the sigmoid, relative to the range of the data above the offset
+sigmoid_asymptote_factors = (1.05, 1.25, 1.5, 2.0, 3.0)
+
+
+def exponential_dumb_initial_guess(x, y) -> np.array:
+    return np.array([np.median(x), np.median(y), 1.0], dtype=float)
+
+
+def sigmoid_dumb_initial_guess(x, y) -> np.array:
+    return np.array([np.median(x), np.median(y), 1.0, 1.0], dtype=float)
+
+
+def _line_fit(x, z, w) -> tuple:
+    """
+    Weighted linear regression :math:`z = a x + b`, returns (a, b).
+    """
+    a, b = np.polyfit(x, z, 1, w=w)
+    return a, b
+
+
+def exponential_log_linear_guess(x, y) -> np.array:
+    """
+    Guess the parameters of :math:`f(x) = e^{k(x-x_0)} + y_0` with a linear regression of :math:`\\log(y - y_0)`.
+
+    :math:`y_0` is set slightly below the minimum of the data, then :math:`\\log(y - y_0) = kx - kx_0` is a line.
+    The regression is weighted by :math:`y - y_0` to compensate for the log compressing the large values.
+
+    Args:
+        x (np.array): the normalized abscissa
+        y (np.array): the normalized values
+
+    Returns:
+        p (np.array): the guess [x0, y0, k]
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    y_min, y_max = y.min(), y.max()
+    y0 = y_min - offset_margin * (y_max - y_min)
+
+    with np.errstate(all='ignore'):
+        u = y - y0
+        k, b = _line_fit(x, np.log(u), np.sqrt(u))
+        x0 = -b / k
+
+    p = np.array([x0, y0, k], dtype=float)
+    if not np.isfinite(p).all() or k <= 0:
+        return exponential_dumb_initial_guess(x, y)
+    return p
+
+
+def _sigmoid_logit_guess(x, y, y0) -> tuple:
+    """
+    Fit :math:`\\frac{c}{1 + e^{-k(x-x_0)}} + y_0` for a given offset by linear regressions of the logit of the data,
+    for several candidate asymptotes. Returns the best guess [x0, y0, c, k] and its sum of squared residuals.
+    """
+    u = y - y0
+    u_max = u.max()
+    best, best_err = None, np.inf
+    with np.errstate(all='ignore'):
+        for factor in sigmoid_asymptote_factors:
+            c = factor * u_max
+            ratio = u / (c - u)
+            k, b = _line_fit(x, np.log(ratio), np.sqrt(u * (c - u)))
+            if not np.isfinite([k, b]).all() or k <= 0:
+                continue
+            x0 = -b / k
+            err = np.sum((c / (1 + np.exp(-k * (x - x0))) - u) ** 2)
+            if err < best_err:
+                best, best_err = np.array([x0, y0, c, k], dtype=float), err
+
+    return best, best_err
+
+
+def sigmoid_logit_guess(x, y) -> np.array:
+    """
+    Guess the parameters of :math:`f(x) = \\frac{c}{1 + e^{-k(x-x_0)}}+y_0` with a linear regression of the logit
+    of the data.
+
+    :math:`y_0` is set slightly below the minimum of the data, then for a given asymptote :math:`c`
+    :math:`\\log\\frac{y - y_0}{c - (y - y_0)} = kx - kx_0` is a line. A few asymptotes above the data are tried
+    and the one with the smallest residuals is kept, which handles both saturated and still growing series.
+
+    Args:
+        x (np.array): the normalized abscissa
+        y (np.array): the normalized values
+
+    Returns:
+        p (np.array): the guess [x0, y0, c, k]
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    y_min, y_max = y.min(), y.max()
+
+    p, _ = _sigmoid_logit_guess(x, y, y_min - offset_margin * (y_max - y_min))
+    if p is None:
+        return sigmoid_dumb_initial_guess(x, y)
+    return p
+
+
+def logistic_distribution_logit_guess(x, y) -> np.array:
+    """
+    Guess the parameters of :math:`f(x) = \\frac{ck e^{-k(x-x_0)}}{(1 + e^{-k(x-x_0)})^2}+y_0`.
+
+    The integral of the logistic distribution above its offset is the sigmoid
+    :math:`\\frac{c}{1 + e^{-k(x-x_0)}}`, hence :math:`x_0`, :math:`c` and :math:`k` are guessed by
+    :func:`sigmoid_logit_guess` on the cumulative integral of the data above their minimum.
+
+    Args:
+        x (np.array): the normalized abscissa
+        y (np.array): the normalized values
+
+    Returns:
+        p (np.array): the guess [x0, y0, c, k]
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    y0 = y.min()
+
+    order = np.argsort(x)
+    xs, us = x[order], y[order] - y0
+    cumulative = np.concatenate([[0.0], np.cumsum(np.diff(xs) * (us[1:] + us[:-1]) / 2)])
+    # the integral starts at 0, keep the offset of the sigmoid slightly below
+    p, _ = _sigmoid_logit_guess(xs, cumulative, -offset_margin * cumulative.max())
+    if p is None or cumulative.max() <= 0:
+        return sigmoid_dumb_initial_guess(x, y)
+
+    x0, _, c, k = p
+    return np.array([x0, y0, c, k], dtype=float)
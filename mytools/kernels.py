@@ -0,0 +1,264 @@
+import numpy as np
+
+try:
+    import numba
+except ImportError:
+    numba = None
+
+# Residual and Jacobian kernels of the models writing into buffers owned by the kernel, so that the solvers calling
+# them hundreds of times per fit do not allocate the temporaries of the expression of the model at every call.
+# The residuals are returned in a new array, since the solvers keep the residuals of the previous iterate, while
+# the Jacobian is returned in the buffer of the kernel and is only valid until the next call.
+# The numba backend runs each kernel as a single loop over the samples, the numpy backend evaluates the model with
+# in-place operations on a scratch buffer, in the same order as the functions of the regression module.
+
+backends = ['numpy', 'numba']
+default_backend = 'numpy' if numba is None else 'numba'
+
+
+class Kernel:
+    """
+    The residuals and the Jacobian of a model, evaluated in preallocated buffers.
+
+    The parameters are either one array of :code:`num_params` values or a :code:`num_params x len(x)` array of the
+    parameters of each sample, as stacked by :code:`regression.least_squares_batch`. The buffers grow to the
+    largest number of samples seen so far.
+
+    Attributes:
+        num_params (int): the number of parameters of the model
+        backend (str): 'numpy' or 'numba'
+    """
+
+    num_params = 0
+    _jit = None
+
+    def __init__(self, size: int = 0, backend: str = None):
+        backend = default_backend if backend is None else backend
+        if backend not in backends:
+            raise ValueError('Unknown backend {}, valid values are {}'.format(backend, backends))
+        if backend == 'numba' and numba is None:
+            raise ImportError('The numba backend requires numba (pip install numba)')
+        self.backend = backend
+        self._scratch = np.empty((2, size))
+        self._jac = np.empty((size, self.num_params))
+
+    def _buffers(self, size: int) -> tuple:
+        if size > self._jac.shape[0]:
+            self._scratch = np.empty((2, size))
+            self._jac = np.empty((size, self.num_params))
+        return self._scratch[0, :size], self._scratch[1, :size], self._jac[:size]
+
+    def residuals(self, p, x, y) -> np.array:
+        """
+        Returns:
+            (np.array): the residuals :code:`y - f(x)`, in a new array
+        """
+        out = np.empty(np.shape(x))
+        if self.backend == 'numba':
+            self._jit[0](_as_columns(p), x, y, out)
+        else:
+            self._residuals(p, x, y, out, *self._buffers(out.size)[:2])
+        return out
+
+    def jacobian(self, p, x, y) -> np.array:
+        """
+        Returns:
+            (np.array): the len(x) x num_params Jacobian of the residuals, in the buffer of the kernel
+        """
+        a, b, jac = self._buffers(np.size(x))
+        if self.backend == 'numba':
+            self._jit[1](_as_columns(p), x, jac)
+        else:
+            self._jacobian(p, x, jac, a, b)
+        return jac
+
+    def _residuals(self, p, x, y, out, a, b):
+        raise NotImplementedError
+
+    def _jacobian(self, p, x, jac, a, b):
+        raise NotImplementedError
+
+
+def _as_columns(p) -> np.array:
+    # the jit kernels take the parameters of each sample as the columns of a 2d array, or a single column
+    p = np.asarray(p, dtype=float)
+    return p[:, np.newaxis] if p.ndim == 1 else p
+
+
+class ExponentialKernel(Kernel):
+    """
+    Kernels of :code:`regression.exponential_residuals` and :code:`regression.exponential_residuals_jacobian`.
+    """
+
+    num_params = 3
+
+    def _residuals(self, p, x, y, out, a, b):
+        x0, y0, k = p
+        np.subtract(x, x0, out=a)
+        a *= k
+        np.exp(a, out=a)
+        a += y0
+        np.subtract(y, a, out=out)
+
+    def _jacobian(self, p, x, jac, a, b):
+        x0, y0, k = p
+        # a = x - x0, b = e^{k(x-x0)}
+        np.subtract(x, x0, out=a)
+        np.multiply(a, k, out=b)
+        np.exp(b, out=b)
+        np.multiply(b, k, out=jac[:, 0])
+        jac[:, 1] = -1
+        np.multiply(a, b, out=jac[:, 2])
+        np.negative(jac[:, 2], out=jac[:, 2])
+
+
+class SigmoidKernel(Kernel):
+    """
+    Kernels of :code:`regression.sigmoid_residuals` and :code:`regression.sigmoid_residuals_jacobian`.
+    """
+
+    num_params = 4
+
+    def _residuals(self, p, x, y, out, a, b):
+        x0, y0, c, k = p
+        np.subtract(x0, x, out=a)
+        a *= k
+        np.exp(a, out=a)
+        a += 1
+        np.divide(c, a, out=a)
+        a += y0
+        np.subtract(y, a, out=out)
+
+    def _jacobian(self, p, x, jac, a, b):
+        x0, y0, c, k = p
+        # a = x - x0, b = s, jac[:, 2] = -s, then b = ds = s (1 - s)
+        np.subtract(x, x0, out=a)
+        np.multiply(a, k, out=b)
+        np.negative(b, out=b)
+        np.exp(b, out=b)
+        b += 1
+        np.divide(1, b, out=b)
+        np.negative(b, out=jac[:, 2])
+        np.subtract(1, b, out=jac[:, 0])
+        b *= jac[:, 0]
+        np.multiply(b, c, out=jac[:, 0])
+        jac[:, 0] *= k
+        jac[:, 1] = -1
+        np.multiply(a, b, out=jac[:, 3])
+        jac[:, 3] *= c
+        np.negative(jac[:, 3], out=jac[:, 3])
+
+
+class LogisticDistributionKernel(Kernel):
+    """
+    Kernels of :code:`regression.logistic_distribution_residuals` and
+    :code:`regression.logistic_distribution_residuals_jacobian`.
+    """
+
+    num_params = 4
+
+    def _residuals(self, p, x, y, out, a, b):
+        x0, y0, c, k = p
+        # a = e^{-k(x-x0)}, b = (e + 1)^2
+        np.subtract(x0, x, out=a)
+        a *= k
+        np.exp(a, out=a)
+        np.add(a, 1, out=b)
+        np.square(b, out=b)
+        a *= c
+        a *= k
+        a /= b
+        a += y0
+        np.subtract(y, a, out=out)
+
+    def _jacobian(self, p, x, jac, a, b):
+        x0, y0, c, k = p
+        # a = x - x0, b = s, jac[:, 2] = ds, then b = dds = ds (1 - 2 s)
+        np.subtract(x, x0, out=a)
+        np.multiply(a, k, out=b)
+        np.negative(b, out=b)
+        np.exp(b, out=b)
+        b += 1
+        np.divide(1, b, out=b)
+        np.subtract(1, b, out=jac[:, 2])
+        jac[:, 2] *= b
+        b *= -2
+        b += 1
+        b *= jac[:, 2]
+        # jac[:, 0] = c k^2 dds, jac[:, 3] = -c ds - c k (x - x0) dds, jac[:, 2] = -k ds
+        np.multiply(b, c, out=jac[:, 0])
+        jac[:, 0] *= k
+        a *= jac[:, 0]
+        jac[:, 0] *= k
+        jac[:, 1] = -1
+        np.multiply(jac[:, 2], c, out=jac[:, 3])
+        jac[:, 3] += a
+        np.negative(jac[:, 3], out=jac[:, 3])
+        jac[:, 2] *= k
+        np.negative(jac[:, 2], out=jac[:, 2])
+
+
+if numba is not None:
+    @numba.njit(cache=True)
+    def _exponential_residuals_jit(p, x, y, out):
+        step = 1 if p.shape[1] > 1 else 0
+        for i in range(x.size):
+            j = i * step
+            out[i] = y[i] - (np.exp(p[2, j] * (x[i] - p[0, j])) + p[1, j])
+
+    @numba.njit(cache=True)
+    def _exponential_jacobian_jit(p, x, jac):
+        step = 1 if p.shape[1] > 1 else 0
+        for i in range(x.size):
+            j = i * step
+            d = x[i] - p[0, j]
+            e = np.exp(p[2, j] * d)
+            jac[i, 0] = p[2, j] * e
+            jac[i, 1] = -1.0
+            jac[i, 2] = -d * e
+
+    @numba.njit(cache=True)
+    def _sigmoid_residuals_jit(p, x, y, out):
+        step = 1 if p.shape[1] > 1 else 0
+        for i in range(x.size):
+            j = i * step
+            out[i] = y[i] - (p[2, j] / (1 + np.exp(-p[3, j] * (x[i] - p[0, j]))) + p[1, j])
+
+    @numba.njit(cache=True)
+    def _sigmoid_jacobian_jit(p, x, jac):
+        step = 1 if p.shape[1] > 1 else 0
+        for i in range(x.size):
+            j = i * step
+            d = x[i] - p[0, j]
+            s = 1 / (1 + np.exp(-p[3, j] * d))
+            ds = s * (1 - s)
+            jac[i, 0] = p[2, j] * p[3, j] * ds
+            jac[i, 1] = -1.0
+            jac[i, 2] = -s
+            jac[i, 3] = -p[2, j] * d * ds
+
+    @numba.njit(cache=True)
+    def _logistic_distribution_residuals_jit(p, x, y, out):
+        step = 1 if p.shape[1] > 1 else 0
+        for i in range(x.size):
+            j = i * step
+            e = np.exp(-p[3, j] * (x[i] - p[0, j]))
+            out[i] = y[i] - (p[2, j] * p[3, j] * e / (e + 1) ** 2 + p[1, j])
+
+    @numba.njit(cache=True)
+    def _logistic_distribution_jacobian_jit(p, x, jac):
+        step = 1 if p.shape[1] > 1 else 0
+        for i in range(x.size):
+            j = i * step
+            d = x[i] - p[0, j]
+            s = 1 / (1 + np.exp(-p[3, j] * d))
+            ds = s * (1 - s)
+            dds = ds * (1 - 2 * s)
+            jac[i, 0] = p[2, j] * p[3, j] ** 2 * dds
+            jac[i, 1] = -1.0
+            jac[i, 2] = -p[3, j] * ds
+            jac[i, 3] = -p[2, j] * ds - p[2, j] * p[3, j] * d * dds
+
+    ExponentialKernel._jit = (_exponential_residuals_jit, _exponential_jacobian_jit)
+    SigmoidKernel._jit = (_sigmoid_residuals_jit, _sigmoid_jacobian_jit)
+    LogisticDistributionKernel._jit = (_logistic_distribution_residuals_jit, _logistic_distribution_jacobian_jit)
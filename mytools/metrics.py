@@ -0,0 +1,168 @@
+import numpy as np
+import pandas as pd
+import mytools.date as dt
+import mytools.regression as reg
+
+# Metrics derived from the cumulative days x entities frames, e.g. the output of italy_regions_filter_by_category or
+# world_load_cases, computed for all the entities at once on the whole matrix. A row of a metric only depends on the
+# rows of the previous window, hence appending new days only computes the new rows.
+
+metrics = ['values', 'increments', 'rolling_increments', 'growth_rate', 'doubling_time']
+
+def _compute(values: np.array, out: dict, start: int, stop: int, window: int):
+    """
+    Compute the rows [start, stop) of the metrics of the cumulative values into the arrays of :code:`out`.
+    """
+    first = max(start - window, 0)
+    v = values[first:stop]
+    offset = start - first
+
+    increments = np.full(v.shape, np.nan)
+    np.subtract(v[1:], v[:-1], out=increments[1:])
+    out['increments'][start:stop] = increments[offset:]
+
+    rolling = np.full(v.shape, np.nan)
+    if v.shape[0] >= window:
+        windows = np.lib.stride_tricks.sliding_window_view(increments, window, axis=0)
+        rolling[window - 1:] = windows.mean(axis=-1)
+    out['rolling_increments'][start:stop] = rolling[offset:]
+
+    ratio = np.full(v.shape, np.nan)
+    with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+        np.divide(v[window:], np.where(v[:-window] > 0, v[:-window], np.nan), out=ratio[window:])
+        out['growth_rate'][start:stop] = np.power(ratio[offset:], 1 / window) - 1
+        # the doubling time is only defined while the values grow
+        out['doubling_time'][start:stop] = np.where(ratio[offset:] > 1, window * np.log(2) / np.log(ratio[offset:]),
+                                                    np.nan)
+
+
+def derived_metrics(values, window: int = 7) -> dict:
+    """
+    Compute the derived metrics of cumulative values.
+
+    Args:
+        values (np.array): the days x entities matrix of cumulative values, e.g. the total cases, NaN if missing
+        window (int): the number of days of the rolling average and of the growth rate
+
+    Returns:
+        (dict): the days x entities matrix of each metric:
+
+            increments : the daily increments :math:`v_t - v_{t-1}`
+            rolling_increments : the average of the increments of the last :code:`window` days
+            growth_rate : the average daily growth rate over the last :code:`window` days,
+            :math:`(v_t / v_{t-w})^{1/w} - 1`
+            doubling_time : the number of days to double at the growth rate of the last :code:`window` days, NaN
+            when the values do not grow
+
+        the rows without enough previous days are NaN
+    """
+    values = np.asarray(values, dtype=float)
+    if values.ndim == 1:
+        values = values[:, np.newaxis]
+    out = {name: np.empty(values.shape) for name in metrics[1:]}
+    _compute(values, out, 0, values.shape[0], window)
+    out['values'] = values
+    return out
+
+
+class DerivedMetrics:
+    """
+    The derived metrics of a days x entities frame of cumulative values, updated as new days are appended.
+
+    :code:`m = DerivedMetrics(italy_regions_filter_by_category(regions, 'totale_casi'))`, then
+    :code:`m.frame('rolling_increments')`, :code:`m.fit('logistic_distribution', 'increments')`, and every day
+    :code:`m.append(new_rows)` which computes the metrics of the new days only, the storage growing geometrically.
+
+    Attributes:
+        window (int): the number of days of the rolling average and of the growth rate
+        entities (pd.Index): the names of the entities
+        dates (pd.Index): the dates in dd/mm/yy format
+    """
+
+    def __init__(self, data_frame: pd.DataFrame, window: int = 7):
+        self.window = window
+        self.entities = data_frame.columns
+        self.dates = pd.Index([])
+        self._arrays = {name: np.empty((0, len(self.entities))) for name in metrics}
+        self._fits = {}
+        self.append(data_frame)
+
+    def __len__(self):
+        return len(self.dates)
+
+    def _reserve(self, num_days: int):
+        capacity = self._arrays['values'].shape[0]
+        if num_days > capacity:
+            capacity = max(num_days, 2 * capacity)
+            for name, arr in self._arrays.items():
+                grown = np.empty((capacity, arr.shape[1]))
+                grown[:len(self)] = arr[:len(self)]
+                self._arrays[name] = grown
+
+    def append(self, data_frame: pd.DataFrame):
+        """
+        Append the next days and compute their metrics.
+
+        Args:
+            data_frame (pd.DataFrame): the cumulative values of the new days, indexed by date in dd/mm/yy format
+                following the last date, the missing entities are NaN
+        """
+        unknown = data_frame.columns.difference(self.entities)
+        if len(unknown):
+            raise ValueError('Unknown entities {}'.format(unknown.tolist()))
+        if self.dates.intersection(data_frame.index).size:
+            raise ValueError('The dates {} are already present'.format(
+                self.dates.intersection(data_frame.index).tolist()))
+
+        start, stop = len(self), len(self) + len(data_frame)
+        self._reserve(stop)
+        self._arrays['values'][start:stop] = data_frame.reindex(columns=self.entities).to_numpy(dtype=float)
+        self.dates = self.dates.append(pd.Index(data_frame.index))
+        _compute(self._arrays['values'], self._arrays, start, stop, self.window)
+
+    def array(self, metric: str) -> np.array:
+        """
+        Returns:
+            (np.array): the days x entities matrix of a metric, a read only view of the storage
+        """
+        if metric not in metrics:
+            raise ValueError('Unknown metric {}, valid values are {}'.format(metric, metrics))
+        view = self._arrays[metric][:len(self)]
+        view.flags.writeable = False
+        return view
+
+    def frame(self, metric: str) -> pd.DataFrame:
+        """
+        Returns:
+            (pd.DataFrame): the days x entities frame of a metric, indexed by date
+        """
+        return pd.DataFrame(self.array(metric), index=self.dates, columns=self.entities)
+
+    def fit(self, model: str = 'logistic_distribution', metric: str = 'increments', min_value: float = None,
+            warm: bool = True) -> list:
+        """
+        Fit a model to a metric of all the entities with the batch fitting functions of the regression module.
+
+        Args:
+            model (str): the name of the model, one of :code:`regression.models`
+            metric (str): the name of the metric, e.g. 'increments' for the logistic distribution or 'values' for
+                the sigmoid
+            min_value (float): if set, only the values above it are fitted
+            warm (bool): warm start from the previous fit of the same model and metric, e.g. before the last
+                :func:`append`
+
+        Returns:
+            (list): the :class:`FitResult` of each entity, labeled with its name, whose abscissa is the number of
+            days since the first date
+        """
+        fit_batch = reg.get_model(model).fit_batch
+        y_mat = self.array(metric)
+        if min_value is not None:
+            y_mat = np.where(y_mat > min_value, y_mat, np.nan)
+        # the origin is the first date, which does not change as the days are appended, for the warm starts
+        x, _ = dt.str_to_day_numbers(self.dates, dt.format_ddmmyy)
+
+        warm_start = self._fits.get((model, metric)) if warm else None
+        fits = fit_batch(x, y_mat, labels=self.entities.tolist(), warm_start=warm_start)
+        self._fits[model, metric] = fits
+        return fits
@@ -1,9 +1,11 @@
+import warnings
 import mytools.date as dt
 import mytools.regression as reg
 import pandas as pd
 import plotly.graph_objs as go
 import numpy as np
 import matplotlib.pyplot as plt
+from matplotlib.figure import Figure
 from typing import List
 
 
@@ -37,37 +39,146 @@ def iplot_add_log_scale_button(fig):
     return fig
 
 
+def lttb_indices(x: np.array, y: np.array, threshold: int) -> np.array:
+    """
+    Select the points to keep to downsample series with the Largest-Triangle-Three-Buckets algorithm.
+
+    The series are split in :code:`threshold - 2` buckets between their first and last points. In each bucket the
+    point forming the largest triangle with the point selected in the previous bucket and the average of the next
+    bucket is kept, which preserves the peaks and the shape of the series. Several series sharing the same abscissa
+    are downsampled at once, NaN values are never selected unless a bucket has no other value.
+
+    Args:
+        x (np.array): the increasing abscissa
+        y (np.array): the values, a series or a matrix with one series per column
+        threshold (int): the number of points to keep
+
+    Returns:
+        (np.array): the sorted indexes of the points to keep, with the shape of :code:`y` but :code:`threshold` rows
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    n = x.size
+    if threshold >= n or threshold < 3:
+        return np.broadcast_to(np.arange(n).reshape((n,) + (1,) * (y.ndim - 1)), y.shape).copy()
+
+    y_mat = y.reshape(n, -1)
+    columns = np.arange(y_mat.shape[1])
+    edges = np.floor(np.arange(threshold - 1) * (n - 2) / (threshold - 2)).astype(int) + 1
+    edges[-1] = n - 1
+
+    selected = np.empty((threshold, y_mat.shape[1]), dtype=int)
+    selected[0] = 0
+    selected[-1] = n - 1
+    a = np.zeros(y_mat.shape[1], dtype=int)
+    with warnings.catch_warnings(), np.errstate(invalid='ignore'):
+        # the mean of a bucket of NaN values
+        warnings.simplefilter('ignore', RuntimeWarning)
+        for i in range(threshold - 2):
+            start, end = edges[i], edges[i + 1]
+            next_end = edges[i + 2] if i + 2 < edges.size else n
+            avg_x = x[end:next_end].mean()
+            avg_y = np.nanmean(y_mat[end:next_end], axis=0)
+            avg_y = np.where(np.isnan(avg_y), y_mat[a, columns], avg_y)
+
+            x_a, y_a = x[a], y_mat[a, columns]
+            area = np.abs((x_a - avg_x) * (y_mat[start:end] - y_a) -
+                          (x_a - x[start:end, np.newaxis]) * (avg_y - y_a))
+            a = start + np.argmax(np.where(np.isnan(area), -np.inf, area), axis=0)
+            selected[i + 1] = a
+
+    return selected.reshape((threshold,) + y.shape[1:])
+
+
+def _column_traces(x, data_frame: pd.DataFrame, size: int, mode: str, webgl: bool, max_points: int) -> list:
+    """
+    Build one scatter trace per column, skipping the NaN values and downsampling the columns with more than
+    :code:`max_points` points with :func:`lttb_indices`.
+    """
+    trace = go.Scattergl if webgl else go.Scatter
+    x = np.asarray(x)
+    values = data_frame.to_numpy(dtype=float)
+    if max_points is not None and len(x) > max_points:
+        rows = lttb_indices(np.arange(len(x)), values, max_points)
+    else:
+        rows = np.broadcast_to(np.arange(len(x))[:, np.newaxis], values.shape)
+
+    traces = []
+    for j, col in enumerate(data_frame.columns):
+        index = np.unique(rows[:, j])
+        index = index[np.isfinite(values[index, j])]
+        traces.append(trace(x=x[index], y=values[index, j], name=str(col), mode=mode, marker=dict(size=size)))
+    return traces
+
+
+def _column_figure(x, data_frame: pd.DataFrame, title: str, size: int, yTitle: str, xTitle: str, mode: str,
+                   asFigure: bool, webgl: bool, max_points: int):
+    fig = go.Figure(data=_column_traces(x, data_frame, size, mode, webgl, max_points),
+                    layout=go.Layout(template='plotly_white', title=title, xaxis=dict(title=xTitle),
+                                     yaxis=dict(title=yTitle)))
+    if x.dtype == object:
+        # keep the order of the dates when some of them are dropped from the first traces
+        fig.update_xaxes(type='category', categoryorder='array', categoryarray=list(x))
+    fig = iplot_add_log_scale_button(fig)
+    if asFigure:
+        return fig
+    fig.show()
+
+
 def iplot_sync_plot(data_frame, title: str, min_value: int, size=4, yTitle='cases', mode='lines+markers',
-                    asFigure=True):
-    d = {}
-    for col in data_frame.columns:
-        condition = data_frame[col] >= min_value
-        d[col] = data_frame[col][condition].to_list()
+                    asFigure=True, webgl: bool = False, max_points: int = None):
+    """
+    Plot the columns of a data frame aligned on the day they reach a value.
 
-    new_data = pd.DataFrame(dict([(k, pd.Series(v)) for k, v in d.items()]))
-    x_title = 'days since the ' + str(min_value) + 'th case'
-    fig = new_data.iplot(theme="white", title=title, size=size, yTitle=yTitle, xTitle=x_title, mode=mode,
-                         asFigure=asFigure)
+    Args:
+        data_frame (pd.DataFrame): the data, one series per column
+        title (str): the title of the figure
+        min_value (int): the value the series are aligned on
+        size (int): the size of the markers
+        yTitle (str): the title of the y axis
+        mode (str): the plotly mode of the traces
+        asFigure (bool): return the figure, otherwise show it
+        webgl (bool): use WebGL traces, much faster for many or long series
+        max_points (int): the maximum number of points of a trace, longer series are downsampled with
+            :func:`lttb_indices`, no limit if None
 
-    return iplot_add_log_scale_button(fig)
+    Returns:
+        the plotly figure if :code:`asFigure`
+    """
+    values = data_frame.to_numpy(dtype=float)
+    aligned = np.full(values.shape, np.nan)
+    for j in range(values.shape[1]):
+        column = values[values[:, j] >= min_value, j]
+        aligned[:column.size, j] = column
+    last = np.flatnonzero(np.isfinite(aligned).any(axis=1))
+    new_data = pd.DataFrame(aligned[:last[-1] + 1 if last.size else 0], columns=data_frame.columns)
+
+    x_title = 'days since the ' + str(min_value) + 'th case'
+    return _column_figure(new_data.index.to_numpy(), new_data, title, size, yTitle, x_title, mode, asFigure, webgl,
+                          max_points)
 
 
 def iplot_comparative_plot(data_frame, title='Comparison of death cases', size=4, yTitle='cases', mode='lines+markers',
-                           asFigure=True):
-    fig = data_frame.iplot(theme="white", title=title, size=size, yTitle=yTitle, mode=mode, asFigure=asFigure)
+                           asFigure=True, webgl: bool = False, max_points: int = None):
+    """
+    Plot the columns of a data frame.
 
-    # days = data_frame.index
-    #
-    # fig.update_layout(
-    #     xaxis=dict(
-    #         tickmode='array',
-    #         tickvals=days,
-    #         ticktext=dt.day_of_year_to_string(days),
-    #         tickangle=90
-    #     )
-    # )
+    Args:
+        data_frame (pd.DataFrame): the data, indexed by date, one series per column
+        title (str): the title of the figure
+        size (int): the size of the markers
+        yTitle (str): the title of the y axis
+        mode (str): the plotly mode of the traces
+        asFigure (bool): return the figure, otherwise show it
+        webgl (bool): use WebGL traces, much faster for many or long series
+        max_points (int): the maximum number of points of a trace, longer series are downsampled with
+            :func:`lttb_indices`, no limit if None
 
-    return iplot_add_log_scale_button(fig)
+    Returns:
+        the plotly figure if :code:`asFigure`
+    """
+    return _column_figure(data_frame.index.to_numpy(), data_frame, title, size, yTitle, '', mode, asFigure, webgl,
+                          max_points)
 
 
 def get_days(data_frame: pd.DataFrame) -> List[int]:
@@ -85,6 +196,31 @@ def get_days(data_frame: pd.DataFrame) -> List[int]:
     return dt.str_to_day_of_year(dates, dt.format_ddmmyy)
 
 
+def get_day_numbers(data_frame: pd.DataFrame) -> tuple:
+    """
+    Compute the abscissa of a data frame as the days since its first date, unlike :func:`get_days` it does not start
+    again every January.
+
+    Args:
+        data_frame (pd.DataFrame): the data, indexed by date in dd/mm/yy format or with a 'day' column
+
+    Returns:
+        (tuple): tuple containing:
+
+            x (np.array): the days since the first date, or the 'day' column if any
+            origin (datetime64): the first date, None if the frame has a 'day' column
+    """
+    if 'day' in data_frame.columns:
+        return np.array(get_days(data_frame), dtype=float), None
+    return dt.str_to_day_numbers(data_frame.index, dt.format_ddmmyy)
+
+
+def _date_label(day, origin=None) -> str:
+    if origin is None:
+        return dt.day_of_year_to_date(day).strftime("%d %b")
+    return dt.day_number_to_date_array([day], origin)[0].astype(object).strftime("%d %b")
+
+
 def iplot_analysis_plot(data_frame: pd.DataFrame, title: str, exp_fitting: bool = True, sigm_fitting: bool = True,
                         log_fitting: bool = True):
     """
@@ -118,7 +254,7 @@ def iplot_analysis_plot(data_frame: pd.DataFrame, title: str, exp_fitting: bool
     columns = []
 
     if exp_fitting:
-        exp_model, exp_xp, exp_pxp = reg.fit_exponential(x_orig, y_orig, upper=1.25, verbose=True)
+        exp_model = reg.fit_exponential(x_orig, y_orig, upper=1.25, verbose=True).model
         f_days_exp = range(d_min - 4, d_max + 4, 1)
         f_exp = reg.exponential(exp_model, f_days_exp)
         f_df_exp = pd.DataFrame({day_col: f_days_exp, exp_col: f_exp})
@@ -127,7 +263,7 @@ def iplot_analysis_plot(data_frame: pd.DataFrame, title: str, exp_fitting: bool
         columns = columns + [exp_col]
 
     if sigm_fitting:
-        sigm_model, xp, pxp = reg.fit_sigmoid(x_orig, y_orig, verbose=True)
+        sigm_model = reg.fit_sigmoid(x_orig, y_orig, verbose=True).model
         flex = reg.sigmoid_get_flex(sigm_model)
         f_days_sigm = range(d_min - 4, d_max + 20, 1)
         f_sigm = reg.sigmoid(sigm_model, f_days_sigm)
@@ -137,7 +273,7 @@ def iplot_analysis_plot(data_frame: pd.DataFrame, title: str, exp_fitting: bool
         columns = columns + [sigm_col]
 
     if log_fitting:
-        log_model, log_xp, log_pxp = reg.fit_logistic_distribution(x_orig, y_orig, verbose=True)
+        log_model = reg.fit_logistic_distribution(x_orig, y_orig, verbose=True).model
         peak = reg.logistic_distribution_get_max(log_model)
         f_days_log = range(d_min - 4, d_max + 20, 1)
         f_log = reg.logistic_distribution(log_model, f_days_log)
@@ -175,10 +311,41 @@ def iplot_analysis_plot(data_frame: pd.DataFrame, title: str, exp_fitting: bool
     return fig
 
 
-def matplot_analysis_plot(x_orig, y_orig, title: str, category: str, exp_fitting: bool = True,
-                          sigm_fitting: bool = True, log_fitting: bool = True, verbose: bool = True):
+def _set_date_ticks(ax, origin=None):
+    locs = ax.get_xticks()
+    ax.set_xticks(locs.tolist())
+    ax.set_xticklabels([_date_label(v, origin) for v in locs.tolist()])
+
+
+def matplot_analysis_figure(x_orig, y_orig, title: str, category: str, exp_fitting: bool = True,
+                            sigm_fitting: bool = True, log_fitting: bool = True, verbose: bool = True,
+                            fig: Figure = None, origin=None) -> Figure:
+    """
+    Draw the data with the fitted models on an explicit figure, without using the global state of pyplot, e.g. to
+    render it headless (see :code:`mytools.report`).
+
+    Args:
+        x_orig (np.array): the days of the data
+        y_orig (np.array): the values of the data
+        title (str): the title of the figure
+        category (str): the label of the data
+        exp_fitting (bool): draw the exponential model
+        sigm_fitting (bool): draw the sigmoid model
+        log_fitting (bool): draw the logistic distribution model
+        verbose (bool): print the fitted parameters and residuals
+        fig (Figure): the figure to draw on, a new figure is created if None
+        origin (datetime64 or str): the date of the day 0 if the days are counted from it, the days are days of the
+            year if None
+
+    Returns:
+        (Figure): the figure
+    """
+    if fig is None:
+        fig = Figure()
+    ax = fig.add_subplot()
+
     if exp_fitting:
-        exp_model, exp_xp, exp_pxp = reg.fit_exponential(x_orig, y_orig, verbose=True, upper=1.25)
+        exp_model, exp_xp, exp_pxp = reg.fit_exponential(x_orig, y_orig, verbose=verbose, upper=1.25)
         exp_res = reg.exponential_residuals(p=exp_model, x=x_orig, y=y_orig)
         exp_stderr = np.std(exp_res)
         if verbose:
@@ -186,7 +353,7 @@ def matplot_analysis_plot(x_orig, y_orig, title: str, category: str, exp_fitting
             print('std err exp: ' + str(exp_stderr))
 
     if sigm_fitting:
-        sigm_model, xp, pxp = reg.fit_sigmoid(x_orig, y_orig, verbose=True)
+        sigm_model, xp, pxp = reg.fit_sigmoid(x_orig, y_orig, verbose=verbose)
         sigm_res = reg.sigmoid_residuals(p=sigm_model, x=x_orig, y=y_orig)
         sigm_stderr = np.std(sigm_res)
         flex = reg.sigmoid_get_flex(sigm_model)
@@ -195,7 +362,7 @@ def matplot_analysis_plot(x_orig, y_orig, title: str, category: str, exp_fitting
             print('std err sigm: ' + str(sigm_stderr))
 
     if log_fitting:
-        log_model, der_xp, der_pxp = reg.fit_logistic_distribution(x_orig, y_orig, verbose=True)
+        log_model, der_xp, der_pxp = reg.fit_logistic_distribution(x_orig, y_orig, verbose=verbose)
         log_res = reg.logistic_distribution_residuals(p=log_model, x=x_orig, y=y_orig)
         log_stderr = np.std(log_res)
         peak = reg.logistic_distribution_get_max(log_model)
@@ -205,55 +372,79 @@ def matplot_analysis_plot(x_orig, y_orig, title: str, category: str, exp_fitting
 
     # Plot the results
     if sigm_fitting:
-        plt.plot(xp, pxp, '-', label='fitting sigmoid (stderr = %.2f' % sigm_stderr + ')')
+        ax.plot(xp, pxp, '-', label='fitting sigmoid (stderr = %.2f' % sigm_stderr + ')')
     if exp_fitting:
-        plt.plot(exp_xp, exp_pxp, '-', label='fitting exponential (stderr = %.2f' % exp_stderr + ')')
+        ax.plot(exp_xp, exp_pxp, '-', label='fitting exponential (stderr = %.2f' % exp_stderr + ')')
     if log_fitting:
-        plt.plot(der_xp, der_pxp, '-', label='fitting logistic distribution (stderr = %.2f' % log_stderr + ')')
+        ax.plot(der_xp, der_pxp, '-', label='fitting logistic distribution (stderr = %.2f' % log_stderr + ')')
 
-    plt.plot(x_orig, y_orig, '.', label=category)
+    ax.plot(x_orig, y_orig, '.', label=category)
     if sigm_fitting:
-        plt.plot(flex[0], flex[1], '.',
-                 label='Inflection point (' + dt.day_of_year_to_date(flex[0]).strftime("%d %b") + ' ' + '{:.2f}'.format(
-                     flex[1]) + ' cases)')
+        ax.plot(flex[0], flex[1], '.',
+                label='Inflection point (' + _date_label(flex[0], origin) + ' ' + '{:.2f}'.format(
+                    flex[1]) + ' cases)')
     if log_fitting:
-        plt.plot(peak[0], peak[1], '.',
-                 label='peak (' + dt.day_of_year_to_date(peak[0]).strftime("%d %b") + ' ' + '{:.2f}'.format(
-                     peak[1]) + ' cases)')
-
-    locs, labels = plt.xticks()
-    a = list((dt.day_of_year_to_date(v)).strftime("%d %b") for v in locs.tolist())
-    plt.xticks(ticks=locs.tolist(), labels=a)
-
-    plt.ylabel('cases', rotation='vertical')
-    plt.grid(True)
-    plt.title(title)
-    plt.legend(loc='upper left')
-    # plt.yscale('log')
+        ax.plot(peak[0], peak[1], '.',
+                label='peak (' + _date_label(peak[0], origin) + ' ' + '{:.2f}'.format(
+                    peak[1]) + ' cases)')
+
+    _set_date_ticks(ax, origin)
+
+    ax.set_ylabel('cases', rotation='vertical')
+    ax.grid(True)
+    ax.set_title(title)
+    ax.legend(loc='upper left')
+
+    return fig
+
+
+def matplot_analysis_plot(x_orig, y_orig, title: str, category: str, exp_fitting: bool = True,
+                          sigm_fitting: bool = True, log_fitting: bool = True, verbose: bool = True):
+    matplot_analysis_figure(x_orig, y_orig, title, category, exp_fitting=exp_fitting, sigm_fitting=sigm_fitting,
+                            log_fitting=log_fitting, verbose=verbose, fig=plt.figure())
     plt.show()
 
 
-def matplot_comparative_plot(data_frame: pd.DataFrame, title: str, min_common: int = None):
-    x_orig = np.array(get_days(data_frame))
+def matplot_comparative_figure(data_frame: pd.DataFrame, title: str, min_common: int = None,
+                               fig: Figure = None) -> Figure:
+    """
+    Draw the columns of a data frame on an explicit figure, without using the global state of pyplot.
+
+    Args:
+        data_frame (pd.DataFrame): the data, indexed by date in dd/mm/yy format, one series per column
+        title (str): the title of the figure
+        min_common (int): if set, align the series on the day they reach this value, with a log scale
+        fig (Figure): the figure to draw on, a new figure is created if None
+
+    Returns:
+        (Figure): the figure
+    """
+    if fig is None:
+        fig = Figure()
+    ax = fig.add_subplot()
+
+    x_orig, origin = get_day_numbers(data_frame)
     if min_common:
-        for reg in data_frame.columns.tolist():
-            condition = data_frame[reg] >= min_common
-            plt.plot(data_frame[reg][condition].tolist(), '.-', label=reg)
-        plt.xlabel('days since the ' + str(min_common) + 'th')
-        plt.yscale('log')
+        for col in data_frame.columns.tolist():
+            condition = data_frame[col] >= min_common
+            ax.plot(data_frame[col][condition].tolist(), '.-', label=col)
+        ax.set_xlabel('days since the ' + str(min_common) + 'th')
+        ax.set_yscale('log')
     else:
-        for reg in data_frame.columns.tolist():
-            plt.plot(x_orig, data_frame[reg], '.-', label=reg)
-
-        locs, labels = plt.xticks()
-        a = list((dt.day_of_year_to_date(v)).strftime("%d %b") for v in locs.tolist())
-        plt.xticks(ticks=locs.tolist(), labels=a)
-
-    plt.ylabel('cases', rotation='vertical')
-    plt.grid(True)
-    plt.title(title)
-    # plt.legend(loc='upper left')
-    plt.legend(bbox_to_anchor=(0., 1.02, 1., .102), loc=3,
-               ncol=4, mode="expand", borderaxespad=0.)
-    # plt.yscale('log')
+        for col in data_frame.columns.tolist():
+            ax.plot(x_orig, data_frame[col], '.-', label=col)
+
+        _set_date_ticks(ax, origin)
+
+    ax.set_ylabel('cases', rotation='vertical')
+    ax.grid(True)
+    ax.set_title(title)
+    ax.legend(bbox_to_anchor=(0., 1.02, 1., .102), loc=3,
+              ncol=4, mode="expand", borderaxespad=0.)
+
+    return fig
+
+
+def matplot_comparative_plot(data_frame: pd.DataFrame, title: str, min_common: int = None):
+    matplot_comparative_figure(data_frame, title, min_common=min_common, fig=plt.figure())
     plt.show()
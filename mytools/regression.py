@@ -1,6 +1,13 @@
+import collections
+import time
+import warnings
 import numpy as np
 import scipy.optimize
+import scipy.sparse
 import mytools.date as dt
+import mytools.fitcache as fitcache
+import mytools.guess as gs
+import mytools.kernels as kn
 from math import sqrt, log
 
 
@@ -54,10 +61,26 @@ def exponential_residuals(p, x, y):
     return y - exponential(p, x)
 
 
-def exponential_dumb_initial_guess(x, y) -> np.array:
+def exponential_residuals_jacobian(p, x, y):
+    """
+    Evaluate the Jacobian of :func:`exponential_residuals` w.r.t. the parameters.
 
-    print(np.array([np.median(x), np.median(y), 1.0], dtype=float))
-    return np.array([np.median(x), np.median(y), 1.0], dtype=float)
+    Args:
+        p (np.array): the array of parameters of the exponential [x0, y0, k]
+        x (np.array): an array of values
+        y (np.array): an array of expected values
+
+    Returns:
+        jac (np.array): the len(x) x 3 Jacobian, one column per parameter
+
+    """
+    x0, y0, k = p
+    e = np.exp(k * (x - x0))
+    return _stack_jacobian(k * e, -1, -(x - x0) * e)
+
+
+# the guesses from the medians of the data, defined in the guess module
+exponential_dumb_initial_guess = gs.exponential_dumb_initial_guess
 
 
 def denormalize_exponential_params(p, t_x, t_y) -> tuple:
@@ -70,12 +93,15 @@ def denormalize_exponential_params(p, t_x, t_y) -> tuple:
     return x0r, y0r, kr
 
 
-def fit_exponential(x, y, verbose: bool = False, lower=-0.5, upper=2.5) -> tuple:
-    model, xp, pxp = fit_model(x, y, exponential, exponential_residuals, denormalize_exponential_params,
-                               exponential_dumb_initial_guess, lower=lower, upper=upper, verbose=verbose)
+def fit_exponential(x, y, verbose: bool = False, lower=-0.5, upper=2.5, check_jac: bool = False,
+                    label=None, num_starts: int = 1) -> 'FitResult':
+    result = fit_model(x, y, exponential, exponential_residuals, denormalize_exponential_params,
+                       gs.exponential_log_linear_guess, lower=lower, upper=upper, verbose=verbose,
+                       jac_fun=exponential_residuals_jacobian, check_jac=check_jac, label=label,
+                       num_starts=num_starts)
 
     if verbose:
-        x0, y0, k = model
+        x0, y0, k = result.model
         print('''\
             Exponential model
             x0 = {x0}
@@ -83,7 +109,7 @@ def fit_exponential(x, y, verbose: bool = False, lower=-0.5, upper=2.5) -> tuple
             k = {k}
             '''.format(x0=x0, y0=y0, k=k))
 
-    return model, xp, pxp
+    return result
 
 
 def sigmoid(p: np.array, x: np.array) -> np.array:
@@ -162,6 +188,25 @@ def sigmoid_residuals(p, x, y):
     return y - sigmoid(p, x)
 
 
+def sigmoid_residuals_jacobian(p, x, y):
+    """
+    Evaluate the Jacobian of :func:`sigmoid_residuals` w.r.t. the parameters.
+
+    Args:
+        p (np.array): the array of parameters of the sigmoid [x0, y0, c, k]
+        x (np.array): an array of values
+        y (np.array): an array of expected values
+
+    Returns:
+        jac (np.array): the len(x) x 4 Jacobian, one column per parameter
+
+    """
+    x0, y0, c, k = p
+    s = 1 / (1 + np.exp(-k * (x - x0)))
+    ds = s * (1 - s)
+    return _stack_jacobian(c * k * ds, -1, -s, -c * (x - x0) * ds)
+
+
 def normalize(arr: np.array, lower: float = 0.0, upper: float = 1.0) -> tuple:
     """
     Normalize the input data in a range given by [lower, upper]
@@ -206,25 +251,920 @@ def normalize_back(arr: np.array, t: np.array) -> np.array:
     return (arr - t[1]) / t[0]
 
 
+def _stack_jacobian(*columns) -> np.array:
+    """
+    Stack the derivatives w.r.t. each parameter as the columns of a Jacobian, broadcasting the constant ones.
+    """
+    return np.stack(np.broadcast_arrays(*columns), axis=-1).astype(float)
+
+
+def check_jacobian(residual_fun: callable, jac_fun: callable, p, x, y) -> float:
+    """
+    Compare an analytic Jacobian against its central finite differences approximation.
+
+    Args:
+        residual_fun (callable): the residual function
+        jac_fun (callable): the function evaluating the Jacobian of the residuals
+        p (np.array): the parameters where to compare the Jacobians
+        x (np.array): an array of values
+        y (np.array): an array of expected values
+
+    Returns:
+        error (float): the largest difference between the two Jacobians, relative to the largest derivative
+
+    """
+    p = np.asarray(p, dtype=float)
+    jac = jac_fun(p, x, y)
+    approx = np.empty_like(jac)
+    for i in range(p.size):
+        h = np.cbrt(np.finfo(float).eps) * max(1.0, abs(p[i]))
+        step = np.zeros_like(p)
+        step[i] = h
+        approx[:, i] = (residual_fun(p + step, x, y) - residual_fun(p - step, x, y)) / (2 * h)
+
+    return np.max(np.abs(jac - approx)) / max(np.max(np.abs(approx)), np.finfo(float).tiny)
+
+
+# the default number of points of the fitted curves
+curve_resolution = 1500
+
+
+class FittedCurve:
+    """
+    A fitted model evaluable on demand, in the data space.
+
+    The curve keeps the normalized parameters and transformations of the fit, hence :meth:`sample` gives the same
+    points as the curves computed eagerly by the previous versions, without allocating anything until it is called.
+
+    Attributes:
+        fun (callable): the model function
+        p (np.array): the parameters in the normalized space
+        t_x (np.array): the transformation of the abscissa to the normalized space
+        t_y (np.array): the transformation of the values to the normalized space
+        lower (float): the default lower bound of the sampled range, in the normalized space
+        upper (float): the default upper bound of the sampled range, in the normalized space
+    """
+
+    __slots__ = ('fun', 'p', 't_x', 't_y', 'lower', 'upper')
+
+    def __init__(self, fun: callable, p, t_x, t_y, lower: float = -0.5, upper: float = 2.5):
+        self.fun = fun
+        self.p = p
+        self.t_x = t_x
+        self.t_y = t_y
+        self.lower = lower
+        self.upper = upper
+
+    def __call__(self, x) -> np.array:
+        """
+        Evaluate the curve.
+
+        Args:
+            x (np.array): the abscissa in the data space, e.g. days of the year
+
+        Returns:
+            (np.array): the values of the curve
+        """
+        x = np.asarray(x, dtype=float)
+        return normalize_back(self.fun(self.p, self.t_x[0] * x + self.t_x[1]), self.t_y)
+
+    def sample(self, num: int = None, lower: float = None, upper: float = None) -> tuple:
+        """
+        Sample the curve on evenly spaced points of a normalized range, i.e. relative to the range of the data.
+
+        Args:
+            num (int): the number of points, :code:`curve_resolution` if None
+            lower (float): the lower bound of the range in the normalized space, the one of the fit if None
+            upper (float): the upper bound of the range in the normalized space, the one of the fit if None
+
+        Returns:
+            (tuple): tuple containing:
+
+                xp (np.array) : the abscissa of the points
+                pxp (np.array) : the values of the curve
+        """
+        xp = np.linspace(self.lower if lower is None else lower, self.upper if upper is None else upper,
+                         curve_resolution if num is None else num)
+        return normalize_back(xp, self.t_x), normalize_back(self.fun(self.p, xp), self.t_y)
+
+    def sample_range(self, x_min: float, x_max: float, num: int = None) -> tuple:
+        """
+        Sample the curve on evenly spaced points of a range of the data space.
+
+        Args:
+            x_min (float): the first abscissa, e.g. a day of the year
+            x_max (float): the last abscissa
+            num (int): the number of points, :code:`curve_resolution` if None
+
+        Returns:
+            (tuple): tuple containing:
+
+                xp (np.array) : the abscissa of the points
+                pxp (np.array) : the values of the curve
+        """
+        xp = np.linspace(x_min, x_max, curve_resolution if num is None else num)
+        return xp, self(xp)
+
+
+class FitResult:
+    """
+    The result of a fit: the parameters of the model, its fitted curve and the diagnostics of the solver.
+
+    It unpacks and indexes as the :code:`(model, xp, pxp)` tuple returned by the fitting functions of the previous
+    versions, e.g. :code:`model, xp, pxp = fit_sigmoid(x, y)` still works. The points of the curve are only computed
+    when :code:`xp` or :code:`pxp` are accessed, callers needing the parameters only should use :code:`model`, and
+    callers needing other points should evaluate :code:`curve`.
+
+    Attributes:
+        model (tuple): the parameters of the model in the data space
+        curve (FittedCurve): the fitted curve, evaluable on any abscissa
+        xp (np.array): the abscissa of the fitted curve, sampled with the default resolution and range
+        pxp (np.array): the fitted curve, sampled with the default resolution and range
+        p (np.array): the parameters in the normalized space
+        t_x (np.array): the transformation of the abscissa to the normalized space
+        t_y (np.array): the transformation of the values to the normalized space
+        cost (float): the final value of the robust cost in the normalized space
+        nfev (int): the number of evaluations of the residuals
+        njev (int): the number of evaluations of the Jacobian
+        status (int): the reason of termination as in :code:`scipy.optimize.least_squares`
+        success (bool): True if one of the convergence criteria is satisfied
+        message (str): the verbal description of the termination reason
+        wall_time (float): the duration of the fit in seconds, shared by all the series of a batch fit
+        label: an optional name of the fitted series, e.g. the name of the entity
+    """
+
+    __slots__ = ('model', 'curve', '_points', 'p', 't_x', 't_y', 'cost', 'nfev', 'njev', 'status', 'success',
+                 'message', 'wall_time', 'label')
+
+    def __init__(self, model, curve: FittedCurve, p=None, t_x=None, t_y=None, cost=np.nan, nfev=0, njev=0, status=0,
+                 success=False, message='', wall_time=0.0, label=None):
+        self.model = model
+        self.curve = curve
+        self._points = None
+        self.p = p
+        self.t_x = t_x
+        self.t_y = t_y
+        self.cost = cost
+        self.nfev = nfev
+        self.njev = njev
+        self.status = status
+        self.success = success
+        self.message = message
+        self.wall_time = wall_time
+        self.label = label
+
+    @property
+    def xp(self) -> np.array:
+        if self._points is None:
+            self._points = self.curve.sample()
+        return self._points[0]
+
+    @property
+    def pxp(self) -> np.array:
+        if self._points is None:
+            self._points = self.curve.sample()
+        return self._points[1]
+
+    def __iter__(self):
+        return iter((self.model, self.xp, self.pxp))
+
+    def __getitem__(self, index):
+        return (self.model, self.xp, self.pxp)[index]
+
+    def __len__(self):
+        return 3
+
+    def __repr__(self):
+        return 'FitResult(label={!r}, model={}, cost={:.6g}, nfev={}, njev={}, status={}, wall_time={:.4f})'.format(
+            self.label, self.model, self.cost, self.nfev, self.njev, self.status, self.wall_time)
+
+
+# the functions called with each FitResult once a fit is completed, see add_fit_hook
+fit_hooks = []
+
+
+def add_fit_hook(hook: callable):
+    """
+    Register a function called with the :class:`FitResult` of every completed fit, e.g. a :class:`FitTelemetry`.
+
+    Args:
+        hook (callable): the function, called as :code:`hook(result)`
+    """
+    fit_hooks.append(hook)
+
+
+def remove_fit_hook(hook: callable):
+    if hook in fit_hooks:
+        fit_hooks.remove(hook)
+
+
+def _notify_fit_hooks(result: FitResult) -> FitResult:
+    for hook in fit_hooks:
+        hook(result)
+    return result
+
+
+class FitTelemetry:
+    """
+    Collect the diagnostics of the fits, to find the series which are slow to converge in a batch run.
+
+    :code:`with FitTelemetry() as telemetry:` registers it as a fit hook for the duration of the block, then
+    :code:`telemetry.slowest(10)` or :code:`telemetry.summary()`. It can also be called directly with a result.
+    """
+
+    def __init__(self):
+        self.results = []
+
+    def __call__(self, result: FitResult):
+        self.record(result)
+
+    def __enter__(self):
+        add_fit_hook(self)
+        return self
+
+    def __exit__(self, *args):
+        remove_fit_hook(self)
+
+    def record(self, result: FitResult):
+        self.results.append(result)
+
+    def slowest(self, n: int = 10, key: str = 'nfev') -> list:
+        """
+        Return the results with the largest value of an attribute.
+
+        Args:
+            n (int): the number of results
+            key (str): the attribute, e.g. 'nfev', 'njev', 'cost' or 'wall_time'
+
+        Returns:
+            (list): the n results in decreasing order of the attribute
+        """
+        return sorted(self.results, key=lambda r: getattr(r, key), reverse=True)[:n]
+
+    def summary(self) -> dict:
+        """
+        Summarize the collected diagnostics.
+
+        Returns:
+            (dict): the number of fits and of failures, the total and maximum numbers of evaluations and wall time
+        """
+        nfev = np.array([r.nfev for r in self.results], dtype=float)
+        wall_time = np.array([r.wall_time for r in self.results], dtype=float)
+        return {'fits': len(self.results), 'failures': sum(not r.success for r in self.results),
+                'nfev': int(nfev.sum()), 'max_nfev': int(nfev.max(initial=0)),
+                'njev': sum(r.njev for r in self.results), 'wall_time': float(wall_time.sum()),
+                'max_wall_time': float(wall_time.max(initial=0))}
+
+
+def _kernel_functions(residual_fun: callable, jac_fun: callable, size: int) -> tuple:
+    """
+    Replace the residuals and the Jacobian of a model by the kernels evaluating them in preallocated buffers, if the
+    model has kernels, see :code:`kernels`.
+
+    Returns:
+        (tuple): the residual function and the Jacobian, unchanged if the model has no kernels or if
+        :code:`use_kernels` is False
+    """
+    if not use_kernels or residual_fun not in model_kernels:
+        return residual_fun, jac_fun
+    model_jac_fun, kernel_class = model_kernels[residual_fun]
+    kernel = kernel_class(size)
+    return kernel.residuals, kernel.jacobian if jac_fun is model_jac_fun else jac_fun
+
+
+def _solve_normalized(residual_fun: callable, p0, x_norm, y_norm, jac_fun: callable = None, verbose=False):
+    residual_fun, jac_fun = _kernel_functions(residual_fun, jac_fun, np.size(x_norm))
+    return scipy.optimize.least_squares(residual_fun, p0, jac=jac_fun if jac_fun is not None else '2-point',
+                                        args=(x_norm, y_norm), verbose=verbose, loss='soft_l1')
+
+
+# the fields of a FitResult stored by the fit cache, the curve is rebuilt from the parameters
+_cached_fields = ('model', 'p', 't_x', 't_y', 'cost', 'nfev', 'njev', 'status', 'success', 'message')
+
+
+def _cached_fit_result(entry: dict, fun: callable, lower, upper, label, wall_time: float) -> FitResult:
+    """
+    Rebuild a FitResult from an entry of the fit cache, its wall time being the one of the lookup.
+    """
+    entry = dict(entry, p=entry['p'].copy(), t_x=entry['t_x'].copy(), t_y=entry['t_y'].copy())
+    curve = FittedCurve(fun, entry['p'], entry['t_x'], entry['t_y'], lower, upper)
+    return FitResult(curve=curve, wall_time=wall_time, label=label, **entry)
+
+
+def _fit_result(model, curve, result, t_x, t_y, wall_time: float, label=None) -> FitResult:
+    return FitResult(model, curve, p=result.x, t_x=t_x, t_y=t_y, cost=result.cost, nfev=result.nfev,
+                     njev=result.njev or 0, status=result.status, success=result.success, message=result.message,
+                     wall_time=wall_time, label=label)
+
+
+# the number of iterations run from every start before keeping the most promising ones, see _solve_multistart
+multistart_screen_iterations = 5
+# the spread of the starting points around the guess, in the normalized space
+multistart_spread = 1.0
+
+
+def _solve_multistart(residual_fun: callable, p_guess, x_norm, y_norm, jac_fun: callable = None,
+                      num_starts: int = 16, seed=0, verbose=False) -> scipy.optimize.OptimizeResult:
+    """
+    Solve a fit in the normalized space from many starting points at once.
+
+    The starts are the guess and random perturbations of it, each parameter being scaled by a log-normal factor and
+    shifted by a small normal offset. All of them are stacked in one problem of :func:`least_squares_batch` and run
+    for :code:`multistart_screen_iterations` iterations, then the quarter with the lowest cost is run to convergence
+    and the best solution is returned.
+
+    Returns:
+        (scipy.optimize.OptimizeResult): the best solution with the total numbers of evaluations of the stacked
+        problems, its message tells how many starts reached the best cost
+    """
+    rng = np.random.default_rng(seed)
+    p_guess = np.asarray(p_guess, dtype=float)
+    noise = multistart_spread * rng.standard_normal((2, num_starts - 1, p_guess.size))
+    starts = np.vstack([p_guess, p_guess * np.exp(noise[0]) + 0.1 * noise[1]])
+
+    num_samples = np.size(x_norm)
+    x_stacked, y_stacked = np.tile(x_norm, num_starts), np.tile(y_norm, num_starts)
+    owner = np.repeat(np.arange(num_starts), num_samples)
+    kernel_residual_fun, kernel_jac_fun = _kernel_functions(residual_fun, jac_fun, owner.size)
+
+    p, cost, _, nfev, njev = least_squares_batch(kernel_residual_fun, starts, x_stacked, y_stacked, owner,
+                                                 jac_fun=kernel_jac_fun, max_iterations=multistart_screen_iterations)
+
+    # the screened starts are sorted by cost, the diverged ones last
+    keep = max(2, -(-num_starts // 4))
+    survivors = np.argsort(np.where(np.isfinite(cost), cost, np.inf), kind='stable')[:keep]
+    p, cost, status, refine_nfev, refine_njev = least_squares_batch(
+        kernel_residual_fun, p[survivors], x_stacked[:keep * num_samples], y_stacked[:keep * num_samples],
+        owner[:keep * num_samples], jac_fun=kernel_jac_fun)
+
+    best = int(np.argmin(np.where(np.isfinite(cost), cost, np.inf)))
+    reached = np.count_nonzero(np.abs(cost - cost[best]) <= 1e-6 * max(abs(cost[best]), 1e-12))
+    message = '{} (best of {} starts, {} refined, {} reached the best cost)'.format(
+        _status_messages[status[best]], num_starts, keep, reached)
+    if verbose:
+        print(message)
+
+    return scipy.optimize.OptimizeResult(x=p[best], cost=float(cost[best]), nfev=nfev + refine_nfev,
+                                         njev=njev + refine_njev, status=int(status[best]),
+                                         success=bool(status[best] > 0), message=message)
+
+
 def fit_model(x, y, fun: callable, residual_fun: callable, denormalize_p: callable, guess: callable, lower=-0.5,
-              upper=2.5, verbose=False) -> tuple:
+              upper=2.5, verbose=False, jac_fun: callable = None, check_jac: bool = False,
+              label=None, num_starts: int = 1, seed=0) -> FitResult:
+    """
+    Fit a model to the data in the normalized space.
+
+    Args:
+        x (np.array): the abscissa of the data
+        y (np.array): the values of the data
+        fun (callable): the model function
+        residual_fun (callable): the residual function of the model
+        denormalize_p (callable): the function mapping the normalized parameters back to the data space
+        guess (callable): the function computing the initial guess of the normalized data
+        lower (float): the lower bound of the normalized range where the fitted curve is sampled by default
+        upper (float): the upper bound of the normalized range where the fitted curve is sampled by default
+        verbose (bool): verbosity level of the solver
+        jac_fun (callable): the analytic Jacobian of the residuals, if None it is estimated by finite differences
+        check_jac (bool): compare :code:`jac_fun` against finite differences at the initial guess and raise a
+            ValueError if they do not match
+        label: an optional name of the series, stored in the result
+        num_starts (int): if more than 1, solve from this many starting points around the guess at once and keep
+            the best solution, see :func:`_solve_multistart`, which costs a few single fits whatever the number of
+            starts
+        seed: the seed of the random starting points
+
+    Returns:
+        (FitResult): the parameters, the fitted curve and the diagnostics of the solver, it unpacks as
+        :code:`model, xp, pxp`
+
+    """
+    start = time.perf_counter()
+    cache_key = None
+    if fitcache.enabled and not check_jac:
+        cache_key = fitcache.key(x, y, (fun, residual_fun, denormalize_p, guess, jac_fun),
+                                 {'num_starts': num_starts, 'seed': seed if num_starts > 1 else None,
+                                  'use_kernels': use_kernels and residual_fun in model_kernels})
+        entry = fitcache.get(cache_key)
+        if entry is not None:
+            return _notify_fit_hooks(_cached_fit_result(entry, fun, lower, upper, label, time.perf_counter() - start))
+
     x_norm, t_x = normalize(x, lower=0.3)
     y_norm, t_y = normalize(y, lower=0.3)
 
     p_guess = guess(x_norm, y_norm)
-    result = scipy.optimize.least_squares(residual_fun, p_guess, args=(x_norm, y_norm), verbose=verbose, loss='soft_l1')
+    if check_jac and jac_fun is not None:
+        error = check_jacobian(residual_fun, jac_fun, p_guess, np.asarray(x_norm), np.asarray(y_norm))
+        if error > 1e-5:
+            raise ValueError('The Jacobian does not match its finite differences approximation '
+                             '(relative error {:.3g})'.format(error))
+
+    if num_starts > 1:
+        result = _solve_multistart(residual_fun, p_guess, x_norm, y_norm, jac_fun=jac_fun, num_starts=num_starts,
+                                   seed=seed, verbose=verbose)
+    else:
+        result = _solve_normalized(residual_fun, p_guess, x_norm, y_norm, jac_fun=jac_fun, verbose=verbose)
 
     p = result.x
 
     model = denormalize_p(p, t_x, t_y)
 
-    xp = np.linspace(lower, upper, 1500)
-    pxp = fun(p, xp)
+    curve = FittedCurve(fun, p, t_x, t_y, lower, upper)
+
+    fit_result = _fit_result(model, curve, result, t_x, t_y, time.perf_counter() - start, label)
+    if cache_key is not None:
+        fitcache.put(cache_key, {name: np.copy(getattr(fit_result, name)) if name in ('p', 't_x', 't_y') else
+                                 getattr(fit_result, name) for name in _cached_fields})
+    return _notify_fit_hooks(fit_result)
+
+
+def _soft_l1(f: np.array) -> tuple:
+    """
+    Evaluate the soft_l1 loss :math:`\\rho(z) = 2(\\sqrt{1 + z} - 1)` of the residuals, with :math:`z = f^2`.
+
+    Args:
+        f (np.array): the residuals
+
+    Returns:
+        (tuple): tuple containing:
+
+            rho (np.array) : the loss of each residual
+            weight (np.array) : the derivative of the loss :math:`\\rho'(z)`, i.e. the weight of each residual
+
+    """
+    s = np.sqrt(1 + f ** 2)
+    return 2 * (s - 1), 1 / s
+
+
+def _block_normal_matrix(weighted: np.array, jac: np.array, starts: np.array) -> np.array:
+    """
+    Compute the :math:`J^T W J` matrix of each block of rows of a stacked Jacobian.
+
+    Each entry is reduced over the blocks on its own, so that the temporary memory is one column of the Jacobian
+    rather than the samples x parameters x parameters array of the outer products.
+
+    Args:
+        weighted (np.array): the samples x parameters Jacobian multiplied by the weights :math:`W J`
+        jac (np.array): the samples x parameters Jacobian :math:`J`
+        starts (np.array): the index of the first row of each block
+
+    Returns:
+        (np.array): the blocks x parameters x parameters symmetric matrices
+    """
+    num_params = jac.shape[1]
+    matrix = np.empty((starts.size, num_params, num_params))
+    product = np.empty(jac.shape[0])
+    for i in range(num_params):
+        for j in range(i, num_params):
+            np.multiply(weighted[:, i], jac[:, j], out=product)
+            matrix[:, i, j] = np.add.reduceat(product, starts)
+            matrix[:, j, i] = matrix[:, i, j]
+    return matrix
+
+
+def least_squares_batch(residual_fun: callable, p0: np.array, x: np.array, y: np.array, owner: np.array,
+                        jac_fun: callable = None, max_iterations: int = None, ftol: float = 1e-8, xtol: float = 1e-8,
+                        gtol: float = 1e-8) -> tuple:
+    """
+    Solve many independent robust least squares problems stacked in a single set of residuals.
+
+    The samples of all the problems are concatenated in :code:`x` and :code:`y`, :code:`owner` tells which problem
+    each sample belongs to. The Jacobian of the stacked residuals is block sparse: each sample only depends on the
+    parameters of its own problem, hence it is stored compactly as one row of :code:`len(p)` derivatives per sample.
+    Each problem is solved with Levenberg-Marquardt on the soft_l1 loss (as in :func:`fit_model`) with its own
+    damping and its own convergence tests, so the problems do not slow down each other.
+
+    Args:
+        residual_fun (callable): the residual function, evaluated once on the stacked parameters of all the samples
+        p0 (np.array): the initial guess, one row per problem
+        x (np.array): the stacked abscissa
+        y (np.array): the stacked values
+        owner (np.array): the sorted index of the problem of each sample, each problem must have at least one sample
+        jac_fun (callable): the analytic Jacobian of the residuals, if None it is estimated by finite differences
+        max_iterations (int): the maximum number of iterations, by default 100 times the number of parameters
+        ftol (float): tolerance on the relative change of the cost
+        xtol (float): tolerance on the relative change of the parameters
+        gtol (float): tolerance on the gradient
+
+    Returns:
+        (tuple): tuple containing:
+
+            p (np.array) : the solution, one row per problem
+            cost (np.array) : the final cost of each problem
+            status (np.array) : the reason of termination of each problem as in :code:`scipy.optimize.least_squares`
+            nfev (int) : the number of evaluations of the stacked residuals, including the finite differences
+            njev (int) : the number of evaluations of the stacked Jacobian
+
+    """
+    p = np.array(p0, dtype=float)
+    num_problems, num_params = p.shape
+    if max_iterations is None:
+        max_iterations = 100 * num_params
+    diagonal = np.arange(num_params)
+    step = np.sqrt(np.finfo(float).eps)
+    cost = np.empty(num_problems)
+    status = np.zeros(num_problems, dtype=int)
+
+    def block_starts(block_owner):
+        return np.flatnonzero(np.r_[True, block_owner[1:] != block_owner[:-1]])
+
+    # the working set: the problems still being solved and their samples, it is compacted as the problems converge
+    ids = np.arange(num_problems)
+    w_owner, w_x, w_y, w_starts = owner, x, y, block_starts(owner)
+    w_p = p.copy()
+
+    def evaluate(params):
+        # trial steps may overflow the model, their cost is then not finite and they are rejected
+        with np.errstate(over='ignore', invalid='ignore'):
+            return residual_fun(params[w_owner].T, w_x, w_y)
+
+    def jacobian(params, res):
+        if jac_fun is not None:
+            with np.errstate(over='ignore', invalid='ignore'):
+                return jac_fun(params[w_owner].T, w_x, w_y)
+
+        # forward differences, one stacked evaluation per parameter thanks to the block structure
+        jac = np.empty((res.size, num_params))
+        for i in range(num_params):
+            h = step * np.maximum(1.0, np.abs(params[:, i]))
+            shifted = params.copy()
+            shifted[:, i] += h
+            jac[:, i] = (evaluate(shifted) - res) / h[w_owner]
+        return jac
+
+    f = evaluate(w_p)
+    rho, weight = _soft_l1(f)
+    w_cost = 0.5 * np.add.reduceat(rho, w_starts)
+    nfev, njev = 1, 0
+    damping = np.full(num_problems, 1.0)
+    active = np.ones(num_problems, dtype=bool)
+    update_jacobian = True
+
+    for _ in range(max_iterations):
+        if update_jacobian:
+            jac = jacobian(w_p, f)
+            nfev += num_params if jac_fun is None else 0
+            njev += 1
+            weighted = jac * weight[:, np.newaxis]
+            hessian = _block_normal_matrix(weighted, jac, w_starts)
+            gradient = np.add.reduceat(weighted * f[:, np.newaxis], w_starts)
+
+            converged = active & (np.abs(gradient).max(axis=1) < gtol)
+            status[ids[converged]] = 1
+            active &= ~converged
+            if not active.any():
+                break
+
+        scale = np.maximum(hessian[:, diagonal, diagonal], 1e-12)
+        system = hessian.copy()
+        system[:, diagonal, diagonal] += damping[:, np.newaxis] * scale
+        delta = -np.linalg.solve(system, gradient[:, :, np.newaxis])[:, :, 0]
+        delta[~active] = 0.0
+
+        p_new = w_p + delta
+        f_new = evaluate(p_new)
+        nfev += 1
+        rho_new, weight_new = _soft_l1(f_new)
+        cost_new = 0.5 * np.add.reduceat(rho_new, w_starts)
+
+        accepted = active & np.isfinite(cost_new) & (cost_new < w_cost)
+        rejected = active & ~accepted
+        damping[accepted] = np.maximum(damping[accepted] / 10, 1e-12)
+        damping[rejected] *= 10
+
+        if accepted.any():
+            f_tol = w_cost[accepted] - cost_new[accepted] < ftol * w_cost[accepted]
+            x_tol = np.linalg.norm(delta[accepted], axis=1) < xtol * (xtol + np.linalg.norm(w_p[accepted], axis=1))
+            rows = accepted[w_owner]
+            w_p[accepted] = p_new[accepted]
+            f[rows], weight[rows] = f_new[rows], weight_new[rows]
+            w_cost[accepted] = cost_new[accepted]
+
+            converged = np.zeros(active.size, dtype=bool)
+            converged[accepted] = f_tol | x_tol
+            status[ids[np.flatnonzero(accepted)[x_tol]]] = 3
+            status[ids[np.flatnonzero(accepted)[f_tol]]] = 2
+            active &= ~converged
+
+        # a problem that cannot decrease its cost even with a huge damping has converged
+        stalled = rejected & (damping > 1e12)
+        status[ids[stalled]] = 3
+        active &= ~stalled
+
+        if not active.any():
+            break
+        update_jacobian = accepted.any()
+
+        if np.count_nonzero(active) < 0.75 * active.size:
+            # drop the converged problems from the working set
+            p[ids], cost[ids] = w_p, w_cost
+            rows = active[w_owner]
+            w_owner = (np.cumsum(active) - 1)[w_owner[rows]]
+            w_x, w_y, w_starts = w_x[rows], w_y[rows], block_starts(w_owner)
+            f, weight = f[rows], weight[rows]
+            ids, w_p, w_cost, damping = ids[active], w_p[active], w_cost[active], damping[active]
+            hessian, gradient = hessian[active], gradient[active]
+            active = np.ones(ids.size, dtype=bool)
+
+    p[ids], cost[ids] = w_p, w_cost
+
+    return p, cost, status, nfev, njev
+
+
+def _renormalize_params(denormalize_p: callable, p, p_t_x, p_t_y, t_x, t_y) -> np.array:
+    """
+    Map normalized parameters to another normalization of the same data, the models being closed under affine
+    changes of the axes.
+
+    Args:
+        denormalize_p (callable): the function mapping the normalized parameters back to the data space
+        p (np.array): the parameters, normalized with the transformations :code:`p_t_x` and :code:`p_t_y`
+        p_t_x (np.array): the transformation of the abscissa of :code:`p`
+        p_t_y (np.array): the transformation of the values of :code:`p`
+        t_x (np.array): the new transformation of the abscissa
+        t_y (np.array): the new transformation of the values
+
+    Returns:
+        (np.array): the parameters in the new normalized space
+    """
+    # the transformations from the new normalized space to the previous one
+    rel_x = np.array([p_t_x[0] / t_x[0], p_t_x[1] - p_t_x[0] / t_x[0] * t_x[1]])
+    rel_y = np.array([p_t_y[0] / t_y[0], p_t_y[1] - p_t_y[0] / t_y[0] * t_y[1]])
+    with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+        return np.array(denormalize_p(p, rel_x, rel_y), dtype=float)
+
+
+# the termination messages of scipy.optimize.least_squares for the status returned by least_squares_batch
+_status_messages = {-1: 'Not enough samples to fit the series.',
+                    0: 'The maximum number of function evaluations is exceeded.',
+                    1: '`gtol` termination condition is satisfied.',
+                    2: '`ftol` termination condition is satisfied.',
+                    3: '`xtol` termination condition is satisfied.'}
+
+
+def _batch_normalize(x: np.array, y_mat: np.array, valid: np.array, lower: float = 0.3, upper: float = 1.0) -> tuple:
+    """
+    Column-wise version of :func:`normalize` where each column only considers its valid samples.
+
+    Args:
+        x (np.array): the common abscissa, one value per row
+        y_mat (np.array): the data matrix, one series per column
+        valid (np.array): boolean mask of the samples to consider
+        lower (float): the minimum value of the new range
+        upper (float): the maximum value of the new range
+
+    Returns:
+        (tuple): tuple containing:
+
+            t_x (np.array) : 2 x n transformations of the abscissa, one column per series
+            t_y (np.array) : 2 x n transformations of the values, one column per series
+
+    """
+    def transform(arr):
+        # empty or constant series get a non finite transformation
+        with warnings.catch_warnings(), np.errstate(divide='ignore', invalid='ignore'):
+            warnings.simplefilter('ignore', RuntimeWarning)
+            arr_min = np.nanmin(arr, axis=0)
+            alpha = (upper - lower) / (np.nanmax(arr, axis=0) - arr_min)
+        return np.array([alpha, lower - arr_min * alpha], dtype='float')
+
+    return transform(np.where(valid, x[:, np.newaxis], np.nan)), transform(np.where(valid, y_mat, np.nan))
+
+
+def fit_model_batch(x, y_mat, fun: callable, residual_fun: callable, denormalize_p: callable, guess: callable,
+                    lower=-0.5, upper=2.5, verbose=False, jac_fun: callable = None, labels: list = None,
+                    warm_start: list = None) -> list:
+    """
+    Fit the same model to many series sharing the same abscissa at once.
+
+    The residuals of all the series are stacked and solved together by :func:`least_squares_batch`, so the cost of
+    setting up the solver and evaluating the model is paid once for all the series. Missing samples (NaN) are
+    ignored independently for each series, which allows mixing series of different length. Each series is
+    normalized on its own as in :func:`fit_model`, hence the parameters match the single series path.
 
-    xp = normalize_back(xp, t_x)
-    pxp = normalize_back(pxp, t_y)
+    Args:
+        x (np.array): the abscissa, one value per row of :code:`y_mat`
+        y_mat (np.array): the days x entities matrix of values, one series per column
+        fun (callable): the model function
+        residual_fun (callable): the residual function of the model
+        denormalize_p (callable): the function mapping the normalized parameters back to the data space
+        guess (callable): the function computing the initial guess of a normalized series
+        lower (float): the lower bound of the normalized range where the fitted curves are sampled by default
+        upper (float): the upper bound of the normalized range where the fitted curves are sampled by default
+        verbose (bool): print a summary of the solver run
+        jac_fun (callable): the analytic Jacobian of the residuals, if None it is estimated by finite differences
+        labels (list): optional names of the series, stored in the results
+        warm_start (list): the :class:`FitResult` of a previous fit of each series (or None), e.g. on fewer days,
+            used as initial guess instead of :code:`guess` as in :class:`IncrementalFitter`
+
+    Returns:
+        (list): the :class:`FitResult` of each series, whose parameters are NaN for the series with too few samples
+        to be fitted. The numbers of evaluations and the wall time are those of the whole batch.
+
+    """
+    start = time.perf_counter()
+    x = np.asarray(x, dtype=float)
+    y_mat = np.asarray(y_mat, dtype=float)
+    if y_mat.ndim == 1:
+        y_mat = y_mat[:, np.newaxis]
+    num_entities = y_mat.shape[1]
+
+    valid = np.isfinite(y_mat) & np.isfinite(x)[:, np.newaxis]
+    t_x, t_y = _batch_normalize(x, y_mat, valid)
+    x_norm = t_x[0] * x[:, np.newaxis] + t_x[1]
+    y_norm = t_y[0] * y_mat + t_y[1]
+
+    # the series that cannot be fitted (too short or constant) are left out of the problem
+    normalized = np.isfinite(t_x).all(axis=0) & np.isfinite(t_y).all(axis=0)
+    p_guess = [None] * num_entities
+    warm = np.zeros(num_entities, dtype=bool)
+    for j in np.flatnonzero(normalized):
+        previous = warm_start[j] if warm_start is not None else None
+        if previous is not None and np.isfinite(previous.p).all():
+            p_guess[j] = _renormalize_params(denormalize_p, previous.p, previous.t_x, previous.t_y, t_x[:, j],
+                                             t_y[:, j])
+            warm[j] = np.isfinite(p_guess[j]).all()
+        if not warm[j]:
+            p_guess[j] = guess(x_norm[valid[:, j], j], y_norm[valid[:, j], j])
+    if normalized.any():
+        num_params = next(len(p) for p in p_guess if p is not None)
+    else:
+        # the number of parameters of the model, from the guess of a dummy series
+        num_params = len(guess(np.linspace(lower, upper, 3), np.linspace(lower, upper, 3)))
+    fitted = normalized & (np.count_nonzero(valid, axis=0) > num_params)
+
+    def solve(columns, p0):
+        # stack the valid samples column by column, so that the samples of each series are contiguous
+        owner, days = np.nonzero(valid[:, columns].T)
+        kernel_residual_fun, kernel_jac_fun = _kernel_functions(residual_fun, jac_fun, owner.size)
+        return least_squares_batch(kernel_residual_fun, p0, x_norm[days, columns[owner]],
+                                   y_norm[days, columns[owner]], owner, jac_fun=kernel_jac_fun)
+
+    p_norm = np.full((num_entities, num_params), np.nan)
+    costs = np.full(num_entities, np.nan)
+    statuses = np.full(num_entities, -1)
+    nfev, njev = 0, 0
+    if fitted.any():
+        columns = np.flatnonzero(fitted)
+        p, cost, status, nfev, njev = solve(columns, np.array([p_guess[j] for j in columns]))
+        p_norm[columns], costs[columns], statuses[columns] = p, cost, status
+
+        # the warm starts out of iterations may be stuck far from the optimum, try again from the cold guesses
+        columns = np.flatnonzero(fitted & warm & (statuses == 0))
+        if columns.size:
+            p0 = np.array([guess(x_norm[valid[:, j], j], y_norm[valid[:, j], j]) for j in columns])
+            p, cost, status, retry_nfev, retry_njev = solve(columns, p0)
+            better = cost < costs[columns]
+            p_norm[columns[better]], costs[columns[better]], statuses[columns[better]] = \
+                p[better], cost[better], status[better]
+            nfev, njev = nfev + retry_nfev, njev + retry_njev
+
+        if verbose:
+            print('{} series fitted with {} function evaluations, {} Jacobian evaluations'.format(
+                np.count_nonzero(fitted), nfev, njev))
+
+    models = list(zip(*denormalize_p(p_norm.T, t_x, t_y)))
+
+    wall_time = time.perf_counter() - start
+    labels = [None] * num_entities if labels is None else labels
+    return [_notify_fit_hooks(FitResult(models[j], FittedCurve(fun, p_norm[j], t_x[:, j], t_y[:, j], lower, upper),
+                                        p=p_norm[j], t_x=t_x[:, j], t_y=t_y[:, j],
+                                        cost=float(costs[j]), nfev=nfev, njev=njev, status=int(statuses[j]),
+                                        success=bool(statuses[j] > 0), message=_status_messages[statuses[j]],
+                                        wall_time=wall_time, label=labels[j]))
+            for j in range(num_entities)]
+
+
+def fit_model_joint(x, y_mat, fun: callable, residual_fun: callable, denormalize_p: callable, guess: callable,
+                    shared: tuple = (), lower=-0.5, upper=2.5, verbose=False, jac_fun: callable = None,
+                    labels: list = None) -> list:
+    """
+    Fit the same model to many related series at once, some parameters being shared by all the series, e.g. the
+    common growth rate k of the provinces of a region, the others being fitted to each series.
 
-    return model, xp, pxp
+    Unlike :func:`fit_model_batch`, the series form a single problem, solved by the trust region reflective method
+    with LSMR on the sparse Jacobian: each sample only depends on the shared parameters and on the parameters of its
+    series, hence the cost of an iteration grows linearly with the number of series. The abscissa is normalized once
+    for all the series, so that a shared parameter has the same meaning for all of them, while the values of each
+    series are normalized on their own as in :func:`fit_model`, so that each series has the same weight whatever its
+    scale. Missing samples (NaN) are ignored, and a short series borrows the shared parameters from the others.
+
+    Args:
+        x (np.array): the abscissa, one value per row of :code:`y_mat`
+        y_mat (np.array): the days x entities matrix of values, one series per column
+        fun (callable): the model function
+        residual_fun (callable): the residual function of the model
+        denormalize_p (callable): the function mapping the normalized parameters back to the data space
+        guess (callable): the function computing the initial guess of a normalized series
+        shared (tuple): the indices of the shared parameters, whose value in the data space must not depend on the
+            scale of the values, e.g. x0 and k of the sigmoid
+        lower (float): the lower bound of the normalized range where the fitted curves are sampled by default
+        upper (float): the upper bound of the normalized range where the fitted curves are sampled by default
+        verbose (bool): verbosity level of the solver
+        jac_fun (callable): the analytic Jacobian of the residuals, if None it is estimated by finite differences
+            grouped by the sparsity of the Jacobian
+        labels (list): optional names of the series, stored in the results
+
+    Returns:
+        (list): the :class:`FitResult` of each series, whose parameters are NaN for the series with too few samples
+        to be fitted. The cost is the one of the series, the numbers of evaluations, the status and the wall time are
+        those of the joint problem.
+
+    """
+    start = time.perf_counter()
+    x = np.asarray(x, dtype=float)
+    y_mat = np.asarray(y_mat, dtype=float)
+    if y_mat.ndim == 1:
+        y_mat = y_mat[:, np.newaxis]
+    num_entities = y_mat.shape[1]
+
+    valid = np.isfinite(y_mat) & np.isfinite(x)[:, np.newaxis]
+    _, t_y = _batch_normalize(x, y_mat, valid)
+    rows = valid.any(axis=1)
+    if np.unique(x[rows]).size < 2:
+        raise ValueError('Not enough samples to fit the series.')
+    _, t_x = normalize(x[rows], lower=0.3)
+    x_norm = t_x[0] * x + t_x[1]
+    y_norm = t_y[0] * y_mat + t_y[1]
+
+    normalized = np.isfinite(t_y).all(axis=0)
+    p_guess = np.array([guess(np.linspace(0.3, 1, 3), np.linspace(0.3, 1, 3))] * num_entities, dtype=float)
+    for j in np.flatnonzero(normalized):
+        p_guess[j] = guess(x_norm[valid[:, j]], y_norm[valid[:, j], j])
+    num_params = p_guess.shape[1]
+
+    shared = np.unique(np.asarray(shared, dtype=int))
+    own = np.setdiff1d(np.arange(num_params), shared)
+    num_shared, num_own = shared.size, own.size
+    # the shared parameters must mean the same in the data space for any normalization of the values
+    probe = np.array(denormalize_p(np.tile(p_guess[:1].T, 2), t_x, np.array([[1.0, 2.0], [0.0, 0.5]])))
+    for i in shared:
+        if not np.isclose(probe[i, 0], probe[i, 1]):
+            raise ValueError('The parameter {} depends on the scale of the values and cannot be shared'.format(i))
+
+    fitted = normalized & (np.count_nonzero(valid, axis=0) > num_own)
+    columns = np.flatnonzero(fitted)
+    num_fitted = columns.size
+
+    p_norm = np.full((num_entities, num_params), np.nan)
+    costs = np.full(num_entities, np.nan)
+    status, nfev, njev, message = -1, 0, 0, _status_messages[-1]
+    if num_fitted and np.count_nonzero(valid[:, columns]) > num_shared + num_fitted * num_own:
+        # stack the valid samples column by column, so that the samples of each series are contiguous
+        owner, days = np.nonzero(valid[:, columns].T)
+        x_stack, y_stack = x_norm[days], y_norm[days, columns[owner]]
+        num_samples = owner.size
+        kernel_residual_fun, kernel_jac_fun = _kernel_functions(residual_fun, jac_fun, num_samples)
+
+        def params(z):
+            p = np.empty((num_fitted, num_params))
+            p[:, shared] = z[:num_shared]
+            p[:, own] = z[num_shared:].reshape(num_fitted, num_own)
+            return p
+
+        def residuals(z):
+            with np.errstate(over='ignore', invalid='ignore'):
+                return kernel_residual_fun(params(z)[owner].T, x_stack, y_stack)
+
+        # each row of the Jacobian has the derivatives w.r.t. the shared parameters then the ones of its series
+        indices = np.empty((num_samples, num_params), dtype=int)
+        indices[:, :num_shared] = np.arange(num_shared)
+        indices[:, num_shared:] = num_shared + owner[:, np.newaxis] * num_own + np.arange(num_own)
+        indices = indices.ravel()
+        indptr = np.arange(0, num_samples * num_params + 1, num_params)
+        shape = (num_samples, num_shared + num_fitted * num_own)
+        order = np.concatenate([shared, own])
+
+        def jacobian(z):
+            with np.errstate(over='ignore', invalid='ignore'):
+                jac = kernel_jac_fun(params(z)[owner].T, x_stack, y_stack)
+            return scipy.sparse.csr_matrix((jac[:, order].ravel(), indices, indptr), shape=shape)
+
+        z0 = np.concatenate([np.median(p_guess[columns][:, shared], axis=0), p_guess[columns][:, own].ravel()])
+        if jac_fun is not None:
+            result = scipy.optimize.least_squares(residuals, z0, jac=jacobian, method='trf', tr_solver='lsmr',
+                                                  loss='soft_l1', verbose=verbose)
+        else:
+            sparsity = scipy.sparse.csr_matrix((np.ones(indices.size), indices, indptr), shape=shape)
+            result = scipy.optimize.least_squares(residuals, z0, jac='2-point', jac_sparsity=sparsity, method='trf',
+                                                  tr_solver='lsmr', loss='soft_l1', verbose=verbose)
+
+        p_norm[columns] = params(result.x)
+        rho, _ = _soft_l1(result.fun)
+        costs[columns] = 0.5 * np.bincount(owner, weights=rho, minlength=num_fitted)
+        status, nfev, njev, message = result.status, result.nfev, result.njev or 0, result.message
+
+    models = list(zip(*denormalize_p(p_norm.T, t_x, t_y)))
+
+    wall_time = time.perf_counter() - start
+    labels = [None] * num_entities if labels is None else labels
+    return [_notify_fit_hooks(FitResult(models[j], FittedCurve(fun, p_norm[j], t_x.copy(), t_y[:, j], lower, upper),
+                                        p=p_norm[j], t_x=t_x.copy(), t_y=t_y[:, j], cost=float(costs[j]), nfev=nfev,
+                                        njev=njev, status=int(status if fitted[j] else -1),
+                                        success=bool(fitted[j] and status > 0),
+                                        message=message if fitted[j] else _status_messages[-1],
+                                        wall_time=wall_time, label=labels[j]))
+            for j in range(num_entities)]
 
 
 def denormalize_sigmoid_params(p, t_x, t_y) -> tuple:
@@ -238,16 +1178,19 @@ def denormalize_sigmoid_params(p, t_x, t_y) -> tuple:
     return x0r, y0r, cr, kr
 
 
-def sigmoid_dumb_initial_guess(x, y) -> np.array:
-    return np.array([np.median(x), np.median(y), 1.0, 1.0], dtype=float)
+sigmoid_dumb_initial_guess = gs.sigmoid_dumb_initial_guess
 
 
-def fit_sigmoid(x, y, verbose: bool = False, lower=-0.5, upper=2.5) -> tuple:
-    model, xp, pxp = fit_model(x, y, sigmoid, sigmoid_residuals, denormalize_sigmoid_params,
-                               sigmoid_dumb_initial_guess, lower=lower, upper=upper, verbose=verbose)
+def fit_sigmoid(x, y, verbose: bool = False, lower=-0.5, upper=2.5, check_jac: bool = False,
+                label=None, num_starts: int = 1) -> 'FitResult':
+    result = fit_model(x, y, sigmoid, sigmoid_residuals, denormalize_sigmoid_params, gs.sigmoid_logit_guess,
+                       lower=lower, upper=upper, verbose=verbose, jac_fun=sigmoid_residuals_jacobian,
+                       check_jac=check_jac, label=label, num_starts=num_starts)
 
-    x0r, y0r, cr, kr = model
-    print('''\
+    if verbose:
+        model = result.model
+        x0r, y0r, cr, kr = model
+        print('''\
         Sigmoid model
         x0 = {x0}
         y0 = {y0}
@@ -257,7 +1200,7 @@ def fit_sigmoid(x, y, verbose: bool = False, lower=-0.5, upper=2.5) -> tuple:
         flex = {flex}, {fley}
         '''.format(x0=x0r, y0=y0r, c=cr, k=kr, flex=x0r, fley=sigmoid(model, x0r), tinf=cr + y0r))
 
-    return model, xp, pxp
+    return result
 
 
 def logistic_distribution(p: np.array, x: np.array) -> np.array:
@@ -297,22 +1240,46 @@ def logistic_distribution_residuals(p, x, y):
     return y - logistic_distribution(p, x)
 
 
-def fit_logistic_distribution(x, y, verbose: bool = False, lower=-0.5, upper=2.5) -> tuple:
-    model, xp, pxp = fit_model(x, y, logistic_distribution, logistic_distribution_residuals,
-                               denormalize_logistic_distribution_params,
-                               sigmoid_dumb_initial_guess, lower=lower, upper=upper, verbose=verbose)
+def logistic_distribution_residuals_jacobian(p, x, y):
+    """
+    Evaluate the Jacobian of :func:`logistic_distribution_residuals` w.r.t. the parameters.
+
+    Args:
+        p (np.array): the array of parameters of the logistic distribution [x0, y0, c, k]
+        x (np.array): an array of values
+        y (np.array): an array of expected values
+
+    Returns:
+        jac (np.array): the len(x) x 4 Jacobian, one column per parameter
 
-    x0r, y0r, cr, kr = model
-    print('''\
+    """
+    x0, y0, c, k = p
+    s = 1 / (1 + np.exp(-k * (x - x0)))
+    ds = s * (1 - s)
+    dds = ds * (1 - 2 * s)
+    return _stack_jacobian(c * k ** 2 * dds, -1, -k * ds, -c * ds - c * k * (x - x0) * dds)
+
+
+def fit_logistic_distribution(x, y, verbose: bool = False, lower=-0.5, upper=2.5, check_jac: bool = False,
+                              label=None, num_starts: int = 1) -> 'FitResult':
+    result = fit_model(x, y, logistic_distribution, logistic_distribution_residuals,
+                       denormalize_logistic_distribution_params, gs.logistic_distribution_logit_guess, lower=lower,
+                       upper=upper, verbose=verbose, jac_fun=logistic_distribution_residuals_jacobian,
+                       check_jac=check_jac, label=label, num_starts=num_starts)
+
+    if verbose:
+        x0r, y0r, cr, kr = result.model
+        peak_x, peak_y = logistic_distribution_get_max(result.model)
+        print('''\
         Sigmoid derivative model
         x0 = {x0}
         y0 = {y0}
         c = {c}
         k = {k}
         max = {flex}, {fley}
-        '''.format(x0=x0r, y0=y0r, c=cr, k=kr, flex=x0r, fley=sigmoid(model, x0r)))
+        '''.format(x0=x0r, y0=y0r, c=cr, k=kr, flex=peak_x, fley=peak_y))
 
-    return model, xp, pxp
+    return result
 
 
 def denormalize_logistic_distribution_params(p, t_x, t_y) -> tuple:
@@ -330,3 +1297,232 @@ def logistic_distribution_get_max(p) -> tuple:
     x0, y0, c, k = p
 
     return x0, c * k / 4 + y0
+
+
+# the analytic Jacobian and the kernels of the residual functions of each model, see _kernel_functions
+model_kernels = {
+    exponential_residuals: (exponential_residuals_jacobian, kn.ExponentialKernel),
+    sigmoid_residuals: (sigmoid_residuals_jacobian, kn.SigmoidKernel),
+    logistic_distribution_residuals: (logistic_distribution_residuals_jacobian, kn.LogisticDistributionKernel),
+}
+
+# evaluate the residuals and the Jacobian of the models with the kernels of the kernels module
+use_kernels = True
+
+
+def fit_exponential_batch(x, y_mat, verbose: bool = False, lower=-0.5, upper=2.5, labels: list = None,
+                          warm_start: list = None) -> list:
+    return fit_model_batch(x, y_mat, exponential, exponential_residuals, denormalize_exponential_params,
+                           gs.exponential_log_linear_guess, lower=lower, upper=upper, verbose=verbose,
+                           jac_fun=exponential_residuals_jacobian, labels=labels, warm_start=warm_start)
+
+
+def fit_sigmoid_batch(x, y_mat, verbose: bool = False, lower=-0.5, upper=2.5, labels: list = None,
+                      warm_start: list = None) -> list:
+    return fit_model_batch(x, y_mat, sigmoid, sigmoid_residuals, denormalize_sigmoid_params,
+                           gs.sigmoid_logit_guess, lower=lower, upper=upper, verbose=verbose,
+                           jac_fun=sigmoid_residuals_jacobian, labels=labels, warm_start=warm_start)
+
+
+def fit_logistic_distribution_batch(x, y_mat, verbose: bool = False, lower=-0.5, upper=2.5, labels: list = None,
+                                    warm_start: list = None) -> list:
+    return fit_model_batch(x, y_mat, logistic_distribution, logistic_distribution_residuals,
+                           denormalize_logistic_distribution_params, gs.logistic_distribution_logit_guess, lower=lower,
+                           upper=upper, verbose=verbose, jac_fun=logistic_distribution_residuals_jacobian,
+                           labels=labels, warm_start=warm_start)
+
+
+def _parameter_indices(names: tuple, shared: tuple) -> tuple:
+    unknown = set(shared) - set(names)
+    if unknown:
+        raise ValueError('Unknown parameters {}, valid values are {}'.format(sorted(unknown), list(names)))
+    return tuple(names.index(name) for name in shared)
+
+
+def fit_exponential_joint(x, y_mat, shared: tuple = ('k',), verbose: bool = False, lower=-0.5, upper=2.5,
+                          labels: list = None) -> list:
+    return fit_model_joint(x, y_mat, exponential, exponential_residuals, denormalize_exponential_params,
+                           gs.exponential_log_linear_guess,
+                           shared=_parameter_indices(('x0', 'y0', 'k'), shared), lower=lower, upper=upper,
+                           verbose=verbose, jac_fun=exponential_residuals_jacobian, labels=labels)
+
+
+def fit_sigmoid_joint(x, y_mat, shared: tuple = ('k',), verbose: bool = False, lower=-0.5, upper=2.5,
+                      labels: list = None) -> list:
+    """
+    Fit sigmoids to related series, e.g. the total cases of the provinces of a region, sharing some parameters:
+
+    :code:`provinces = italy_get_list_of_provinces_for_region(region)`, then
+    :code:`frame = italy_provinces_filter_by_category(italy_load_provinces(provinces), 'totale_casi')` and
+    :code:`fits = fit_sigmoid_joint(x, frame.to_numpy(), shared=('k',), labels=provinces)`.
+
+    Args:
+        x (np.array): the abscissa, one value per row of :code:`y_mat`
+        y_mat (np.array): the days x entities matrix of values, one series per column
+        shared (tuple): the names of the shared parameters, among 'x0' and 'k'
+        verbose (bool): verbosity level of the solver
+        lower (float): the lower bound of the normalized range where the fitted curves are sampled by default
+        upper (float): the upper bound of the normalized range where the fitted curves are sampled by default
+        labels (list): optional names of the series, stored in the results
+
+    Returns:
+        (list): the :class:`FitResult` of each series, see :func:`fit_model_joint`
+    """
+    return fit_model_joint(x, y_mat, sigmoid, sigmoid_residuals, denormalize_sigmoid_params, gs.sigmoid_logit_guess,
+                           shared=_parameter_indices(('x0', 'y0', 'c', 'k'), shared), lower=lower, upper=upper,
+                           verbose=verbose, jac_fun=sigmoid_residuals_jacobian, labels=labels)
+
+
+def fit_logistic_distribution_joint(x, y_mat, shared: tuple = ('k',), verbose: bool = False, lower=-0.5, upper=2.5,
+                                    labels: list = None) -> list:
+    return fit_model_joint(x, y_mat, logistic_distribution, logistic_distribution_residuals,
+                           denormalize_logistic_distribution_params, gs.logistic_distribution_logit_guess,
+                           shared=_parameter_indices(('x0', 'y0', 'c', 'k'), shared), lower=lower, upper=upper,
+                           verbose=verbose, jac_fun=logistic_distribution_residuals_jacobian, labels=labels)
+
+
+# the functions of a model: the model, its residuals and their Jacobian, the denormalization of the parameters,
+# the initial guess, the batch and joint fitting functions, and the names of the parameters
+Model = collections.namedtuple('Model', ['fun', 'residual_fun', 'jac_fun', 'denormalize_p', 'guess', 'fit_batch',
+                                         'fit_joint', 'parameters'])
+
+# the models by name, shared by the modules fitting many series, e.g. the backtests, the bootstrap and the CLI
+models = {
+    'exponential': Model(exponential, exponential_residuals, exponential_residuals_jacobian,
+                         denormalize_exponential_params, gs.exponential_log_linear_guess, fit_exponential_batch,
+                         fit_exponential_joint, ('x0', 'y0', 'k')),
+    'sigmoid': Model(sigmoid, sigmoid_residuals, sigmoid_residuals_jacobian, denormalize_sigmoid_params,
+                     gs.sigmoid_logit_guess, fit_sigmoid_batch, fit_sigmoid_joint, ('x0', 'y0', 'c', 'k')),
+    'logistic_distribution': Model(logistic_distribution, logistic_distribution_residuals,
+                                   logistic_distribution_residuals_jacobian, denormalize_logistic_distribution_params,
+                                   gs.logistic_distribution_logit_guess, fit_logistic_distribution_batch,
+                                   fit_logistic_distribution_joint, ('x0', 'y0', 'c', 'k')),
+}
+
+
+def get_model(name: str) -> Model:
+    """
+    Returns:
+        (Model): the functions of the model called :code:`name`, raises a ValueError if it is not in :code:`models`
+    """
+    if name not in models:
+        raise ValueError('Unknown model {}, valid values are {}'.format(name, list(models)))
+    return models[name]
+
+
+class IncrementalFitter:
+    """
+    Fit a model to a series that grows over time, warm starting each fit from the previous solution.
+
+    The data are normalized as in :func:`fit_model`, hence the results are the same as a cold fit of the whole
+    series. When new observations change the normalization, the previous solution is mapped into the new normalized
+    space with :code:`denormalize_p`, since the models are closed under affine changes of the axes. A cold fit from
+    :code:`guess` is only done for the first fit and when the warm fit fails.
+
+    :code:`fitter = IncrementalFitter.for_sigmoid(x, y)`, then every day
+    :code:`fitter.append(new_x, new_y)` and :code:`model, xp, pxp = fitter.fit()`, the :class:`FitResult` of the
+    last fit is also kept in :code:`fitter.result`
+    """
+
+    def __init__(self, fun: callable, residual_fun: callable, denormalize_p: callable, guess: callable,
+                 jac_fun: callable = None, x=None, y=None, lower=-0.5, upper=2.5):
+        self.fun = fun
+        self.residual_fun = residual_fun
+        self.denormalize_p = denormalize_p
+        self.guess = guess
+        self.jac_fun = jac_fun
+        self.lower = lower
+        self.upper = upper
+        self.x = np.empty(0)
+        self.y = np.empty(0)
+        # the last solution in the normalized space, with its transformations, and the last result
+        self.p = None
+        self.t_x = None
+        self.t_y = None
+        self.result = None
+        self.warm_started = False
+        if x is not None:
+            self.append(x, y)
+
+    @classmethod
+    def for_exponential(cls, x=None, y=None, lower=-0.5, upper=2.5):
+        return cls(exponential, exponential_residuals, denormalize_exponential_params, gs.exponential_log_linear_guess,
+                   jac_fun=exponential_residuals_jacobian, x=x, y=y, lower=lower, upper=upper)
+
+    @classmethod
+    def for_sigmoid(cls, x=None, y=None, lower=-0.5, upper=2.5):
+        return cls(sigmoid, sigmoid_residuals, denormalize_sigmoid_params, gs.sigmoid_logit_guess,
+                   jac_fun=sigmoid_residuals_jacobian, x=x, y=y, lower=lower, upper=upper)
+
+    @classmethod
+    def for_logistic_distribution(cls, x=None, y=None, lower=-0.5, upper=2.5):
+        return cls(logistic_distribution, logistic_distribution_residuals, denormalize_logistic_distribution_params,
+                   gs.logistic_distribution_logit_guess, jac_fun=logistic_distribution_residuals_jacobian, x=x, y=y,
+                   lower=lower, upper=upper)
+
+    def append(self, x, y):
+        """
+        Append new observations to the series.
+
+        Args:
+            x (float or np.array): the abscissa of the new observations
+            y (float or np.array): the values of the new observations
+        """
+        self.x = np.concatenate([self.x, np.atleast_1d(np.asarray(x, dtype=float))])
+        self.y = np.concatenate([self.y, np.atleast_1d(np.asarray(y, dtype=float))])
+
+    def _warm_guess(self, t_x, t_y):
+        return _renormalize_params(self.denormalize_p, self.p, self.t_x, self.t_y, t_x, t_y)
+
+    def _warm_fit_succeeded(self, result, x_norm, y_norm) -> bool:
+        if result.status < 0 or not np.isfinite(result.x).all():
+            return False
+        if result.status > 0:
+            return True
+        # out of evaluations: the series has no well defined optimum (e.g. an exponential on saturating data), a
+        # cold fit would most likely end the same way, hence retry only if the warm fit is worse than the cold guess
+        rho, _ = _soft_l1(self.residual_fun(self.guess(x_norm, y_norm), x_norm, y_norm))
+        return result.cost <= 0.5 * np.sum(rho)
+
+    def fit(self, verbose=False, label=None) -> FitResult:
+        """
+        Fit the model to all the observations appended so far.
+
+        Args:
+            verbose (bool): verbosity level of the solver
+            label: an optional name of the series, stored in the result
+
+        Returns:
+            (FitResult): the parameters, the fitted curve and the diagnostics of the solver, including the failed
+            warm fit if any
+        """
+        start = time.perf_counter()
+        x_norm, t_x = normalize(self.x, lower=0.3)
+        y_norm, t_y = normalize(self.y, lower=0.3)
+
+        result = None
+        nfev, njev = 0, 0
+        if self.p is not None:
+            p0 = self._warm_guess(t_x, t_y)
+            if np.isfinite(p0).all():
+                result = _solve_normalized(self.residual_fun, p0, x_norm, y_norm, jac_fun=self.jac_fun,
+                                           verbose=verbose)
+                if not self._warm_fit_succeeded(result, x_norm, y_norm):
+                    nfev, njev = result.nfev, result.njev or 0
+                    result = None
+
+        self.warm_started = result is not None
+        if result is None:
+            result = _solve_normalized(self.residual_fun, self.guess(x_norm, y_norm), x_norm, y_norm,
+                                       jac_fun=self.jac_fun, verbose=verbose)
+
+        self.p, self.t_x, self.t_y = result.x, t_x, t_y
+
+        model = self.denormalize_p(self.p, t_x, t_y)
+        curve = FittedCurve(self.fun, self.p, t_x, t_y, self.lower, self.upper)
+
+        self.result = _fit_result(model, curve, result, t_x, t_y, time.perf_counter() - start, label)
+        self.result.nfev += nfev
+        self.result.njev += njev
+
+        return _notify_fit_hooks(self.result)
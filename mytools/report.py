@@ -0,0 +1,227 @@
+import hashlib
+import io as sysio
+import json
+import os
+import re
+import numpy as np
+import pandas as pd
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+import mytools.executor as ex
+import mytools.plot as mpl
+
+# Headless rendering of the analysis and comparative figures to files. The figures are drawn on explicit Figure
+# objects with the Agg canvas, so they can be rendered in parallel processes without a display. A manifest in the
+# output directory keeps the hash of the input data of each figure, the figures whose data did not change since the
+# last run are not rendered again.
+
+formats = ['png', 'svg', 'html']
+manifest_name = 'manifest.json'
+
+# bump to render all the figures again when the drawing code changes
+renderer_version = 1
+
+
+def analysis_spec(name: str, x, y, title: str, category: str, **kwargs) -> dict:
+    """
+    Describe an analysis figure, see :code:`plot.matplot_analysis_figure`.
+
+    Args:
+        name (str): the name of the figure, used for its file names
+        x (np.array): the days of the data
+        y (np.array): the values of the data
+        title (str): the title of the figure
+        category (str): the label of the data
+        **kwargs: additional arguments passed to :code:`plot.matplot_analysis_figure`, e.g. log_fitting=False
+
+    Returns:
+        (dict): the description of the figure
+    """
+    return {'name': name, 'kind': 'analysis', 'data': (np.asarray(x, dtype=float), np.asarray(y, dtype=float)),
+            'kwargs': dict(kwargs, title=title, category=category)}
+
+
+def comparative_spec(name: str, data_frame: pd.DataFrame, title: str, min_common: int = None) -> dict:
+    """
+    Describe a comparative figure, see :code:`plot.matplot_comparative_figure`.
+
+    Args:
+        name (str): the name of the figure, used for its file names
+        data_frame (pd.DataFrame): the data, indexed by date in dd/mm/yy format, one series per column
+        title (str): the title of the figure
+        min_common (int): if set, align the series on the day they reach this value
+
+    Returns:
+        (dict): the description of the figure
+    """
+    return {'name': name, 'kind': 'comparative', 'data': data_frame,
+            'kwargs': {'title': title, 'min_common': min_common}}
+
+
+def analysis_specs(data_frame: pd.DataFrame, category: str, title_format: str = '{} - {}', min_value: float = 0,
+                   **kwargs) -> list:
+    """
+    Describe the analysis figures of all the columns of a days x entities data frame, e.g. all the regions.
+
+    Args:
+        data_frame (pd.DataFrame): the data, indexed by date in dd/mm/yy format, one series per column
+        category (str): the category of the data, e.g. 'terapia_intensiva'
+        title_format (str): the format of the titles, given the name of the column and the category
+        min_value (float): only the values above this value are fitted
+        **kwargs: additional arguments passed to :code:`plot.matplot_analysis_figure`
+
+    Returns:
+        (list): the descriptions of the figures
+    """
+    x, origin = mpl.get_day_numbers(data_frame)
+    if origin is not None:
+        kwargs = dict(kwargs, origin=str(origin))
+    specs = []
+    for col in data_frame.columns:
+        y = data_frame[col].to_numpy(dtype=float)
+        condition = y > min_value
+        specs.append(analysis_spec('{}_{}'.format(col, category), x[condition], y[condition],
+                                   title_format.format(col, category), category, **kwargs))
+    return specs
+
+
+def data_hash(spec: dict) -> str:
+    """
+    Hash the data and the parameters of a figure.
+
+    Args:
+        spec (dict): the description of the figure
+
+    Returns:
+        (str): the hexadecimal digest
+    """
+    h = hashlib.sha1()
+    h.update(repr((renderer_version, spec['kind'], sorted(spec['kwargs'].items()))).encode('utf-8'))
+    data = spec['data']
+    if isinstance(data, pd.DataFrame):
+        h.update(pd.util.hash_pandas_object(data, index=True).to_numpy().tobytes())
+        h.update(repr(data.columns.tolist()).encode('utf-8'))
+    else:
+        for arr in data:
+            h.update(np.ascontiguousarray(arr).tobytes())
+    return h.hexdigest()
+
+
+def file_stem(name: str) -> str:
+    return re.sub(r'[^\w\-.]+', '_', str(name)).strip('_')
+
+
+def _draw(spec: dict) -> Figure:
+    fig = Figure(figsize=(10, 6))
+    FigureCanvasAgg(fig)
+    if spec['kind'] == 'analysis':
+        x, y = spec['data']
+        return mpl.matplot_analysis_figure(x, y, verbose=False, fig=fig, **spec['kwargs'])
+    if spec['kind'] == 'comparative':
+        return mpl.matplot_comparative_figure(spec['data'], fig=fig, **spec['kwargs'])
+    raise ValueError('Unknown kind of figure {}'.format(spec['kind']))
+
+
+def render_figure(spec: dict, directory: str, file_formats=('png',)) -> list:
+    """
+    Render a figure to files, one per format.
+
+    Args:
+        spec (dict): the description of the figure
+        directory (str): the output directory
+        file_formats (tuple): the formats, among :code:`formats`, the html file embeds the svg
+
+    Returns:
+        (list): the names of the files written in the directory
+    """
+    fig = _draw(spec)
+    stem = file_stem(spec['name'])
+    file_names = []
+    svg = None
+    for file_format in file_formats:
+        if file_format not in formats:
+            raise ValueError('Unknown format {}, valid values are {}'.format(file_format, formats))
+        file_name = stem + '.' + file_format
+        if file_format == 'png':
+            fig.savefig(os.path.join(directory, file_name), format='png', bbox_inches='tight')
+        else:
+            # the svg is drawn once for the svg and html files
+            if svg is None:
+                buffer = sysio.StringIO()
+                fig.savefig(buffer, format='svg', bbox_inches='tight')
+                svg = buffer.getvalue()
+            with open(os.path.join(directory, file_name), 'w') as f:
+                if file_format == 'html':
+                    f.write('<!DOCTYPE html>\n<html><head><meta charset="utf-8"><title>{}</title></head><body>\n'
+                            '{}\n</body></html>\n'.format(spec['kwargs'].get('title', stem), svg))
+                else:
+                    f.write(svg)
+        file_names.append(file_name)
+    return file_names
+
+
+def _render_task(spec: dict, directory: str, file_formats: tuple, digest: str) -> tuple:
+    try:
+        return spec['name'], digest, render_figure(spec, directory, file_formats), None
+    except (ValueError, RuntimeError, np.linalg.LinAlgError) as e:
+        return spec['name'], digest, [], '{}: {}'.format(type(e).__name__, e)
+
+
+def load_manifest(directory: str) -> dict:
+    try:
+        with open(os.path.join(directory, manifest_name)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def render_report(specs: list, directory: str, file_formats=('png',), backend: str = 'process', workers: int = None,
+                  force: bool = False) -> dict:
+    """
+    Render many figures to files in parallel, skipping the figures whose data did not change since the last run.
+
+    Args:
+        specs (list): the descriptions of the figures, see :func:`analysis_spec`, :func:`comparative_spec` and
+            :func:`analysis_specs`
+        directory (str): the output directory, created if needed
+        file_formats (tuple): the formats, among :code:`formats`
+        backend (str): the executor backend, see :code:`executor.get_executor`
+        workers (int): the number of workers
+        force (bool): render all the figures even if their data did not change
+
+    Returns:
+        (dict): the status of each figure: 'rendered', 'skipped' or the error raised while rendering it
+    """
+    os.makedirs(directory, exist_ok=True)
+    manifest = load_manifest(directory)
+    file_formats = tuple(file_formats)
+
+    status = dict.fromkeys(spec['name'] for spec in specs)
+    pending = []
+    for spec in specs:
+        digest = data_hash(spec)
+        entry = manifest.get(spec['name'])
+        if not force and entry and entry['hash'] == digest and entry['formats'] == list(file_formats) and \
+                all(os.path.exists(os.path.join(directory, f)) for f in entry['files']):
+            status[spec['name']] = 'skipped'
+        else:
+            pending.append((spec, digest))
+
+    if pending:
+        with ex.get_executor(backend, workers) as executor:
+            futures = [executor.submit(_render_task, spec, directory, file_formats, digest) for spec, digest in pending]
+            for future in futures:
+                name, digest, file_names, error = future.result()
+                if error is None:
+                    manifest[name] = {'hash': digest, 'formats': list(file_formats), 'files': file_names}
+                    status[name] = 'rendered'
+                else:
+                    manifest.pop(name, None)
+                    status[name] = error
+
+    tmp_path = os.path.join(directory, manifest_name + '.tmp')
+    with open(tmp_path, 'w') as f:
+        json.dump(manifest, f, indent=1)
+    os.replace(tmp_path, os.path.join(directory, manifest_name))
+
+    return status
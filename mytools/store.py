@@ -0,0 +1,213 @@
+import json
+import os
+from typing import List, Union
+import numpy as np
+import pandas as pd
+import mytools.dataio as io
+
+# On-disk store of the long format datasets as a memory-mapped date x entity x field array of float64, NaN for the
+# missing values, with the names of the dates, entities and fields in a small json index. Opening a store does not
+# read the values, the pages are loaded on access and shared by all the processes mapping the same file.
+
+values_name = 'values.npy'
+index_name = 'index.json'
+
+
+def _replace_json(path: str, obj):
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(obj, f)
+    os.replace(tmp_path, path)
+
+
+def write_store(data_frame: pd.DataFrame, field: str, path: str, fields: List[str] = None) -> 'Store':
+    """
+    Convert long format data, e.g. as returned by :code:`dataio.italy_load`, into a store.
+
+    Args:
+        data_frame (pd.DataFrame): the data, indexed by date, one row per date and entity
+        field (str): the field containing the name of the entities, e.g. :code:`dataio.italy_region_name_field`
+        path (str): the directory of the store, created if needed, an existing store is replaced
+        fields (list): the numeric fields to store, by default all the numeric columns
+
+    Returns:
+        (Store): the store opened in read only mode
+    """
+    if fields is None:
+        fields = data_frame.select_dtypes('number').columns.tolist()
+
+    dates = data_frame.index.unique()
+    entities = pd.Index(data_frame[field].unique())
+    rows = dates.get_indexer(data_frame.index)
+    cols = entities.get_indexer(data_frame[field])
+
+    os.makedirs(path, exist_ok=True)
+    tmp_path = os.path.join(path, values_name + '.tmp')
+    values = np.lib.format.open_memmap(tmp_path, mode='w+', dtype=np.float64,
+                                       shape=(len(dates), len(entities), len(fields)))
+    values[:] = np.nan
+    for k, name in enumerate(fields):
+        values[rows, cols, k] = data_frame[name].to_numpy(dtype=np.float64)
+    values.flush()
+    del values
+    os.replace(tmp_path, os.path.join(path, values_name))
+
+    _replace_json(os.path.join(path, index_name), {'dates': [str(d) for d in dates],
+                                                   'entities': [str(e) for e in entities], 'fields': list(fields),
+                                                   'field': field})
+    return open_store(path)
+
+
+def open_store(path: str) -> 'Store':
+    """
+    Open a store written by :func:`write_store` in read only mode.
+
+    Args:
+        path (str): the directory of the store
+
+    Returns:
+        (Store): the store
+    """
+    with open(os.path.join(path, index_name)) as f:
+        index = json.load(f)
+    values = np.load(os.path.join(path, values_name), mmap_mode='r')
+    return Store(path, values, pd.Index(index['dates']), pd.Index(index['entities']), pd.Index(index['fields']))
+
+
+def _selector(index: pd.Index, labels) -> Union[int, slice, np.array]:
+    """
+    Translate labels into an indexer of the axis, a slice when possible so that numpy returns a view.
+    """
+    if labels is None:
+        return slice(None)
+    if isinstance(labels, str):
+        return index.get_loc(labels)
+    positions = index.get_indexer(labels)
+    if (positions < 0).any():
+        raise KeyError('Unknown labels {}'.format([lab for lab, p in zip(labels, positions) if p < 0]))
+    steps = np.unique(np.diff(positions))
+    if positions.size == 0:
+        return slice(0, 0)
+    if positions.size == 1 or (steps.size == 1 and steps[0] > 0):
+        return slice(positions[0], positions[-1] + 1, steps[0] if positions.size > 1 else 1)
+    return positions
+
+
+class Store:
+    """
+    A date x entity x field array mapped from the disk with the names of its axes.
+
+    The selections by a single label, by contiguous (or evenly spaced) labels or by all the labels of an axis are
+    views on the mapped file, other selections are copies. The store is pickled by path, hence sending it to worker
+    processes does not copy the data.
+
+    Attributes:
+        path (str): the directory of the store
+        values (np.memmap): the read only date x entity x field values
+        dates (pd.Index): the dates in dd/mm/yy format
+        entities (pd.Index): the names of the entities
+        fields (pd.Index): the names of the fields
+    """
+
+    def __init__(self, path: str, values: np.array, dates: pd.Index, entities: pd.Index, fields: pd.Index):
+        self.path = path
+        self.values = values
+        self.dates = dates
+        self.entities = entities
+        self.fields = fields
+
+    def __reduce__(self):
+        return open_store, (self.path,)
+
+    def __repr__(self):
+        return 'Store({!r}, dates={}, entities={}, fields={})'.format(self.path, len(self.dates), len(self.entities),
+                                                                     len(self.fields))
+
+    def view(self, entities: Union[str, List[str]] = None, fields: Union[str, List[str]] = None,
+             dates: Union[str, List[str]] = None) -> np.array:
+        """
+        Select a part of the values, by default all the dates, entities and fields.
+
+        Args:
+            entities (str or list): the name of an entity or a list of names
+            fields (str or list): the name of a field or a list of names
+            dates (str or list): a date or a list of dates
+
+        Returns:
+            (np.array): the values, the axes selected by a single name are dropped
+        """
+        return self.values[_selector(self.dates, dates), _selector(self.entities, entities),
+                           _selector(self.fields, fields)]
+
+    def frame(self, field: str, entities: List[str] = None) -> pd.DataFrame:
+        """
+        Get the days x entities frame of a field, like :code:`dataio.italy_filter_by_category`.
+
+        Args:
+            field (str): the name of the field, e.g. :code:`dataio.italy_intensive_care_field`
+            entities (list): the names of the entities, all by default
+
+        Returns:
+            (pd.DataFrame): the read only frame, sharing the memory of the store when the selection is a view
+        """
+        selector = _selector(self.entities, entities)
+        return pd.DataFrame(self.values[:, selector, self.fields.get_loc(field)], index=self.dates,
+                            columns=self.entities[selector], copy=False)
+
+    def entity_frame(self, entity: str, fields: List[str] = None) -> pd.DataFrame:
+        """
+        Get the days x fields frame of an entity.
+
+        Args:
+            entity (str): the name of the entity
+            fields (list): the names of the fields, all by default
+
+        Returns:
+            (pd.DataFrame): the read only frame, sharing the memory of the store when the selection is a view
+        """
+        selector = _selector(self.fields, fields)
+        return pd.DataFrame(self.values[:, self.entities.get_loc(entity), selector], index=self.dates,
+                            columns=self.fields[selector], copy=False)
+
+
+def italy_write_store(path: str, level: str = 'region', file_name: str = None) -> Store:
+    """
+    Convert the pcm-dpc regional or provincial dataset into a store.
+
+    Args:
+        path (str): the directory of the store
+        level (str): 'region' or 'province'
+        file_name (str): the URL or the path of the CSV file, the pcm-dpc dataset of the level by default
+
+    Returns:
+        (Store): the store opened in read only mode
+    """
+    if level == 'region':
+        field = io.italy_region_name_field
+        file_name = io.italy_get_filename_regions() if file_name is None else file_name
+    elif level == 'province':
+        field = io.italy_province_name_field
+        file_name = io.italy_get_filename_provinces() if file_name is None else file_name
+    else:
+        raise ValueError('Unknown level {}'.format(level))
+
+    return write_store(io.italy_load(file_name, field), field, path)
+
+
+def italy_open_store(path: str, level: str = 'region', file_name: str = None, refresh: bool = False) -> Store:
+    """
+    Open the store of the pcm-dpc regional or provincial dataset, writing it first if it does not exist.
+
+    Args:
+        path (str): the directory of the store
+        level (str): 'region' or 'province'
+        file_name (str): the URL or the path of the CSV file the store is written from, the pcm-dpc dataset of the
+            level by default
+        refresh (bool): write the store again, e.g. after the dataset was updated
+
+    Returns:
+        (Store): the store opened in read only mode
+    """
+    if refresh or not os.path.exists(os.path.join(path, index_name)):
+        return italy_write_store(path, level, file_name)
+    return open_store(path)
@@ -0,0 +1,150 @@
+import argparse
+import os
+import tempfile
+import time
+import tracemalloc
+import numpy as np
+import mytools.dataio as io
+import mytools.date as dt
+import mytools.fitcache as fitcache
+import mytools.regression as reg
+import test.synthetic as synthetic
+
+# Offline benchmarks of the fitting, loading and date conversion hot paths on synthetic data.
+# Run from the root of the repository with :code:`python -m test.benchmark`, see --help for the options.
+
+
+def measure(fun: callable, repeat: int = 3, setup: callable = None) -> tuple:
+    """
+    Measure the best wall time over some runs and the peak memory allocated by a run.
+
+    Args:
+        fun (callable): the function to measure, called without arguments
+        repeat (int): the number of timed runs
+        setup (callable): a function called before each run, outside of the measure
+
+    Returns:
+        (tuple): tuple containing:
+
+            seconds (float) : the best wall time
+            peak (int) : the peak memory allocated during an additional traced run, in bytes
+    """
+    best = np.inf
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        fun()
+        best = min(best, time.perf_counter() - start)
+
+    if setup is not None:
+        setup()
+    tracemalloc.start()
+    fun()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return best, peak
+
+
+def bench_fit(sizes: list, repeat: int) -> list:
+    rows = []
+    models = [('exponential', reg.fit_exponential, reg.fit_exponential_batch),
+              ('sigmoid', reg.fit_sigmoid, reg.fit_sigmoid_batch),
+              ('logistic_distribution', reg.fit_logistic_distribution, reg.fit_logistic_distribution_batch)]
+    for num_entities, num_days in sizes:
+        y = synthetic.sigmoid_series(num_entities, num_days).astype(float)
+        x = np.arange(num_days, dtype=float) + 55
+        for name, fit, fit_batch in models:
+            data = np.diff(y, axis=0, prepend=0) if name == 'logistic_distribution' else y
+            seconds, peak = measure(lambda: [fit(x, data[:, j]) for j in range(num_entities)], repeat)
+            rows.append(('fit_model ' + name, num_entities, num_days, seconds, peak))
+            seconds, peak = measure(lambda: fit_batch(x, data), repeat)
+            rows.append(('fit_model_batch ' + name, num_entities, num_days, seconds, peak))
+    return rows
+
+
+def bench_load(sizes: list, repeat: int, directory: str) -> list:
+    rows = []
+    for num_entities, num_days in sizes:
+        file_name = os.path.join(directory, 'provinces_{}_{}.csv'.format(num_entities, num_days))
+        synthetic.write_italy_csv(file_name, num_entities, num_days, level='province')
+
+        seconds, peak = measure(lambda: io.italy_load(file_name, io.italy_province_name_field, None), repeat,
+                                setup=io.clear_loaded_sources)
+        rows.append(('italy_load', num_entities, num_days, seconds, peak))
+
+        data_frame = io.italy_load(file_name, io.italy_province_name_field, None)
+        seconds, peak = measure(lambda: io.italy_provinces_filter_by_category(data_frame, io.italy_total_cases_field),
+                                repeat)
+        rows.append(('italy_filter_by_category', num_entities, num_days, seconds, peak))
+
+        file_name = os.path.join(directory, 'world_{}_{}.csv'.format(num_entities, num_days))
+        synthetic.write_world_csv(file_name, num_entities, num_days)
+        seconds, peak = measure(lambda: io.world_load_cases(file_name, ['Country 0', 'Country 4']), repeat,
+                                setup=io.clear_loaded_sources)
+        rows.append(('world_load_cases', num_entities, num_days, seconds, peak))
+        seconds, peak = measure(lambda: io.world_stream_cases(file_name, ['Country 0', 'Country 4']), repeat)
+        rows.append(('world_stream_cases', num_entities, num_days, seconds, peak))
+    io.clear_loaded_sources()
+    return rows
+
+
+def bench_date(sizes: list, repeat: int) -> list:
+    rows = []
+    for num_entities, num_days in sizes:
+        dates = synthetic.italy_data_frame(num_entities, num_days)[io.italy_date_field].tolist()
+        seconds, peak = measure(lambda: dt.str_convert_date(dates, dt.format_ISO8601, dt.format_ddmmyy), repeat)
+        rows.append(('str_convert_date', num_entities, num_days, seconds, peak))
+
+        short_dates = dt.str_convert_date(dates, dt.format_ISO8601, dt.format_ddmmyy)
+        seconds, peak = measure(lambda: dt.str_to_day_of_year(short_dates, dt.format_ddmmyy), repeat)
+        rows.append(('str_to_day_of_year', num_entities, num_days, seconds, peak))
+
+        days = list(range(1, num_days + 1)) * num_entities
+        seconds, peak = measure(lambda: dt.day_of_year_to_string(days), repeat)
+        rows.append(('day_of_year_to_string', num_entities, num_days, seconds, peak))
+    return rows
+
+
+def parse_size(size: str) -> tuple:
+    num_entities, num_days = size.lower().split('x')
+    return int(num_entities), int(num_days)
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description='Offline benchmarks of mytools on synthetic data')
+    parser.add_argument('--sizes', nargs='+', type=parse_size, default=[(21, 100), (130, 300)],
+                        help='the sizes as <entities>x<days>, default: 21x100 130x300')
+    parser.add_argument('--suites', nargs='+', choices=['fit', 'load', 'date'], default=['fit', 'load', 'date'])
+    parser.add_argument('--repeat', type=int, default=3, help='the number of timed runs, the best is kept')
+    parser.add_argument('--output', help='also write the results to this CSV file')
+    args = parser.parse_args(args)
+
+    # the fits are timed, not the lookups of the fit cache
+    fitcache.enabled = False
+    rows = []
+    with tempfile.TemporaryDirectory() as directory:
+        if 'fit' in args.suites:
+            rows += bench_fit(args.sizes, args.repeat)
+        if 'load' in args.suites:
+            rows += bench_load(args.sizes, args.repeat, directory)
+        if 'date' in args.suites:
+            rows += bench_date(args.sizes, args.repeat)
+
+    header = ('benchmark', 'entities', 'days', 'seconds', 'peak_bytes')
+    print('{:<40} {:>8} {:>6} {:>10} {:>12}'.format(*header))
+    for name, num_entities, num_days, seconds, peak in rows:
+        print('{:<40} {:>8} {:>6} {:>10.4f} {:>12}'.format(name, num_entities, num_days, seconds, peak))
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(','.join(header) + '\n')
+            for row in rows:
+                f.write(','.join(str(v) for v in row) + '\n')
+
+    return rows
+
+
+if __name__ == '__main__':
+    main()
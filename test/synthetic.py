@@ -0,0 +1,137 @@
+import datetime
+import numpy as np
+import pandas as pd
+import mytools.dataio as io
+import mytools.date as dt
+import mytools.regression as reg
+
+# Generators of synthetic datasets shaped like the pcm-dpc and JHU sources, to test and benchmark offline.
+
+first_day = datetime.datetime(2020, 2, 24, 18)
+
+italy_numeric_fields = [io.italy_hospitalized_with_symptoms_field, io.italy_intensive_care_field,
+                        io.italy_hospitalized_field, io.italy_isolation_field, io.italy_current_positives_field,
+                        io.italy_new_positives_field, io.italy_discharged_field, io.italy_deaths_field,
+                        io.italy_total_cases_field, io.italy_tests_field]
+
+
+def sigmoid_series(num_entities: int, num_days: int, seed: int = 0) -> np.array:
+    """
+    Generate noisy cumulative counts following sigmoids with random parameters.
+
+    Args:
+        num_entities (int): the number of series
+        num_days (int): the number of days
+        seed (int): the seed of the random generator
+
+    Returns:
+        (np.array): the num_days x num_entities non decreasing integer counts
+    """
+    rng = np.random.default_rng(seed)
+    days = np.arange(num_days, dtype=float)[:, np.newaxis]
+    p = np.array([rng.uniform(0.2, 0.6, num_entities) * num_days, np.zeros(num_entities),
+                  10 ** rng.uniform(2, 5, num_entities), rng.uniform(4, 12, num_entities) / num_days])
+    y = reg.sigmoid(p, days) * (1 + 0.05 * rng.standard_normal((num_days, num_entities)))
+    return np.maximum.accumulate(np.maximum(y, 0), axis=0).round().astype(np.int64)
+
+
+def sigmoid_matrix(x, p, noise: float = 0.02, seed: int = 0, leading_nan: dict = None,
+                   empty_columns: int = 0) -> np.array:
+    """
+    Evaluate sigmoids of given parameters on a common abscissa, with a multiplicative gaussian noise.
+
+    Args:
+        x (np.array): the abscissa
+        p (np.array): the 4 x num_series parameters [x0, y0, c, k], one column per series
+        noise (float): the standard deviation of the relative noise
+        seed (int): the seed of the random generator
+        leading_nan (dict): the number of leading missing values of some series, by column, e.g. a series starting
+            later
+        empty_columns (int): the number of all NaN series appended, which cannot be fitted
+
+    Returns:
+        (np.array): the len(x) x (num_series + empty_columns) values
+    """
+    rng = np.random.default_rng(seed)
+    x = np.asarray(x, dtype=float)
+    p = np.asarray(p, dtype=float)
+    y = reg.sigmoid(p, x[:, np.newaxis]) * (1 + noise * rng.standard_normal((x.size, p.shape[1])))
+    for column, count in (leading_nan or {}).items():
+        y[:count, column] = np.nan
+    return np.column_stack([y, np.full((x.size, empty_columns), np.nan)])
+
+
+def italy_data_frame(num_entities: int, num_days: int, level: str = 'province', seed: int = 0) -> pd.DataFrame:
+    """
+    Generate a long format data frame with the columns of the pcm-dpc regional or provincial datasets.
+
+    Args:
+        num_entities (int): the number of regions or provinces
+        num_days (int): the number of days
+        level (str): 'region' or 'province'
+        seed (int): the seed of the random generator
+
+    Returns:
+        the data frame, one row per day and entity
+    """
+    dates = [(first_day + datetime.timedelta(days=d)).strftime(dt.format_ISO8601) for d in range(num_days)]
+    columns = {io.italy_date_field: np.repeat(dates, num_entities), 'stato': 'ITA'}
+    if level == 'province':
+        num_regions = max(1, num_entities // 6)
+        region = np.arange(num_entities) % num_regions
+        columns['codice_regione'] = np.tile(region + 1, num_days)
+        columns[io.italy_region_name_field] = np.tile(['Regione {}'.format(r) for r in region], num_days)
+        columns['codice_provincia'] = np.tile(np.arange(num_entities) + 1, num_days)
+        columns[io.italy_province_name_field] = np.tile(['Provincia {}'.format(e) for e in range(num_entities)],
+                                                        num_days)
+        columns[io.italy_total_cases_field] = sigmoid_series(num_entities, num_days, seed).ravel()
+    elif level == 'region':
+        columns['codice_regione'] = np.tile(np.arange(num_entities) + 1, num_days)
+        columns[io.italy_region_name_field] = np.tile(['Regione {}'.format(e) for e in range(num_entities)], num_days)
+        for i, field in enumerate(italy_numeric_fields):
+            columns[field] = sigmoid_series(num_entities, num_days, seed + i).ravel()
+    else:
+        raise ValueError('Unknown level {}'.format(level))
+
+    return pd.DataFrame(columns)
+
+
+def world_data_frame(num_countries: int, num_days: int, seed: int = 0) -> pd.DataFrame:
+    """
+    Generate a wide data frame with the columns of the JHU global time series datasets.
+
+    Args:
+        num_countries (int): the number of countries, every fifth one is split in 3 provinces plus an overall row
+        num_days (int): the number of days
+        seed (int): the seed of the random generator
+
+    Returns:
+        the data frame, one row per country or province and one column per day
+    """
+    provinces, countries = [], []
+    for c in range(num_countries):
+        name = 'Country {}'.format(c)
+        if c % 5 == 4:
+            provinces += ['Province {} {}'.format(c, p) for p in range(3)] + [name]
+            countries += [name] * 4
+        else:
+            provinces.append(np.nan)
+            countries.append(name)
+
+    first_date = datetime.datetime.strptime(io.world_first_date, dt.format_mmddyy)
+    dates = ['{d.month}/{d.day}/{d:%y}'.format(d=first_date + datetime.timedelta(days=d)) for d in range(num_days)]
+
+    rng = np.random.default_rng(seed)
+    frame = pd.DataFrame({io.world_province_name_field: provinces, io.world_country_name_field: countries,
+                          'Lat': rng.uniform(-60, 60, len(countries)), 'Long': rng.uniform(-180, 180, len(countries))})
+    values = pd.DataFrame(sigmoid_series(len(countries), num_days, seed).T, columns=dates)
+
+    return pd.concat([frame, values], axis=1)
+
+
+def write_italy_csv(file_name: str, num_entities: int, num_days: int, level: str = 'province', seed: int = 0):
+    italy_data_frame(num_entities, num_days, level, seed).to_csv(file_name, index=False)
+
+
+def write_world_csv(file_name: str, num_countries: int, num_days: int, seed: int = 0):
+    world_data_frame(num_countries, num_days, seed).to_csv(file_name, index=False)
@@ -0,0 +1,62 @@
+import unittest
+import mytools.backtest as bt
+import mytools.executor as ex
+import mytools.regression as reg
+import numpy as np
+import pandas as pd
+import test.synthetic as synthetic
+
+
+class TestBacktest(unittest.TestCase):
+
+    def setUp(self):
+        self.x = np.arange(50, 110, dtype=float)
+        p = np.array([[80, 5, 1000, 0.15], [90, 2, 3000, 0.1], [70, 0, 500, 0.2]]).T
+        self.data_frame = pd.DataFrame(synthetic.sigmoid_matrix(self.x, p, leading_nan={2: 20}),
+                                       columns=['c', 'b', 'a'])
+
+    def test_error_table(self):
+        table = bt.backtest(self.x, self.data_frame, models=['sigmoid'], horizons=(1, 5), min_points=15, step=5)
+        self.assertListEqual(table.columns.tolist(), bt.columns)
+        self.assertListEqual(table['entity'].cat.categories.tolist(), ['c', 'b', 'a'])
+        # the first origin is the 15th day, the last series starts later
+        self.assertEqual(table['origin'].min(), 64)
+        self.assertEqual(table.loc[table['entity'] == 'a', 'origin'].min(), 84)
+        self.assertTrue(set(table['horizon']) == {1, 5})
+        np.testing.assert_allclose(table['error'], table['forecast'] - table['actual'])
+
+        # the last origin is fitted on the whole series but the last 5 days
+        last = table[(table['entity'] == 'b') & (table['origin'] == 104) & (table['horizon'] == 5)]
+        model, _, _ = reg.fit_sigmoid(self.x[:-5], self.data_frame['b'].to_numpy()[:-5])
+        self.assertAlmostEqual(last['forecast'].iloc[0], reg.sigmoid(model, self.x[-1]),
+                               delta=1e-4 * self.data_frame['b'].max())
+
+        summary = bt.score(table)
+        self.assertListEqual(summary.columns.tolist(), ['count', 'mae', 'rmse', 'mape'])
+        self.assertLess(summary.loc[('sigmoid', 1), 'mape'], 10)
+
+    def test_tasks_agree(self):
+        kwargs = {'models': ['exponential', 'logistic_distribution'], 'horizons': (3,), 'min_points': 40}
+        expected = bt.backtest(self.x, self.data_frame, **kwargs)
+        with ex.get_executor('thread', workers=2) as executor:
+            table = bt.backtest(self.x, self.data_frame, executor=executor, chunk_size=2, origins_per_task=5, **kwargs)
+        table = table.sort_values(['model', 'entity', 'origin']).reset_index(drop=True)
+        expected = expected.sort_values(['model', 'entity', 'origin']).reset_index(drop=True)
+        pd.testing.assert_frame_equal(table[bt.columns[:5]], expected[bt.columns[:5]])
+        np.testing.assert_allclose(table['forecast'], expected['forecast'], rtol=1e-3)
+
+        with self.assertRaises(ValueError):
+            bt.backtest_series(self.x, self.data_frame['a'], 'gompertz')
+
+    def test_data_frame_new_year(self):
+        # the windows crossing the new year are fitted on a continuous abscissa
+        data_frame = self.data_frame.set_axis(pd.date_range('2020-12-01', periods=self.x.size).strftime('%d/%m/%y'))
+        kwargs = {'models': ['sigmoid'], 'horizons': (1, 7), 'min_points': 20, 'step': 10}
+        table = bt.backtest_data_frame(data_frame, **kwargs)
+        expected = bt.backtest(self.x - self.x[0], self.data_frame, **kwargs)
+        pd.testing.assert_frame_equal(table[bt.columns[:5]], expected[bt.columns[:5]])
+        np.testing.assert_allclose(table['forecast'], expected['forecast'], rtol=1e-4)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,56 @@
+import unittest
+import mytools.bootstrap as bs
+import mytools.regression as reg
+import numpy as np
+import test.synthetic as synthetic
+
+
+class TestBootstrap(unittest.TestCase):
+
+    def setUp(self):
+        self.x = np.arange(50, 150, dtype=float)
+        self.p = np.array([[90, 5, 1000, 0.1], [100, 2, 3000, 0.08]]).T
+        self.y = synthetic.sigmoid_matrix(self.x, self.p, noise=0.03)
+
+    def test_sigmoid_intervals(self):
+        y = synthetic.sigmoid_matrix(self.x, self.p, noise=0.03, empty_columns=1)
+        results = bs.bootstrap_batch(self.x, y, 'sigmoid', num_replicates=100, seed=0)
+        self.assertEqual(len(results), 3)
+        self.assertTrue(np.isnan(results[2].replicates).all())
+
+        for result in results[:2]:
+            self.assertEqual(result.replicates.shape, (100, 4))
+            lower, upper = result.parameter_intervals()
+            self.assertTrue(np.all(lower <= result.fit.model) and np.all(result.fit.model <= upper))
+            lower, upper = result.flex_interval()
+            self.assertLessEqual(lower[0], result.fit.model[0])
+            self.assertLessEqual(result.fit.model[0], upper[0])
+
+            days = np.arange(150, 170, dtype=float)
+            estimate, lower, upper = result.forecast(days)
+            np.testing.assert_allclose(estimate, reg.sigmoid(result.fit.model, days))
+            self.assertTrue(np.all(lower <= upper))
+
+        narrow = results[0].asymptote_interval(0.5)
+        wide = results[0].asymptote_interval(0.99)
+        self.assertLessEqual(wide[0, 1], narrow[0, 1])
+        self.assertGreaterEqual(wide[1, 1], narrow[1, 1])
+
+    def test_chunks(self):
+        whole = bs.bootstrap_batch(self.x, self.y, 'sigmoid', num_replicates=30, seed=2)
+        chunked = bs.bootstrap_batch(self.x, self.y, 'sigmoid', num_replicates=30, seed=2, chunk_size=7)
+        for a, b in zip(whole, chunked):
+            np.testing.assert_allclose(a.replicates, b.replicates, rtol=1e-10)
+
+    def test_single_series(self):
+        y = np.diff(self.y[:, 0], prepend=0)
+        result = bs.bootstrap(self.x, y, 'logistic_distribution', num_replicates=50, seed=1, label='a')
+        self.assertEqual(result.fit.label, 'a')
+        self.assertEqual(result.peak_interval().shape, (2, 2))
+
+        with self.assertRaises(ValueError):
+            bs.bootstrap(self.x, y, 'gompertz')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,84 @@
+import http.server
+import tempfile
+import threading
+import unittest
+import mytools.cache as cache
+
+
+class CsvHandler(http.server.BaseHTTPRequestHandler):
+    content = b'a,b\n1,2\n3,4\n'
+    etag = '"v1"'
+    requests = []
+
+    def do_GET(self):
+        CsvHandler.requests.append(self.headers.get('If-None-Match'))
+        if self.headers.get('If-None-Match') == CsvHandler.etag:
+            self.send_response(304)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header('ETag', CsvHandler.etag)
+        self.send_header('Content-Length', str(len(CsvHandler.content)))
+        self.end_headers()
+        self.wfile.write(CsvHandler.content)
+
+    def log_message(self, *args):
+        pass
+
+
+class TestCache(unittest.TestCase):
+
+    def setUp(self):
+        self.server = http.server.HTTPServer(('127.0.0.1', 0), CsvHandler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.url = 'http://127.0.0.1:{}/data.csv'.format(self.server.server_port)
+        self.directory = tempfile.TemporaryDirectory()
+        CsvHandler.content, CsvHandler.etag, CsvHandler.requests = b'a,b\n1,2\n3,4\n', '"v1"', []
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.directory.cleanup()
+
+    def test_revalidation(self):
+        frame = cache.read_csv(self.url, directory=self.directory.name)
+        self.assertListEqual(frame['b'].tolist(), [2, 4])
+
+        # fresh copy: no request at all
+        cache.read_csv(self.url, directory=self.directory.name)
+        self.assertListEqual(CsvHandler.requests, [None])
+
+        # expired copy: conditional request answered with 304
+        frame = cache.read_csv(self.url, ttl=0, directory=self.directory.name)
+        self.assertListEqual(CsvHandler.requests, [None, '"v1"'])
+        self.assertListEqual(frame['a'].tolist(), [1, 3])
+
+        # the remote file changed
+        CsvHandler.content, CsvHandler.etag = b'a,b\n5,6\n', '"v2"'
+        frame = cache.read_csv(self.url, ttl=0, directory=self.directory.name)
+        self.assertListEqual(frame['a'].tolist(), [5])
+
+        self.server.shutdown()
+        frame = cache.read_csv(self.url, ttl=0, offline_mode=True, directory=self.directory.name)
+        self.assertListEqual(frame['a'].tolist(), [5])
+
+    def test_fetch(self):
+        path = cache.fetch(self.url, directory=self.directory.name)
+        with open(path, 'rb') as f:
+            self.assertEqual(f.read(), b'a,b\n1,2\n3,4\n')
+        self.assertEqual(cache.fetch(self.url, ttl=0, directory=self.directory.name), path)
+        self.assertListEqual(CsvHandler.requests, [None, '"v1"'])
+
+        CsvHandler.content, CsvHandler.etag = b'a,b\n5,6\n', '"v2"'
+        cache.fetch(self.url, ttl=0, directory=self.directory.name)
+        with open(path, 'rb') as f:
+            self.assertEqual(f.read(), b'a,b\n5,6\n')
+
+    def test_offline_without_cache(self):
+        with self.assertRaises(FileNotFoundError):
+            cache.read_csv(self.url, offline_mode=True, directory=self.directory.name)
+        self.assertListEqual(CsvHandler.requests, [])
+
+
+if __name__ == '__main__':
+    unittest.main()
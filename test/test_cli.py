@@ -0,0 +1,90 @@
+import os
+import re
+import tempfile
+import unittest
+import numpy as np
+import pandas as pd
+import mytools.cli as cli
+import mytools.dataio as io
+import mytools.date as dt
+import mytools.executor as ex
+import mytools.report as report
+import test.synthetic as synthetic
+
+
+class TestCli(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.output = os.path.join(self.directory.name, 'output')
+        io.clear_loaded_sources()
+
+    def tearDown(self):
+        io.clear_loaded_sources()
+        self.directory.cleanup()
+
+    def test_region(self):
+        file_name = os.path.join(self.directory.name, 'regions.csv')
+        synthetic.write_italy_csv(file_name, num_entities=4, num_days=40, level='region')
+        status = cli.main(['region', '--file', file_name, '--output', self.output, '--categories', 'totale_casi',
+                           '--models', 'sigmoid', '--horizon', '7', '--backend', 'serial', '--quiet'])
+        self.assertEqual(status, 0)
+
+        parameters = pd.read_csv(os.path.join(self.output, 'region_parameters.csv'))
+        self.assertEqual(len(parameters), 4)
+        self.assertTrue(parameters['success'].all())
+        self.assertTrue(parameters[['x0', 'y0', 'c', 'k']].notna().all().all())
+
+        forecasts = pd.read_csv(os.path.join(self.output, 'region_forecasts.csv'))
+        self.assertEqual(len(forecasts), 4 * 7)
+        self.assertListEqual(forecasts['date'].iloc[:2].tolist(), ['2020-04-04', '2020-04-05'])
+
+        # the same fits from the memory-mapped store
+        store_dir = os.path.join(self.directory.name, 'stores')
+        cli.main(['region', '--file', file_name, '--output', self.output, '--categories', 'totale_casi',
+                  '--models', 'sigmoid', '--horizon', '7', '--backend', 'serial', '--quiet', '--store', store_dir])
+        self.assertTrue(os.path.isdir(os.path.join(store_dir, 'region')))
+        pd.testing.assert_frame_equal(pd.read_csv(os.path.join(self.output, 'region_parameters.csv')), parameters)
+
+    def test_new_year(self):
+        # the day of the year starts again in January, the days since the first date do not
+        dates = pd.date_range('2020-11-20', periods=80, freq='D').strftime('%d/%m/%y')
+        frames = {'totale_casi': pd.DataFrame(synthetic.sigmoid_series(3, 80).astype(float), index=dates,
+                                              columns=['A', 'B', 'C'])}
+        x, origin = dt.str_to_day_numbers(frames['totale_casi'].index, dt.format_ddmmyy)
+        np.testing.assert_array_equal(x, np.arange(80))
+        self.assertEqual(origin, np.datetime64('2020-11-20'))
+
+        fits = cli.fit_frames(frames, ['sigmoid'], ex.SerialExecutor())
+        self.assertTrue(all(r.success for r in fits['totale_casi', 'sigmoid']))
+        forecasts = cli.forecasts_table(fits, frames, horizon=3)
+        self.assertListEqual(forecasts['date'].iloc[:3].tolist(), ['2021-02-08', '2021-02-09', '2021-02-10'])
+        self.assertListEqual(forecasts['day'].iloc[:3].tolist(), [80, 81, 82])
+
+        # the figures share the abscissa of the fits and label it from the first date
+        specs = cli.figure_specs(frames, ['sigmoid'])
+        np.testing.assert_array_equal(specs[0]['data'][0], x)
+        self.assertEqual(specs[0]['kwargs']['origin'], '2020-11-20')
+        status = report.render_report(specs[:1], self.output, ['svg'], backend='serial')
+        self.assertDictEqual(status, {'A_totale_casi': 'rendered'})
+        with open(os.path.join(self.output, 'A_totale_casi.svg')) as f:
+            labels = re.findall(r'<!-- (\d\d \w\w\w) -->', f.read())
+        self.assertIn('20 Nov', labels)
+        self.assertEqual(labels[labels.index('20 Nov') + 1], '09 Jan')
+
+    def test_world(self):
+        for category, seed in [('confirmed', 0), ('deaths', 1)]:
+            synthetic.write_world_csv(os.path.join(self.directory.name, 'world_{}.csv'.format(category)),
+                                      num_countries=5, num_days=40, seed=seed)
+        cli.main(['world', '--file', os.path.join(self.directory.name, 'world_{}.csv'), '--output', self.output,
+                  '--entities', 'Country 1', 'Country 4', '--models', 'exponential', 'sigmoid', '--figures', 'svg',
+                  '--backend', 'serial', '--quiet'])
+
+        parameters = pd.read_csv(os.path.join(self.output, 'world_parameters.csv'))
+        self.assertEqual(len(parameters), 2 * 2 * 2)
+        self.assertTrue(parameters.loc[parameters['model'] == 'exponential', 'c'].isna().all())
+        self.assertTrue(os.path.exists(os.path.join(self.output, 'figures', 'Country_4_deaths.svg')))
+
+
+if __name__ == '__main__':
+    unittest.main()
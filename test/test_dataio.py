@@ -1,5 +1,10 @@
+import os
+import tempfile
 import unittest
+import numpy as np
+import pandas as pd
 import mytools.dataio as io
+import test.synthetic as synthetic
 
 
 class TesterItaly(unittest.TestCase):
@@ -20,5 +25,108 @@ class TesterItaly(unittest.TestCase):
         self.assertListEqual(io.italy_get_list_of_regions(), self.regions_of_italy)
 
 
+class TesterLoadedSources(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.file_names = []
+        for i in range(3):
+            file_name = os.path.join(self.directory.name, 'regions{}.csv'.format(i))
+            with open(file_name, 'w') as f:
+                f.write('data,denominazione_regione,terapia_intensiva\n'
+                        '2020-02-24T18:00:00,Veneto,1\n'
+                        '2020-02-24T18:00:00,Lombardia,{}\n'
+                        '2020-02-25T18:00:00,Veneto,2\n'
+                        '2020-02-25T18:00:00,Lombardia,5\n'.format(i))
+            self.file_names.append(file_name)
+        io.clear_loaded_sources()
+
+    def tearDown(self):
+        io.clear_loaded_sources()
+        self.directory.cleanup()
+
+    def test_parsed_once(self):
+        frame = io.load_source(self.file_names[0])
+        self.assertIs(io.load_source(self.file_names[0]), frame)
+
+        regions = io.italy_load(self.file_names[0], io.italy_region_name_field, ['Veneto'])
+        self.assertListEqual(regions.index.tolist(), ['24/02/20', '25/02/20'])
+        self.assertIs(io.load_source(self.file_names[0]), frame)
+        self.assertListEqual(frame.index.tolist(), [0, 1, 2, 3])
+
+    def test_bounded_registry(self):
+        max_entries = io.loaded_sources_max_entries
+        io.loaded_sources_max_entries = 2
+        try:
+            frames = [io.load_source(f) for f in self.file_names]
+            self.assertIsNot(io.load_source(self.file_names[0]), frames[0])
+            self.assertIs(io.load_source(self.file_names[2]), frames[2])
+        finally:
+            io.loaded_sources_max_entries = max_entries
+
+    def test_synthetic_provinces(self):
+        file_name = os.path.join(self.directory.name, 'provinces.csv')
+        synthetic.write_italy_csv(file_name, num_entities=12, num_days=30)
+        provinces = io.italy_load(file_name, io.italy_province_name_field, None)
+        wide = io.italy_provinces_filter_by_category(provinces, io.italy_total_cases_field)
+        self.assertEqual(wide.shape, (30, 12))
+        self.assertTrue((wide.diff().iloc[1:] >= 0).all().all())
+
+
+class TesterWorldStream(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.file_name = os.path.join(self.directory.name, 'world.csv')
+        synthetic.write_world_csv(self.file_name, num_countries=10, num_days=40)
+        io.clear_loaded_sources()
+
+    def tearDown(self):
+        io.clear_loaded_sources()
+        self.directory.cleanup()
+
+    def test_same_as_whole_file(self):
+        for countries in [['Country 1'], ['Country 4', 'Province 4 1', 'Country 7'], None]:
+            expected = io.world_load_cases(self.file_name, countries)
+            streamed = io.world_load_cases(self.file_name, countries, stream=True)
+            pd.testing.assert_frame_equal(streamed, expected, check_dtype=False)
+            self.assertTrue((streamed.dtypes == np.int32).all())
+
+    def test_missing_values(self):
+        frame = synthetic.world_data_frame(3, 5)
+        frame.iloc[1, -1] = np.nan
+        frame.to_csv(self.file_name, index=False)
+        streamed = io.world_stream_cases(self.file_name, ['Country 1'])
+        self.assertEqual(streamed.dtypes.iloc[0], np.float64)
+        self.assertTrue(np.isnan(streamed.iloc[-1, 0]))
+        self.assertListEqual(io.world_stream_cases(self.file_name, ['Unknown']).columns.tolist(), [])
+
+
+class TesterFilterByCategory(unittest.TestCase):
+
+    def setUp(self):
+        # Padova misses the second day
+        self.data_frame = pd.DataFrame({io.italy_province_name_field: ['Verona', 'Padova', 'Verona', 'Verona',
+                                                                       'Padova'],
+                                        'totale_casi': [1, 2, 3, 5, 8],
+                                        'tamponi': [10, 20, 30, 50, 80]},
+                                       index=['24/02/20', '24/02/20', '25/02/20', '26/02/20', '26/02/20'])
+
+    def test_single_category(self):
+        wide = io.italy_provinces_filter_by_category(self.data_frame, 'totale_casi')
+        self.assertListEqual(wide.columns.tolist(), ['Verona', 'Padova'])
+        self.assertListEqual(wide.index.tolist(), ['24/02/20', '25/02/20', '26/02/20'])
+        self.assertListEqual(wide['Verona'].tolist(), [1, 3, 5])
+        self.assertTrue(np.isnan(wide.loc['25/02/20', 'Padova']))
+
+        complete = io.italy_provinces_filter_by_category(self.data_frame.drop(index='25/02/20'), 'totale_casi')
+        self.assertEqual(complete['Padova'].dtype, np.int64)
+
+    def test_multiple_categories(self):
+        wide = io.italy_filter_by_category(self.data_frame, io.italy_province_name_field, ['totale_casi', 'tamponi'])
+        self.assertListEqual(wide['tamponi', 'Padova'].tolist()[::2], [20, 80])
+        self.assertListEqual(wide['totale_casi'].columns.tolist(), ['Verona', 'Padova'])
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -1,6 +1,8 @@
 import unittest
 import mytools.date as dt
 import datetime
+import numpy as np
+import pandas as pd
 
 
 class MyTestCase(unittest.TestCase):
@@ -45,6 +47,28 @@ class MyTestCase(unittest.TestCase):
 
         self.assertListEqual(dt.str_convert_mdy_to_dmy(input_dates), expected)
 
+    def test_array_conversions(self):
+        np.testing.assert_array_equal(dt.str_to_day_of_year_array(self.str_date_list * 2, self.format),
+                                      self.days_list * 2)
+        np.testing.assert_array_equal(dt.day_of_year_to_date_array(np.array(self.days_list), self.year),
+                                      np.array(self.date_list, dtype='datetime64[D]'))
+        np.testing.assert_array_equal(dt.day_of_year_to_string_array(self.days_list, self.format, self.year),
+                                      self.str_date_list)
+        dates = pd.Series(['2020-02-24T18:00:00', '2020-02-25T17:00:00', '2020-02-24T18:00:00'])
+        self.assertListEqual(dt.str_convert_date_array(dates, dt.format_ISO8601, dt.format_ddmmyy).tolist(),
+                             ['24/02/20', '25/02/20', '24/02/20'])
+        self.assertListEqual(dt.str_convert_date_array([], dt.format_ISO8601, dt.format_ddmmyy).tolist(), [])
+
+    def test_day_numbers(self):
+        dates = np.array(['2021-01-02', '2020-12-30', '2021-03-01'], dtype='datetime64[D]')
+        days = dt.date_to_day_number_array(dates)
+        np.testing.assert_array_equal(days, [3, 0, 61])
+        np.testing.assert_array_equal(dt.day_number_to_date_array(days + 0.5, '2020-12-30'), dates)
+        np.testing.assert_array_equal(dt.date_to_day_number_array(dates, '2021-01-01'), [1, -2, 59])
+        x, origin = dt.str_to_day_numbers(['02/01/21', '30/12/20', '01/03/21'], dt.format_ddmmyy)
+        np.testing.assert_array_equal(x, [3, 0, 61])
+        self.assertEqual(origin, np.datetime64('2020-12-30'))
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,90 @@
+import gzip
+import http.server
+import tempfile
+import threading
+import time
+import unittest
+import mytools.cache as cache
+import mytools.dataio as io
+import mytools.download as download
+
+
+class SlowCsvHandler(http.server.BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    delay = 0.3
+    lock = threading.Lock()
+    clients = []
+    encodings = []
+
+    def do_GET(self):
+        with SlowCsvHandler.lock:
+            SlowCsvHandler.clients.append(self.client_address)
+            SlowCsvHandler.encodings.append(self.headers.get('Accept-Encoding', ''))
+        time.sleep(SlowCsvHandler.delay)
+        content = 'name,value\n{},1\n{},2\n'.format(self.path.strip('/'), self.path.strip('/')).encode('utf-8')
+        self.send_response(200)
+        if 'gzip' in self.headers.get('Accept-Encoding', ''):
+            content = gzip.compress(content)
+            self.send_header('Content-Encoding', 'gzip')
+        self.send_header('Content-Length', str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def log_message(self, *args):
+        pass
+
+
+class TestDownload(unittest.TestCase):
+
+    def setUp(self):
+        self.server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), SlowCsvHandler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.url = 'http://127.0.0.1:{}/'.format(self.server.server_port)
+        self.directory = tempfile.TemporaryDirectory()
+        self.cache_dir, cache.cache_dir = cache.cache_dir, self.directory.name
+        SlowCsvHandler.clients, SlowCsvHandler.encodings = [], []
+        download.close_session()
+        io.clear_loaded_sources()
+
+    def tearDown(self):
+        io.clear_loaded_sources()
+        download.close_session()
+        cache.cache_dir = self.cache_dir
+        self.server.shutdown()
+        self.server.server_close()
+        self.directory.cleanup()
+
+    def test_concurrent_sources(self):
+        file_names = [self.url + name for name in ('confirmed', 'deaths', 'recovered', 'regions')]
+        start = time.perf_counter()
+        frames = io.load_sources(file_names)
+        elapsed = time.perf_counter() - start
+
+        self.assertListEqual([f['name'].iloc[0] for f in frames], ['confirmed', 'deaths', 'recovered', 'regions'])
+        # bounded by the slowest file rather than by the sum of the delays
+        self.assertLess(elapsed, 2.5 * SlowCsvHandler.delay)
+        self.assertTrue(all('gzip' in e for e in SlowCsvHandler.encodings))
+
+    def test_keep_alive(self):
+        SlowCsvHandler.delay = 0
+        try:
+            paths = [cache.fetch(self.url + name, ttl=0) for name in ('a', 'b', 'c')]
+        finally:
+            SlowCsvHandler.delay = 0.3
+        self.assertEqual(len(SlowCsvHandler.clients), 3)
+        self.assertEqual(len(set(SlowCsvHandler.clients)), 1)
+        # the compressed transfer is decoded on the fly
+        with open(paths[1], 'rb') as f:
+            self.assertEqual(f.read(), b'name,value\nb,1\nb,2\n')
+
+    def test_map_concurrent_errors(self):
+        def fail(item):
+            raise ValueError(item)
+
+        with self.assertRaises(ValueError):
+            download.map_concurrent(fail, [1, 2, 3])
+        self.assertListEqual(download.map_concurrent(lambda item: item * 2, [3, 1, 2]), [6, 2, 4])
+
+
+if __name__ == '__main__':
+    unittest.main()
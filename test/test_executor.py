@@ -0,0 +1,41 @@
+import unittest
+import mytools.executor as ex
+import mytools.regression as reg
+import numpy as np
+import pandas as pd
+import test.synthetic as synthetic
+
+
+class TestExecutor(unittest.TestCase):
+
+    def setUp(self):
+        self.x = np.arange(50, 120, dtype=float)
+        p = np.array([[90, 5, 1000, 0.2], [100, 2, 3000, 0.1], [80, 0, 500, 0.3], [85, 1, 800, 0.15]]).T
+        self.data_frame = pd.DataFrame(synthetic.sigmoid_matrix(self.x, p, leading_nan={2: 10}),
+                                       columns=['d', 'c', 'b', 'a'])
+
+    def test_backends_agree(self):
+        expected = ex.fit_columns(self.x, self.data_frame, reg.fit_sigmoid)
+        self.assertListEqual(list(expected.keys()), ['d', 'c', 'b', 'a'])
+        for backend in ['thread', 'process']:
+            with ex.get_executor(backend, workers=2) as executor:
+                results = ex.fit_columns(self.x, self.data_frame, reg.fit_sigmoid, executor=executor, chunk_size=3)
+            self.assertListEqual(list(results.keys()), list(expected.keys()))
+            for col in expected:
+                np.testing.assert_allclose(results[col][0], expected[col][0])
+
+    def test_data_frame_new_year(self):
+        data_frame = self.data_frame.set_axis(pd.date_range('2020-12-01', periods=self.x.size).strftime('%d/%m/%y'))
+        results = ex.fit_data_frame(data_frame, reg.fit_sigmoid)
+        expected = ex.fit_columns(self.x - self.x[0], self.data_frame, reg.fit_sigmoid)
+        for col in expected:
+            np.testing.assert_allclose(results[col].curve(np.arange(self.x.size)),
+                                       expected[col].curve(np.arange(self.x.size)), rtol=1e-4)
+
+    def test_unknown_backend(self):
+        with self.assertRaises(ValueError):
+            ex.get_executor('gpu')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,98 @@
+import os
+import tempfile
+import unittest
+import numpy as np
+import mytools.fitcache as fitcache
+import mytools.guess as gs
+import mytools.regression as reg
+
+
+class TestFitCache(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.settings = fitcache.enabled, fitcache.cache_dir, fitcache.max_bytes
+        fitcache.enabled, fitcache.cache_dir = True, self.directory.name
+        fitcache.clear()
+        self.x = np.arange(40, dtype=float)
+        self.y = 1000 / (1 + np.exp(-0.2 * (self.x - 25))) + 3
+
+    def tearDown(self):
+        fitcache.clear()
+        fitcache.enabled, fitcache.cache_dir, fitcache.max_bytes = self.settings
+        self.directory.cleanup()
+
+    def test_hit(self):
+        fitted = reg.fit_sigmoid(self.x, self.y, label='a')
+        hits = fitcache.stats()['hits']
+        with reg.FitTelemetry() as telemetry:
+            cached = reg.fit_sigmoid(self.x, self.y, label='b')
+        self.assertEqual(fitcache.stats()['hits'], hits + 1)
+        self.assertEqual(len(telemetry.results), 1)
+        self.assertEqual(cached.label, 'b')
+        self.assertEqual(cached.model, fitted.model)
+        self.assertEqual((cached.cost, cached.nfev, cached.status), (fitted.cost, fitted.nfev, fitted.status))
+        np.testing.assert_array_equal(cached.pxp, fitted.pxp)
+        self.assertLess(cached.wall_time, fitted.wall_time)
+
+        # the cached arrays are not shared with the callers
+        cached.p[:] = 0
+        np.testing.assert_array_equal(reg.fit_sigmoid(self.x, self.y).p, fitted.p)
+
+    def test_key(self):
+        reg.fit_sigmoid(self.x, self.y)
+        misses = fitcache.stats()['misses']
+        y = self.y.copy()
+        y[-1] += 1
+        reg.fit_sigmoid(self.x, y)
+        reg.fit_sigmoid(self.x, self.y, num_starts=4)
+        reg.fit_logistic_distribution(self.x, self.y)
+        self.assertEqual(fitcache.stats()['misses'], misses + 3)
+
+        # the settings of the guesses and of the solvers are part of the key
+        offset_margin, gs.offset_margin = gs.offset_margin, 2 * gs.offset_margin
+        try:
+            reg.fit_sigmoid(self.x, self.y)
+        finally:
+            gs.offset_margin = offset_margin
+        self.assertEqual(fitcache.stats()['misses'], misses + 4)
+        reg.fit_sigmoid(self.x, self.y)
+        self.assertEqual(fitcache.stats()['misses'], misses + 4)
+
+        # so is the code, the fingerprint of the modules is computed again when a function is replaced
+        entry_key = fitcache.key(self.x, self.y, (), {})
+        sigmoid_guess = gs.sigmoid_logit_guess
+        gs.sigmoid_logit_guess = lambda x, y: sigmoid_guess(x, y)
+        try:
+            self.assertNotEqual(fitcache.key(self.x, self.y, (), {}), entry_key)
+        finally:
+            gs.sigmoid_logit_guess = sigmoid_guess
+        self.assertEqual(fitcache.key(self.x, self.y, (), {}), entry_key)
+
+    def test_persistence_and_eviction(self):
+        fitted = reg.fit_exponential(self.x, self.y)
+        fitcache._memory.clear()
+        self.assertEqual(fitcache.stats()['memory_entries'], 0)
+        self.assertEqual(reg.fit_exponential(self.x, self.y).model, fitted.model)
+
+        fitcache.max_bytes = 4096
+        for i in range(30):
+            reg.fit_exponential(self.x, self.y + i)
+        sizes = [os.path.getsize(os.path.join(root, name)) for root, _, names in os.walk(self.directory.name)
+                 for name in names]
+        self.assertLessEqual(sum(sizes), fitcache.max_bytes)
+        self.assertGreater(len(sizes), 0)
+
+    def test_directories(self):
+        # the size of each directory is accounted separately
+        fitcache.max_bytes = 4096
+        with tempfile.TemporaryDirectory() as other:
+            for i in range(3):
+                fitcache.put('a{}'.format(i), {'data': bytes(1000)})
+                fitcache.put('b{}'.format(i), {'data': bytes(1000)}, directory=other)
+            for directory in (self.directory.name, other):
+                self.assertEqual(sum(len(names) for _, _, names in os.walk(directory)), 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,35 @@
+import unittest
+import mytools.guess as gs
+import mytools.regression as reg
+import numpy as np
+
+
+class TestGuess(unittest.TestCase):
+
+    def setUp(self):
+        self.x = np.linspace(0.3, 1.0, 60)
+
+    def test_exponential(self):
+        p = [0.8, 0.3, 4.0]
+        guess = gs.exponential_log_linear_guess(self.x, reg.exponential(p, self.x))
+        self.assertAlmostEqual(guess[2], p[2], delta=0.5)
+
+    def test_sigmoid(self):
+        p = [0.6, 0.3, 0.7, 15.0]
+        guess = gs.sigmoid_logit_guess(self.x, reg.sigmoid(p, self.x))
+        np.testing.assert_allclose(guess[[0, 3]], [p[0], p[3]], rtol=0.35)
+
+    def test_logistic_distribution(self):
+        p = [0.6, 0.3, 0.1, 15.0]
+        guess = gs.logistic_distribution_logit_guess(self.x, reg.logistic_distribution(p, self.x))
+        np.testing.assert_allclose(guess, p, rtol=0.35)
+
+    def test_fallback(self):
+        y = np.linspace(1.0, 0.3, self.x.size)
+        np.testing.assert_array_equal(gs.exponential_log_linear_guess(self.x, y),
+                                      reg.exponential_dumb_initial_guess(self.x, y))
+        np.testing.assert_array_equal(gs.sigmoid_logit_guess(self.x, y), reg.sigmoid_dumb_initial_guess(self.x, y))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,55 @@
+import unittest
+import numpy as np
+import mytools.kernels as kn
+import mytools.regression as reg
+
+
+class TestKernels(unittest.TestCase):
+
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.x = np.linspace(0.3, 1.0, 50)
+        self.y = rng.uniform(0.3, 1.0, 50)
+        # one set of parameters, and different parameters for each sample as in least_squares_batch
+        self.params = {3: [np.array([0.5, 0.1, 2.0]), rng.uniform(0.5, 2, (3, 50))],
+                       4: [np.array([0.6, 0.2, 0.8, 9.0]), rng.uniform(0.5, 2, (4, 50))]}
+
+    def check(self, kernel_class, residual_fun, jac_fun, backend):
+        kernel = kernel_class(10, backend=backend)
+        for p in self.params[kernel.num_params]:
+            residuals = kernel.residuals(p, self.x, self.y)
+            np.testing.assert_allclose(residuals, residual_fun(p, self.x, self.y), rtol=1e-12, atol=1e-12)
+            self.assertIsNot(kernel.residuals(p, self.x, self.y), residuals)
+
+            jac = kernel.jacobian(p, self.x, self.y)
+            np.testing.assert_allclose(jac, jac_fun(p, self.x, self.y), rtol=1e-12, atol=1e-12)
+            self.assertTrue(np.shares_memory(kernel.jacobian(p, self.x, self.y), jac))
+
+    def check_models(self, backend):
+        self.check(kn.ExponentialKernel, reg.exponential_residuals, reg.exponential_residuals_jacobian, backend)
+        self.check(kn.SigmoidKernel, reg.sigmoid_residuals, reg.sigmoid_residuals_jacobian, backend)
+        self.check(kn.LogisticDistributionKernel, reg.logistic_distribution_residuals,
+                   reg.logistic_distribution_residuals_jacobian, backend)
+
+    def test_numpy(self):
+        self.check_models('numpy')
+
+    @unittest.skipIf(kn.numba is None, 'numba is not installed')
+    def test_numba(self):
+        self.check_models('numba')
+
+    def test_fit_unchanged(self):
+        x = np.arange(40, dtype=float)
+        y = 1000 / (1 + np.exp(-0.2 * (x - 25))) + 3
+        result = reg.fit_sigmoid(x, y)
+        reg.use_kernels = False
+        try:
+            reference = reg.fit_sigmoid(x, y)
+        finally:
+            reg.use_kernels = True
+        np.testing.assert_allclose(result.model, reference.model, rtol=1e-8)
+        self.assertEqual(result.nfev, reference.nfev)
+
+
+if __name__ == '__main__':
+    unittest.main()
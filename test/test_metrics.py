@@ -0,0 +1,62 @@
+import unittest
+import numpy as np
+import pandas as pd
+import mytools.date as dt
+import mytools.metrics as mt
+import test.synthetic as synthetic
+
+
+class TestMetrics(unittest.TestCase):
+
+    def setUp(self):
+        values = synthetic.sigmoid_series(6, 80).astype(float)
+        values[:5, 2] = np.nan
+        days = np.arange(80) + 55
+        self.data_frame = pd.DataFrame(values, index=dt.day_of_year_to_string_array(days, dt.format_ddmmyy, 2020),
+                                       columns=['Entity {}'.format(j) for j in range(6)])
+
+    def test_derived_metrics(self):
+        result = mt.derived_metrics(self.data_frame.to_numpy(), window=7)
+        frame = self.data_frame.reset_index(drop=True)
+        increments = frame.diff()
+        np.testing.assert_allclose(result['increments'], increments.to_numpy())
+        np.testing.assert_allclose(result['rolling_increments'], increments.rolling(7).mean().to_numpy())
+        ratio = frame / frame.shift(7)
+        np.testing.assert_allclose(result['growth_rate'], (ratio ** (1 / 7) - 1).to_numpy())
+        np.testing.assert_allclose(result['doubling_time'], (7 * np.log(2) / np.log(ratio.where(ratio > 1)))
+                                   .to_numpy())
+
+    def test_incremental(self):
+        whole = mt.DerivedMetrics(self.data_frame, window=5)
+        incremental = mt.DerivedMetrics(self.data_frame.iloc[:3], window=5)
+        for start in range(3, 80, 11):
+            incremental.append(self.data_frame.iloc[start:start + 11])
+        self.assertEqual(len(incremental), 80)
+        for metric in mt.metrics:
+            pd.testing.assert_frame_equal(incremental.frame(metric), whole.frame(metric))
+
+        with self.assertRaises(ValueError):
+            incremental.append(self.data_frame.iloc[-2:])
+
+    def test_fit_increments(self):
+        metrics = mt.DerivedMetrics(self.data_frame.iloc[:60])
+        fits = metrics.fit('logistic_distribution', 'increments')
+        self.assertListEqual([f.label for f in fits], self.data_frame.columns.tolist())
+        self.assertTrue(all(f.success for f in fits))
+
+        metrics.append(self.data_frame.iloc[60:])
+        fits = metrics.fit('sigmoid', 'values', min_value=0)
+        self.assertTrue(all(f.success for f in fits))
+
+    def test_fit_new_year(self):
+        data_frame = self.data_frame.set_axis(pd.date_range('2020-11-15', periods=80).strftime(dt.format_ddmmyy))
+        fits = mt.DerivedMetrics(data_frame).fit('sigmoid', 'values', min_value=0)
+        self.assertTrue(all(f.success for f in fits))
+        # the same curves as the fits on the days since the first date of the original frame
+        expected = mt.DerivedMetrics(self.data_frame).fit('sigmoid', 'values', min_value=0)
+        for fit, other in zip(fits, expected):
+            np.testing.assert_allclose(fit.curve(np.arange(80)), other.curve(np.arange(80)), rtol=1e-4)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,48 @@
+import unittest
+import mytools.date as dt
+import mytools.plot as mpl
+import numpy as np
+import pandas as pd
+
+
+class TestPlot(unittest.TestCase):
+
+    def test_lttb_indices(self):
+        rng = np.random.default_rng(0)
+        x = np.arange(1000, dtype=float)
+        y = np.column_stack([np.sin(x / 50) + rng.normal(0, 0.1, x.size), np.cos(x / 30)])
+        y[500, 0] = 10
+        y[:200, 1] = np.nan
+
+        rows = mpl.lttb_indices(x, y, 100)
+        self.assertEqual(rows.shape, (100, 2))
+        self.assertTrue(np.all(np.diff(rows, axis=0) > 0))
+        self.assertListEqual(rows[[0, -1], 0].tolist(), [0, 999])
+        self.assertIn(500, rows[:, 0])
+        self.assertTrue(np.isfinite(y[rows[rows[:, 1] >= 200, 1], 1]).all())
+        np.testing.assert_array_equal(mpl.lttb_indices(x, y[:, 0], 100), rows[:, 0])
+        np.testing.assert_array_equal(mpl.lttb_indices(x[:50], y[:50, 0], 100), np.arange(50))
+
+    def test_comparative_plot(self):
+        days = np.arange(60, 160)
+        data_frame = pd.DataFrame({'a': np.arange(100.0) ** 2, 'b': np.arange(100.0)},
+                                  index=dt.day_of_year_to_string_array(days, dt.format_ddmmyy))
+        data_frame.iloc[:10, 1] = np.nan
+
+        fig = mpl.iplot_comparative_plot(data_frame)
+        self.assertEqual(fig.data[0].type, 'scatter')
+        self.assertEqual(len(fig.data[1].x), 90)
+
+        fig = mpl.iplot_comparative_plot(data_frame, webgl=True, max_points=20)
+        self.assertEqual(fig.data[0].type, 'scattergl')
+        self.assertEqual(len(fig.data[0].x), 20)
+        self.assertEqual(fig.data[0].x[-1], data_frame.index[-1])
+
+        fig = mpl.iplot_sync_plot(data_frame, 'sync', min_value=50)
+        self.assertEqual(fig.data[0].x[0], 0)
+        self.assertEqual(fig.data[0].y[0], 64)
+        self.assertEqual(len(fig.data[1].x), 50)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,6 +1,7 @@
 import unittest
 import mytools.regression as reg
 import numpy as np
+import test.synthetic as synthetic
 
 
 class MyTestCase(unittest.TestCase):
@@ -13,6 +14,171 @@ class MyTestCase(unittest.TestCase):
             self.assertAlmostEqual(r[0], t)
             self.assertAlmostEqual(r[1], t)
 
+    def test_fit_sigmoid_batch(self):
+        x = np.arange(50, 150, dtype=float)
+        p = np.array([[90, 5, 1000, 0.2], [100, 2, 3000, 0.1], [80, 0, 500, 0.3]]).T
+        # a short series and a series that cannot be fitted
+        y = synthetic.sigmoid_matrix(x, p, leading_nan={1: 30}, empty_columns=1)
+
+        results = reg.fit_sigmoid_batch(x, y)
+        self.assertEqual(len(results), 4)
+        self.assertEqual(results[0].pxp.shape, (1500,))
+        self.assertTrue(np.isnan(results[3].model).all())
+        self.assertFalse(results[3].success)
+        for j in range(3):
+            valid = np.isfinite(y[:, j])
+            self.assertTrue(results[j].success)
+            single, _, _ = reg.fit_sigmoid(x[valid], y[valid, j])
+            np.testing.assert_allclose(reg.sigmoid(results[j].model, x), reg.sigmoid(single, x),
+                                       atol=1e-5 * np.max(y[valid, j]))
+
+    def test_block_normal_matrix(self):
+        rng = np.random.default_rng(0)
+        jac = rng.standard_normal((30, 4))
+        weighted = jac * rng.uniform(0.1, 1, 30)[:, np.newaxis]
+        starts = np.array([0, 7, 8, 20])
+        expected = np.add.reduceat(weighted[:, :, np.newaxis] * jac[:, np.newaxis, :], starts)
+        np.testing.assert_allclose(reg._block_normal_matrix(weighted, jac, starts), expected)
+
+    def test_fit_batch_warm_start(self):
+        data = np.genfromtxt(fname='italy-intensive_care.csv', delimiter=',', names=True)
+        x, y = data['day'][:60], data['intensive_care'][:60, np.newaxis]
+
+        previous = reg.fit_sigmoid_batch(x[:30], y[:30])
+        warm = reg.fit_sigmoid_batch(x, y, warm_start=previous)[0]
+        cold = reg.fit_sigmoid_batch(x, y)[0]
+        self.assertLess(warm.nfev, cold.nfev)
+        np.testing.assert_allclose(warm.curve(x), cold.curve(x), atol=1e-4 * y.max())
+
+    def test_residuals_jacobian(self):
+        rng = np.random.default_rng(0)
+        x = np.linspace(0.3, 1.0, 50)
+        y = rng.uniform(0.3, 1.0, 50)
+        models = [(reg.exponential_residuals, reg.exponential_residuals_jacobian, [0.8, 0.3, 3.0]),
+                  (reg.sigmoid_residuals, reg.sigmoid_residuals_jacobian, [0.6, 0.3, 0.7, 8.0]),
+                  (reg.logistic_distribution_residuals, reg.logistic_distribution_residuals_jacobian,
+                   [0.6, 0.3, 0.1, 8.0])]
+        for residual_fun, jac_fun, p in models:
+            self.assertEqual(jac_fun(p, x, y).shape, (x.size, len(p)))
+            self.assertLess(reg.check_jacobian(residual_fun, jac_fun, p, x, y), 1e-6)
+
+        data = np.genfromtxt(fname='italy-intensive_care.csv', delimiter=',', names=True)
+        model, _, _ = reg.fit_sigmoid(data['day'], data['intensive_care'], check_jac=True)
+        self.assertEqual(len(model), 4)
+
+        with self.assertRaises(ValueError):
+            reg.fit_model(data['day'], data['intensive_care'], reg.sigmoid, reg.sigmoid_residuals,
+                          reg.denormalize_sigmoid_params, reg.sigmoid_dumb_initial_guess,
+                          jac_fun=reg.logistic_distribution_residuals_jacobian, check_jac=True)
+
+    def test_fit_result(self):
+        data = np.genfromtxt(fname='italy-intensive_care.csv', delimiter=',', names=True)
+        x, y = data['day'][:40], data['intensive_care'][:40]
+
+        with reg.FitTelemetry() as telemetry:
+            result = reg.fit_sigmoid(x, y, label='Italy')
+            reg.fit_exponential_batch(x, np.column_stack([y, 2 * y]), labels=['a', 'b'])
+        reg.fit_sigmoid(x, y)
+        self.assertNotIn(telemetry, reg.fit_hooks)
+
+        model, xp, pxp = result
+        self.assertEqual(model, result.model)
+        self.assertTrue(result.success)
+        self.assertGreater(result.nfev, 0)
+        self.assertGreater(result.wall_time, 0)
+        self.assertEqual([r.label for r in telemetry.results], ['Italy', 'a', 'b'])
+        self.assertEqual(telemetry.summary()['fits'], 3)
+        self.assertEqual(len(telemetry.slowest(2)), 2)
+        with self.assertRaises(AttributeError):
+            result.other = 0
+
+    def test_fitted_curve(self):
+        data = np.genfromtxt(fname='italy-intensive_care.csv', delimiter=',', names=True)
+        x, y = data['day'][:40], data['intensive_care'][:40]
+
+        result = reg.fit_sigmoid(x, y)
+        self.assertIsNone(result._points)
+        np.testing.assert_allclose(result.curve(x), reg.sigmoid(result.model, x), rtol=1e-9)
+        xp, pxp = result.curve.sample(100)
+        self.assertEqual(xp.size, 100)
+        np.testing.assert_allclose(pxp, reg.sigmoid(result.model, xp), rtol=1e-9)
+        np.testing.assert_allclose(result.pxp, reg.sigmoid(result.model, result.xp), rtol=1e-9)
+        self.assertEqual(result.xp.size, reg.curve_resolution)
+
+        xp, pxp = result.curve.sample_range(x[0], x[-1] + 20, num=61)
+        self.assertEqual(xp[-1], x[-1] + 20)
+        self.assertEqual(pxp.size, 61)
+
+    def test_incremental_fitter(self):
+        data = np.genfromtxt(fname='italy-intensive_care.csv', delimiter=',', names=True)
+        x, y = data['day'][:40], data['intensive_care'][:40]
+
+        fitter = reg.IncrementalFitter.for_sigmoid(x[:30], y[:30])
+        fitter.fit()
+        self.assertFalse(fitter.warm_started)
+        for i in range(30, 40):
+            fitter.append(x[i], y[i])
+            model, xp, pxp = fitter.fit()
+            self.assertTrue(fitter.warm_started)
+
+        cold, _, _ = reg.fit_sigmoid(x, y)
+        np.testing.assert_allclose(reg.sigmoid(model, x), reg.sigmoid(cold, x), atol=1e-4 * y.max())
+        self.assertEqual(xp.size, 1500)
+
+    def test_multistart(self):
+        x = np.arange(40, dtype=float)
+        y = 1000 / (1 + np.exp(-0.3 * (x - 20))) + 5
+
+        # a guess far from the solution, from which a single run ends in a poor local minimum
+        def guess(x_norm, y_norm):
+            return np.array([0.3, 0.3, 0.1, -30.0])
+
+        args = (x, y, reg.sigmoid, reg.sigmoid_residuals, reg.denormalize_sigmoid_params, guess)
+        single = reg.fit_model(*args, jac_fun=reg.sigmoid_residuals_jacobian)
+        multi = reg.fit_model(*args, jac_fun=reg.sigmoid_residuals_jacobian, num_starts=16)
+        self.assertGreater(single.cost, 1)
+        self.assertTrue(multi.success)
+        self.assertLess(multi.cost, 1e-6)
+        np.testing.assert_allclose(multi.model, [20, 5, 1000, 0.3], rtol=1e-5)
+        self.assertIn('best of 16 starts', multi.message)
+
+        # the default guess already finds the optimum, the multi-start must not do worse
+        result = reg.fit_sigmoid(x, y, num_starts=8)
+        self.assertLessEqual(result.cost, reg.fit_sigmoid(x, y).cost + 1e-9)
+
+    def test_fit_joint(self):
+        rng = np.random.default_rng(1)
+        x = np.arange(100, dtype=float)
+        p = np.array([rng.uniform(35, 60, 12), np.zeros(12), 10 ** rng.uniform(1.5, 4, 12), np.full(12, 0.12)])
+        # short series, which alone give an unstable k, and a series that cannot be fitted
+        y = synthetic.sigmoid_matrix(x, p, seed=1, empty_columns=1)
+        y[55:, :4] = np.nan
+
+        results = reg.fit_sigmoid_joint(x, y, labels=list(range(13)))
+        self.assertEqual(len(results), 13)
+        self.assertTrue(all(r.success for r in results[:12]))
+        self.assertFalse(results[12].success)
+        self.assertTrue(np.isnan(results[12].model).all())
+        k = np.array([r.model[3] for r in results[:12]])
+        np.testing.assert_allclose(k, k[0])
+        self.assertAlmostEqual(k[0], 0.12, delta=0.005)
+        np.testing.assert_allclose([r.model[0] for r in results[:12]], p[0], rtol=0.02)
+        self.assertAlmostEqual(sum(r.cost for r in results[:12]), 0.5 * np.sum(reg._soft_l1(np.concatenate(
+            [r.t_y[0] * (y[:, j] - r.curve(x))[np.isfinite(y[:, j])] for j, r in enumerate(results[:12])]))[0]))
+
+        # the finite differences grouped by the sparsity of the Jacobian reach the same solution
+        args = (x, y, reg.sigmoid, reg.sigmoid_residuals, reg.denormalize_sigmoid_params, reg.gs.sigmoid_logit_guess)
+        estimated = reg.fit_model_joint(*args, shared=(3,))
+        for j in range(12):
+            np.testing.assert_allclose(estimated[j].curve(x), results[j].curve(x), atol=1e-3 * np.nanmax(y[:, j]))
+
+        with self.assertRaises(ValueError):
+            reg.fit_sigmoid_joint(x, y, shared=('c',))
+        with self.assertRaises(ValueError):
+            reg.fit_exponential_joint(x, y, shared=('x0',))
+        with self.assertRaises(ValueError):
+            reg.fit_sigmoid_joint(x, y, shared=('z',))
+
 
 if __name__ == '__main__':
     unittest.main()
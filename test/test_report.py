@@ -0,0 +1,43 @@
+import os
+import tempfile
+import unittest
+import mytools.date as dt
+import mytools.report as rp
+import numpy as np
+import pandas as pd
+
+
+class TestReport(unittest.TestCase):
+
+    def setUp(self):
+        data = np.genfromtxt(fname='italy-intensive_care.csv', delimiter=',', names=True)
+        x, y = data['day'][:40], data['intensive_care'][:40]
+        self.data_frame = pd.DataFrame({'Lombardia': y, 'Veneto': y / 2},
+                                       index=dt.day_of_year_to_string_array(x, dt.format_ddmmyy))
+
+    def test_render_report(self):
+        specs = rp.analysis_specs(self.data_frame, 'terapia_intensiva', log_fitting=False)
+        specs.append(rp.comparative_spec('all regions', self.data_frame, 'Regions', min_common=20))
+        with tempfile.TemporaryDirectory() as directory:
+            status = rp.render_report(specs, directory, ['png', 'html'], backend='serial')
+            self.assertListEqual(list(status.keys()), ['Lombardia_terapia_intensiva', 'Veneto_terapia_intensiva',
+                                                       'all regions'])
+            self.assertTrue(all(s == 'rendered' for s in status.values()))
+            self.assertTrue(os.path.exists(os.path.join(directory, 'all_regions.png')))
+            with open(os.path.join(directory, 'Veneto_terapia_intensiva.html')) as f:
+                self.assertIn('<svg', f.read())
+
+            # only the figure whose data changed is rendered again
+            self.data_frame.iloc[-1, 1] += 1
+            specs = rp.analysis_specs(self.data_frame, 'terapia_intensiva', log_fitting=False)
+            status = rp.render_report(specs, directory, ['png', 'html'], backend='serial')
+            self.assertDictEqual(status, {'Lombardia_terapia_intensiva': 'skipped',
+                                          'Veneto_terapia_intensiva': 'rendered'})
+
+            os.remove(os.path.join(directory, 'Lombardia_terapia_intensiva.png'))
+            status = rp.render_report(specs[:1], directory, ['png', 'html'], backend='serial')
+            self.assertEqual(status['Lombardia_terapia_intensiva'], 'rendered')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,77 @@
+import os
+import pickle
+import tempfile
+import unittest
+import mytools.dataio as io
+import mytools.store as st
+import numpy as np
+import pandas as pd
+import test.synthetic as synthetic
+
+
+class TestStore(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.file_name = os.path.join(self.directory.name, 'regions.csv')
+        data_frame = synthetic.italy_data_frame(6, 40, level='region')
+        # a missing day for an entity
+        data_frame.drop(index=[7], inplace=True)
+        data_frame.to_csv(self.file_name, index=False)
+
+    def tearDown(self):
+        io.clear_loaded_sources()
+        self.directory.cleanup()
+
+    def test_frames(self):
+        store = st.italy_write_store(os.path.join(self.directory.name, 'store'), 'region', self.file_name)
+        self.assertEqual(store.values.shape, (40, 6, len(store.fields)))
+        self.assertIn(io.italy_intensive_care_field, store.fields)
+
+        regions = io.italy_load(self.file_name, io.italy_region_name_field)
+        for field in [io.italy_intensive_care_field, io.italy_total_cases_field]:
+            expected = io.italy_regions_filter_by_category(regions, field).astype(float)
+            frame = store.frame(field)
+            np.testing.assert_array_equal(frame.to_numpy(), expected.to_numpy())
+            self.assertListEqual(frame.index.tolist(), expected.index.tolist())
+            self.assertListEqual(frame.columns.tolist(), expected.columns.tolist())
+            self.assertTrue(np.shares_memory(frame.to_numpy(), store.values))
+        self.assertTrue(np.isnan(store.frame(io.italy_deaths_field).iloc[1, 1]))
+
+        view = store.view(['Regione 1', 'Regione 2'], io.italy_deaths_field)
+        self.assertEqual(view.shape, (40, 2))
+        self.assertTrue(np.shares_memory(view, store.values))
+        self.assertFalse(view.flags.writeable)
+        entity = store.entity_frame('Regione 3', [io.italy_deaths_field, io.italy_tests_field])
+        self.assertEqual(entity.shape, (40, 2))
+        with self.assertRaises(KeyError):
+            store.view('Regione 9')
+        self.assertEqual(store.view([], io.italy_deaths_field).shape, (40, 0))
+        self.assertEqual(store.frame(io.italy_deaths_field, []).shape, (40, 0))
+
+        # the store is pickled by path for the worker processes
+        copy = pickle.loads(pickle.dumps(store))
+        pd.testing.assert_frame_equal(copy.frame(io.italy_deaths_field), store.frame(io.italy_deaths_field))
+        self.assertLess(len(pickle.dumps(store)), 200)
+
+    def test_load_category(self):
+        store_dir = os.path.join(self.directory.name, 'stores')
+        expected = io.italy_load_category('region', io.italy_total_cases_field, file_name=self.file_name)
+        frame = io.italy_load_category('region', io.italy_total_cases_field, file_name=self.file_name,
+                                       store_dir=store_dir)
+        np.testing.assert_array_equal(frame.to_numpy(), expected.to_numpy(dtype=float))
+        self.assertListEqual(frame.columns.tolist(), expected.columns.tolist())
+        self.assertTrue(os.path.exists(os.path.join(store_dir, 'region', st.values_name)))
+
+        # the store is opened without reading the dataset again, the frames are views of the mapped file
+        io.clear_loaded_sources()
+        os.remove(self.file_name)
+        frame = io.italy_load_category('region', io.italy_deaths_field, ['Regione 2', 'Regione 3'],
+                                       store_dir=store_dir)
+        self.assertEqual(frame.shape, (40, 2))
+        # a copy would be writeable
+        self.assertFalse(frame.to_numpy().flags.writeable)
+
+
+if __name__ == '__main__':
+    unittest.main()